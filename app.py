@@ -34,10 +34,16 @@ from config import get_config
 from database import db
 
 # CLI-регистрация
+from scripts.blob_store import register_blob_commands
+from scripts.bulk_import import register_import_commands
 from scripts.cleanup import register_cleanup_commands
+from scripts.dashboard_counters import register_dashboard_commands
+from scripts.request_manufacturers import register_manufacturer_commands
+from scripts.search_index import register_search_commands
 
 # Важно: bootstrap и прочие импорты выполняем после создания app/конфига
 from security_utils import safe_log
+from utils.blob_store import UploadRequest
 
 # --- чувствительные ключи для скрытия в логах ---
 SENSITIVE_KEYS = {"password", "passwd", "pwd", "token", "csrf_token", "new_password"}
@@ -102,6 +108,8 @@ if not app.config.get("SQLALCHEMY_DATABASE_URI"):
 
 # Каталог загрузок
 app.config.setdefault("UPLOAD_FOLDER", os.path.join(app.root_path, "static", "uploads"))
+# Файлы форм спулятся на диск рядом с хранилищем блобов, а не в память
+app.request_class = UploadRequest
 
 # Поздняя инициализация из config_class, если есть init_app
 if hasattr(config_class, "init_app"):
@@ -282,6 +290,11 @@ login_manager.remember_cookie_duration = timedelta(days=30)
 
 # CLI-команды
 register_cleanup_commands(app)
+register_search_commands(app)
+register_dashboard_commands(app)
+register_manufacturer_commands(app)
+register_blob_commands(app)
+register_import_commands(app)
 
 # ------------------ Контекст/хелперы ------------------
 from utils.request_helpers import get_request_contractor  # noqa: E402
@@ -546,6 +559,31 @@ with app.app_context():
         elif _should_create_all():
             db.create_all()
 
+        # Поиск: триграммный индекс и полнотекстовый бэкенд СУБД
+        from utils.search_backend import init_search_backend
+
+        init_search_backend(app)
+
+        # Материализованные счётчики карточек дашборда
+        from utils.dashboard_counters import init_dashboard_counters
+
+        init_dashboard_counters(app)
+
+        # Модель чтения строк дашборда (заявка × подрядчик)
+        from utils.request_summary import init_request_summary
+
+        init_request_summary(app)
+
+        # Производители заявок построчно для SQL-фильтров и группировок
+        from utils.request_manufacturers import init_request_manufacturers
+
+        init_request_manufacturers(app)
+
+        # Кеш данных: хранилище по CACHE_BACKEND и инвалидация по заявкам
+        from utils.cache import init_cache
+
+        init_cache(app)
+
         # ---- Инициализация учётных данных деплоя (через переменные окружения) ----
         try:
             # Если DEPLOY_KEY_HASH не задан, но указан DEPLOY_CHECK_KEY,
@@ -577,7 +615,11 @@ with app.app_context():
         except Exception as e:
             app.logger.warning(f"Deploy bootstrap skipped: {e}")
 
+        # Служебные таблицы полнотекстового поиска управляются бэкендом поиска
+        from utils.search_backend import forget_native_tables
+
         db.reflect()
+        forget_native_tables(db.metadata)
     except Exception as e:
         app.logger.error(f"Ошибка инициализации приложения: {str(e)}")
         raise
@@ -602,6 +644,7 @@ blueprints = [
     ("routes.admin_logs", "admin_logs_bp", ""),
     ("blueprints.op", "op_bp", ""),
     ("routes.op_api", "op_api_bp", ""),
+    ("routes.import_routes", "import_bp", "/imports"),
 ]
 
 for module, bp_name, prefix in blueprints:
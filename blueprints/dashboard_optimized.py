@@ -20,8 +20,17 @@ from sqlalchemy.orm import (
     selectinload,
 )
 
-from models import Attachment, Contractor, Object, Request, User, db
+from models import Contractor, Object, Request, User, db
 from security_utils import sanitize_input
+from utils.dashboard_counters import snapshot, status_total
+from utils.pagination import (
+    cached_count,
+    keyset_paginate,
+    keyset_requested,
+    offset_paginate,
+)
+from utils.request_summary import dashboard_rows
+from utils.search_query import apply_filters, parse_query
 from utils.statuses import RequestStatus
 
 dashboard_bp = Blueprint("dashboard", __name__)
@@ -68,10 +77,25 @@ def dashboard():
                 )
             )
 
-        # Выполняем пагинированный запрос
-        pagination = base_query.order_by(Request.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        # Пагинация: итог из счётчиков дашборда, страницы по курсору или OFFSET
+        total = status_total(status_filter)
+        if total is None:
+            total = cached_count(base_query)
+        if keyset_requested():
+            pagination = keyset_paginate(
+                base_query,
+                (Request.created_at, Request.id),
+                request.args.get("cursor"),
+                per_page,
+                total,
+            )
+        else:
+            pagination = offset_paginate(
+                base_query.order_by(Request.created_at.desc(), Request.id.desc()),
+                page,
+                per_page,
+                total,
+            )
 
         requests = pagination.items
 
@@ -84,120 +108,15 @@ def dashboard():
                 per_page=per_page,
             )
 
-        # Собираем все ID для пакетной загрузки
-        request_ids = [req.id for req in requests]
-        contractor_ids = set()
-
-        # Собираем ID подрядчиков из всех заявок
-        for req in requests:
-            contractor_ids.update(req.contractor_ids_list)
-
-        # Пакетно загружаем подрядчиков одним запросом
-        contractors_dict = {}
-        if contractor_ids:
-            contractors = Contractor.query.filter(
-                Contractor.id.in_(contractor_ids)
-            ).all()
-            contractors_dict = {c.id: c for c in contractors}
-
-        # Оптимизированный запрос вложений с единичным JOIN
-        # Получаем всех обработанных производителей для каждой пары
-        # (request_id, contractor_id)
-        attachment_subquery = (
-            db.session.query(
-                Attachment.request_id,
-                Attachment.contractor_id,
-                func.group_concat(Attachment.manufacturer).label("manufacturers"),
-            )
-            .filter(Attachment.request_id.in_(request_ids))
-            .group_by(Attachment.request_id, Attachment.contractor_id)
-            .subquery()
-        )
-
-        # Execute the attachment query
-        attachment_results = db.session.query(
-            attachment_subquery.c.request_id,
-            attachment_subquery.c.contractor_id,
-            attachment_subquery.c.manufacturers,
-        ).all()
-
-        # Build attachment map
-        attachment_map = {}
-        for req_id, contractor_id, manufacturers_str in attachment_results:
-            key = (req_id, contractor_id)
-            if manufacturers_str:
-                attachment_map[key] = set(manufacturers_str.split(","))
-            else:
-                attachment_map[key] = set()
-
-        # Build optimized table rows
-        table_rows = []
-
-        for req in requests:
-            # Object is already loaded via joinedload
-            obj_name = req.object.name if req.object else "Без объекта"
-
-            # Process each contractor for this request
-            for cid in req.contractor_ids_list:
-                contractor = contractors_dict.get(cid)
-                contractor_name = contractor.name if contractor else "Неизвестно"
-
-                # Get manufacturers for this request
-                all_manufacturers = req.manufacturers_list
-
-                # Get processed manufacturers for this contractor
-                processed_manufacturers = attachment_map.get((req.id, cid), set())
-
-                # Create manufacturer badges
-                manufacturer_badges = []
-                for mfr in all_manufacturers:
-                    manufacturer_badges.append(
-                        {"name": mfr, "is_processed": mfr in processed_manufacturers}
-                    )
-
-                # Status comes from request field (unified enum)
-                display_status = req.status
-
-                table_rows.append(
-                    {
-                        "request": req,
-                        "contractor": contractor,
-                        "contractor_name": contractor_name,
-                        "object_name": obj_name,
-                        "manufacturer_badges": manufacturer_badges,
-                        "created_at": req.created_at,
-                        "status": display_status,
-                    }
-                )
+        # Rows come precomputed from the request_summary read model
+        table_rows = dashboard_rows(requests)
 
         current_app.logger.debug(
             f"Dashboard loaded {len(table_rows)} rows with {len(requests)} requests"
         )
 
-        # Подсчёт общей статистики из базы данных (не из пагинированных данных)
-        total_requests = Request.query.count()
-        processed_requests = Request.query.filter_by(
-            status=RequestStatus.DONE.value
-        ).count()
-        unprocessed_requests = Request.query.filter(
-            Request.status.in_(
-                [
-                    RequestStatus.OPEN.value,
-                    RequestStatus.IN_PROGRESS.value,
-                    RequestStatus.NEED_INFO.value,
-                ]
-            )
-        ).count()
-
-        # Подсчёт заявок, созданных сегодня
-        from datetime import date, datetime
-
-        today = date.today()
-        today_start = datetime.combine(today, datetime.min.time())
-        today_end = datetime.combine(today, datetime.max.time())
-        today_count = Request.query.filter(
-            Request.created_at >= today_start, Request.created_at <= today_end
-        ).count()
+        # Dashboard cards come from materialized counters, not COUNT(*)
+        counters = snapshot()
 
         return render_template(
             "dashboard.html",
@@ -205,10 +124,7 @@ def dashboard():
             pagination=pagination,
             current_filter=status_filter,
             per_page=per_page,
-            total_requests=total_requests,
-            processed_requests=processed_requests,
-            unprocessed_requests=unprocessed_requests,
-            today_count=today_count,
+            **counters,
         )
 
     except Exception as e:
@@ -295,18 +211,22 @@ def dashboard_search():
     Optimized search across requests with full-text capabilities
     """
     try:
-        query = request.args.get("q", "").strip()
+        raw_query = request.args.get("q", "").strip()
 
         # Validate search query
-        query, valid, error = sanitize_input(query, max_length=100)
+        query, valid, error = sanitize_input(raw_query, max_length=100)
         if not valid:
             return jsonify({"error": error}), 400
 
         if len(query) < 2:
             return jsonify([])
 
+        # Structured filters (object:, status:, created:...) go straight to SQL;
+        # values are bound parameters, so the raw (unescaped) string is parsed
+        parsed = parse_query(raw_query)
+
         # Optimized search query with JOINs
-        search_results = (
+        search_query = (
             Request.query.options(
                 joinedload(Request.object),
                 joinedload(Request.creator),
@@ -314,18 +234,27 @@ def dashboard_search():
             )
             .join(Object)
             .join(User, Request.created_by == User.id)
-            .filter(
+        )
+        search_query = apply_filters(search_query, parsed)
+        if parsed.errors:
+            return jsonify({"error": "; ".join(parsed.errors)}), 400
+        text = parsed.text
+        if text:
+            search_query = search_query.filter(
                 or_(
-                    Object.name.ilike(f"%{query}%"),
-                    Object.address.ilike(f"%{query}%"),
-                    Object.customer.ilike(f"%{query}%"),
-                    User.username.ilike(f"%{query}%"),
-                    Request.status.ilike(f"%{query}%"),
+                    *(
+                        column.icontains(text, autoescape=True)
+                        for column in (
+                            Object.name,
+                            Object.address,
+                            Object.customer,
+                            User.username,
+                            Request.status,
+                        )
+                    )
                 )
             )
-            .limit(20)
-            .all()
-        )
+        search_results = search_query.limit(20).all()
 
         results = []
         for req in search_results:
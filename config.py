@@ -190,6 +190,31 @@ class Config:
     # Прочее
     MIGRATE_ON_START = env("MIGRATE_ON_START", "0")
 
+    # Поиск: построение триграммного индекса при старте, если он пуст
+    SEARCH_INDEX_BUILD_ON_START = _bool(env("SEARCH_INDEX_BUILD_ON_START"), True)
+    # Поиск: полнотекстовый бэкенд (auto — по диалекту движка БД, ngram — без СУБД)
+    SEARCH_BACKEND = env("SEARCH_BACKEND", "auto")
+    # Автодополнение: как часто сверять поколение таблиц (изменения других воркеров)
+    AUTOCOMPLETE_REFRESH_SECONDS = int(env("AUTOCOMPLETE_REFRESH_SECONDS", "5"))
+    # Автодополнение: перестраивать устаревший индекс в фоновом потоке
+    AUTOCOMPLETE_BACKGROUND_REFRESH = _bool(
+        env("AUTOCOMPLETE_BACKGROUND_REFRESH"), True
+    )
+    # Кеш ранжированных результатов поиска дашборда (LRU по байтам)
+    SEARCH_CACHE_ENABLED = _bool(env("SEARCH_CACHE_ENABLED"), True)
+    SEARCH_CACHE_MAX_BYTES = int(env("SEARCH_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+    # Пагинация списков: offset (номера страниц) или keyset (курсоры)
+    PAGINATION_MODE = env("PAGINATION_MODE", "offset")
+    # Сколько секунд итог списка можно показывать без пересчёта COUNT(*)
+    PAGINATION_TOTAL_TTL = int(env("PAGINATION_TOTAL_TTL", "30"))
+    # Модель чтения строк дашборда: собрать при старте, если она пуста
+    REQUEST_SUMMARY_BUILD_ON_START = _bool(env("REQUEST_SUMMARY_BUILD_ON_START"), True)
+    # Кеш данных (utils.cache): memory / sqlite (файл на сервер) / redis
+    CACHE_BACKEND = env("CACHE_BACKEND", "memory")
+    CACHE_SQLITE_PATH = env("CACHE_SQLITE_PATH", "")
+    # Пусто — берётся REDIS_URL
+    CACHE_REDIS_URL = env("CACHE_REDIS_URL", "")
+
     # --------------------------- БД URI сборка -------------------------------
 
     @staticmethod
@@ -5,7 +5,11 @@ from flask_login import UserMixin
 from database import db
 from utils.statuses import RequestStatus
 
+from .dashboard import DashboardCounter, RequestSummary  # noqa: F401
+from .imports import ImportJob  # noqa: F401
 from .op import OpComment, OpFile, OpKPCategory  # noqa: F401
+from .search import SearchKey, SearchNgram, TableGeneration  # noqa: F401
+from .storage import Blob, BlobRef, RequestFile  # noqa: F401
 
 # Определяем таблицу-ассоциацию ДО моделей
 request_contractor = db.Table(
@@ -16,6 +20,20 @@ request_contractor = db.Table(
     ),
 )
 
+# Производители заявки построчно (зеркало Request.manufacturers для SQL-фильтров)
+request_manufacturer = db.Table(
+    "request_manufacturer",
+    db.Column(
+        "request_id",
+        db.Integer,
+        db.ForeignKey("request.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    db.Column("manufacturer", db.String(100), primary_key=True),
+    db.Column("position", db.Integer, nullable=False, default=0),
+    db.Index("ix_request_manufacturer_name", "manufacturer", "request_id"),
+)
+
 
 class User(db.Model, UserMixin):
     __tablename__ = "user"
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from database import db
+
+
+class DashboardCounter(db.Model):
+    """Материализованный счётчик заявок для карточек дашборда.
+
+    Имена: ``total``, ``status:<код>`` и ``created:<ГГГГ-ММ-ДД>``. Значения
+    меняются в той же транзакции, что и заявки, поэтому дашборд читает их
+    одним запросом по первичному ключу вместо ``COUNT(*)`` по таблице.
+    """
+
+    __tablename__ = "dashboard_counter"
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
+class RequestSummary(db.Model):
+    """Строка дашборда: заявка в разрезе одного подрядчика.
+
+    Денормализованная модель чтения: имена объекта, подрядчика и автора,
+    список производителей и битовая маска обработанных (бит ``i`` —
+    ``manufacturers.split(",")[i]`` подтверждён вложением подрядчика).
+    Поддерживается событиями ORM (см. ``utils.request_summary``).
+    """
+
+    __tablename__ = "request_summary"
+
+    id = db.Column(db.Integer, primary_key=True)
+    request_id = db.Column(db.Integer, nullable=False)
+    contractor_id = db.Column(db.Integer, nullable=False)
+    object_id = db.Column(db.Integer, nullable=False)
+    created_by = db.Column(db.Integer, nullable=False)
+    object_name = db.Column(db.String(200), nullable=False, default="")
+    contractor_name = db.Column(db.String(200), nullable=False, default="")
+    creator_name = db.Column(db.String(200), nullable=False, default="")
+    manufacturers = db.Column(db.String(255), nullable=False, default="")
+    processed_mask = db.Column(db.BigInteger, nullable=False, default=0)
+    all_processed = db.Column(db.Boolean, nullable=False, default=False)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index("ix_request_summary_request", "request_id", "contractor_id"),
+        db.Index("ix_request_summary_object", "object_id"),
+        db.Index("ix_request_summary_contractor", "contractor_id"),
+        db.Index("ix_request_summary_creator", "created_by"),
+    )
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from database import db
+
+
+class ImportJob(db.Model):
+    """Фоновый импорт объектов, подрядчиков или заявок из CSV.
+
+    Файл и отчёт об ошибках лежат в ``IMPORT_DIR``; счётчики обновляются
+    после каждой порции, поэтому прогресс виден из любого процесса.
+    """
+
+    __tablename__ = "import_job"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending", index=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    inserted = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    message = db.Column(db.String(500))
+    created_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime)
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from datetime import datetime
 
+from sqlalchemy import insert
+
 from database import db
 
 
@@ -65,33 +67,52 @@ class OpKPCategory(db.Model):
 
     @classmethod
     def ensure_base(cls, object_id: int, user_id: int) -> None:
-        """Создаёт 6 базовых категорий при первом обращении."""
+        """Создаёт 6 базовых категорий на сторону, если у объекта их нет.
 
-        if cls.query.filter_by(object_id=object_id).count() > 0:
-            return
+        Наличие категорий проверяется в БД (индекс по ``object_id``), а не
+        в кеше процесса: удаление в другом воркере видно сразу.
+        """
 
+        exists = (
+            db.session.query(cls.id).filter(cls.object_id == object_id).first()
+            is not None
+        )
+        if exists:
+            return
         names = [f"Категория {i}" for i in range(1, 7)]
-        for side in ("OV", "VK"):
-            for pos, name in enumerate(names, start=1):
-                db.session.add(
-                    cls(
-                        object_id=object_id,
-                        user_id=user_id,
-                        side=side,
-                        name=name,
-                        position=pos,
-                        is_extra=False,
-                    )
-                )
+        db.session.execute(
+            insert(cls),
+            [
+                {
+                    "object_id": object_id,
+                    "user_id": user_id,
+                    "side": side,
+                    "name": name,
+                    "position": pos,
+                    "is_extra": False,
+                }
+                for side in ("OV", "VK")
+                for pos, name in enumerate(names, start=1)
+            ],
+        )
         db.session.commit()
 
     @classmethod
     def for_object(cls, object_id: int, user_id: int) -> list["OpKPCategory"]:
-        """Возвращает категории объекта, создавая базовые при необходимости."""
-
-        cls.ensure_base(object_id, user_id)
-        return (
-            cls.query.filter_by(object_id=object_id)
-            .order_by(cls.side, cls.position)
-            .all()
-        )
+        """Возвращает категории объекта, создавая базовые при необходимости.
+
+        Обычно это один запрос: базовые создаются, только если выборка пуста.
+        """
+
+        def load():
+            return (
+                cls.query.filter_by(object_id=object_id)
+                .order_by(cls.side, cls.position)
+                .all()
+            )
+
+        categories = load()
+        if not categories:
+            cls.ensure_base(object_id, user_id)
+            categories = load()
+        return categories
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from database import db
+
+
+class SearchNgram(db.Model):
+    """Элемент инвертированного триграммного индекса поиска.
+
+    Одна строка — одна триграмма документа сущности (объекта, подрядчика
+    или заявки). Индекс ``(entity, gram)`` позволяет получать кандидатов
+    поиска чтением только нужных списков вхождений, без полного скана таблиц.
+    """
+
+    __tablename__ = "search_ngram"
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    gram = db.Column(db.String(3), nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_search_ngram_entity_gram", "entity", "gram", "entity_id"),
+        db.Index("ix_search_ngram_entity_doc", "entity", "entity_id"),
+    )
+
+
+class SearchKey(db.Model):
+    """Предвычисленные ключи слова для индексного поиска по префиксу и звучанию.
+
+    Одна строка — одно слово поля сущности: нормализованная форма
+    (нижний регистр, ``ё`` → ``е``), транслитерация латиницей и фонетический
+    ключ (metaphone от транслитерации). Поиск по ним — это пробы индексов,
+    а не вычисления в Python для каждой строки.
+    """
+
+    __tablename__ = "search_key"
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    field = db.Column(db.String(50), nullable=False)
+    word = db.Column(db.String(100), nullable=False)
+    translit = db.Column(db.String(200), nullable=False)
+    phonetic = db.Column(db.String(100))
+
+    __table_args__ = (
+        db.Index("ix_search_key_entity_word", "entity", "word"),
+        db.Index("ix_search_key_entity_translit", "entity", "translit"),
+        db.Index("ix_search_key_entity_phonetic", "entity", "phonetic"),
+        db.Index("ix_search_key_entity_doc", "entity", "entity_id"),
+    )
+
+
+class TableGeneration(db.Model):
+    """Счётчик поколений таблицы для инвалидации кешей.
+
+    Увеличивается после коммита записи, отдельной короткой транзакцией
+    (``utils.search_cache``), чтобы строка счётчика не блокировалась на всё
+    время транзакции писателя. Между коммитом данных и коммитом счётчика
+    другой воркер может ещё отдать из кеша устаревший результат; окно
+    ограничено этой короткой транзакцией.
+    """
+
+    __tablename__ = "table_generation"
+
+    name = db.Column(db.String(50), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
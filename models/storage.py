@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from database import db
+
+
+class Blob(db.Model):
+    """Содержимое загруженного файла в хранилище по sha256.
+
+    Файл лежит один раз (``<BLOB_STORE_DIR>/ab/cd/<sha256>``), ``refcount`` —
+    число ссылок ``BlobRef``. Блобы без ссылок удаляет ``cleanup:uploads``.
+    """
+
+    __tablename__ = "blob"
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class BlobRef(db.Model):
+    """Ссылка на блоб из файла заявки, вложения или файла OP.
+
+    ``path`` — ключ ссылки в том виде, в каком его хранит владелец:
+    ``uploads/<id>/<имя>`` для ``Request.file_path`` и
+    ``Attachment.screenshot``, ``op/<имя>`` для ``OpFile.filename``.
+    """
+
+    __tablename__ = "blob_ref"
+
+    path = db.Column(db.String(500), primary_key=True)
+    sha256 = db.Column(
+        db.String(64), db.ForeignKey("blob.sha256"), nullable=False, index=True
+    )
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class RequestFile(db.Model):
+    """Файл заявки или скриншот вложения в каталоге ``uploads/<id>``.
+
+    Заполняется при загрузке (``flask files:backfill`` — для старых файлов),
+    чтобы страница заявки, удаление и очистка не читали каталог с диска.
+    """
+
+    __tablename__ = "request_file"
+
+    id = db.Column(db.Integer, primary_key=True)
+    request_id = db.Column(
+        db.Integer, db.ForeignKey("request.id"), nullable=False, index=True
+    )
+    # Ключ как у BlobRef: ``uploads/<id>/<имя>``
+    path = db.Column(db.String(500), nullable=False, unique=True)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    sha256 = db.Column(db.String(64), index=True)
+    mime = db.Column(db.String(100))
+    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    request = db.relationship(
+        "Request",
+        backref=db.backref(
+            "files", lazy="select", cascade="all, delete-orphan", order_by=id
+        ),
+    )
+
+    @property
+    def filename(self) -> str:
+        return self.path.rsplit("/", 1)[-1]
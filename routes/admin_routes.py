@@ -586,6 +586,23 @@ def system_page():
 
     redis_available = bool(current_app.config.get("REDIS_AVAILABLE", False))
 
+    from utils.search_cache import all_cache_stats
+
+    caches = [
+        {
+            **stats,
+            "size": _human_size(stats["bytes"]),
+            # Кеши TTLCache ограничены числом записей, а не байтами
+            "max_size": (
+                _human_size(stats["max_bytes"])
+                if stats["max_bytes"]
+                else f"{stats['max_entries']} зап."
+            ),
+            "hit_percent": round(stats["hit_ratio"] * 100, 1),
+        }
+        for stats in all_cache_stats()
+    ]
+
     data = {
         "generated_at": datetime.now().strftime("%d.%m.%Y %H:%M:%S"),
         "os_pretty": platform.platform(),
@@ -657,6 +674,7 @@ def system_page():
             "top_tables": top_tables,
         },
         "redis_available": redis_available,
+        "caches": caches,
     }
 
     return render_template("admin/system.html", data=data)
@@ -7,11 +7,13 @@ import time
 from datetime import datetime
 
 from flask import Blueprint, Response, current_app, jsonify, request, url_for
-from flask_login import login_required, login_user
+from flask_login import current_user, login_required, login_user
+from sqlalchemy.exc import SQLAlchemyError
 from werkzeug.security import check_password_hash
 
-from models import Contractor, Object, Request, User
+from models import Contractor, Object, Request, User, db
 from utils.cache import prepare_cache
+from utils.request_batch import BatchError, create_requests, items_from_json
 from utils.request_helpers import get_request_contractor
 
 api_v1_bp = Blueprint("api_v1", __name__)
@@ -445,3 +447,53 @@ def api_requests_by_object(object_id):
             ),
             500,
         )
+
+
+@api_v1_bp.route("/requests:batch", methods=["POST"])
+@login_required
+def api_requests_batch():
+    """Пакетное создание заявок для интеграций.
+
+    Тело проверяется схемой ``request_batch``; пакет создаётся целиком или
+    не создаётся вовсе (400 с ошибками по индексам позиций).
+    """
+    if current_user.role == "demo":
+        return jsonify({"error": "В демо-режиме отправка заявок недоступна."}), 403
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get("requests"), list):
+        return jsonify({"error": "Ожидается JSON с полем requests"}), 400
+    try:
+        created = create_requests(items_from_json(payload), current_user.id)
+    except BatchError as exc:
+        db.session.rollback()
+        return jsonify({"error": str(exc), "errors": exc.errors}), 400
+    except SQLAlchemyError:
+        db.session.rollback()
+        current_app.logger.exception("Ошибка пакетного создания заявок")
+        return jsonify({"error": "Ошибка при создании заявок"}), 500
+
+    current_app.logger.info(
+        f"Создано заявок пакетом: {len(created)} пользователем "
+        f"{current_user.username}"
+    )
+    return (
+        jsonify(
+            {
+                "data": [
+                    {
+                        "id": req.id,
+                        "object_id": req.object_id,
+                        "contractor_id": req.contractor_id,
+                        "links": {
+                            "self": url_for(
+                                "request_crud.view_request", id=req.id, _external=True
+                            )
+                        },
+                    }
+                    for req in created
+                ],
+                "count": len(created),
+            }
+        ),
+        201,
+    )
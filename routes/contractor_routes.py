@@ -18,8 +18,14 @@ from flask_login import current_user, login_required
 from sqlalchemy import func
 
 from models import Contractor, Request, db
-from routes.search_routes import search_with_multiple_fields
 from security_utils import safe_log
+from utils.pagination import (
+    cached_count,
+    keyset_paginate,
+    keyset_requested,
+    offset_paginate,
+)
+from utils.search_backend import search_entity_ids
 
 contractor_bp = Blueprint("contractor", __name__)
 
@@ -39,15 +45,9 @@ def contractors():
 
         # Применяем поиск, если есть
         if search:
-            # спользуем продвинутый поиск по нескольким полям
-            all_contractors = query.all()
-            search_fields = ["name", "inn", "contact_person", "phone", "email"]
-            filtered_contractors = search_with_multiple_fields(
-                search, all_contractors, search_fields, threshold=0.4
-            )
-
-            # Получаем ID отфильтрованных подрядчиков
-            filtered_ids = [cont[0].id for cont in filtered_contractors]
+            # Кандидаты отбирает полнотекстовый индекс БД, нечёткий скорер
+            # переранжирует только их
+            filtered_ids = search_entity_ids("contractor", search, threshold=0.4)
 
             # Применяем фильтр к основному запросу
             if filtered_ids:
@@ -72,9 +72,25 @@ def contractors():
                 if hasattr(Contractor, field):
                     query = query.filter(getattr(Contractor, field) == value)
 
-        pagination = query.order_by(sort_col).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        # Итог кешируется; по дате создания доступен keyset-режим с курсорами
+        total = cached_count(query)
+        if sort not in sort_columns or sort == "created_at":
+            sort_key = (Contractor.created_at, Contractor.id)
+        else:
+            sort_key = None
+        if sort_key and keyset_requested():
+            pagination = keyset_paginate(
+                query,
+                sort_key,
+                request.args.get("cursor"),
+                per_page,
+                total,
+                descending=order == "desc",
+            )
+        else:
+            pagination = offset_paginate(
+                query.order_by(sort_col, Contractor.id), page, per_page, total
+            )
         contractors = pagination.items
 
         # Оптимизированный подсчёт заявок для всех подрядчиков на странице
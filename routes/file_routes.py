@@ -15,8 +15,9 @@ from flask import (
 from flask_login import current_user, login_required
 from werkzeug.utils import safe_join
 
-from models import Attachment, db
+from models import Attachment, RequestFile, db
 from security_utils import safe_log
+from utils import blob_store, request_files
 
 file_bp = Blueprint("files", __name__)
 
@@ -47,23 +48,17 @@ def delete_screenshot(attachment_id):
             )
             return jsonify({"error": "Недостаточно прав для удаления"}), 403
 
-        # Удаляем файл с диска
-        if attachment.screenshot:
-            file_path = os.path.join(
-                current_app.root_path, "static", attachment.screenshot
-            )
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except OSError as e:
-                    current_app.logger.warning(
-                        f"Could not delete file {file_path}: {str(e)}"
-                    )
-
         # Удаляем запись из базы
+        screenshot = attachment.screenshot
+        blob_store.release([screenshot])
+        RequestFile.query.filter_by(path=screenshot).delete()
         db.session.delete(attachment)
         db.session.commit()
 
+        # Файл с диска — только после коммита
+        if screenshot:
+            request_files.remove_files([screenshot])
+
         safe_log(
             current_app.logger,
             logging.INFO,
@@ -0,0 +1,78 @@
+"""Импорт объектов, подрядчиков и заявок из CSV."""
+
+from __future__ import annotations
+
+import os
+
+from flask import Blueprint, abort, current_app, jsonify, request, send_file, url_for
+from flask_login import current_user, login_required
+
+from models import ImportJob, db
+from utils import bulk_import
+
+import_bp = Blueprint("imports", __name__)
+
+
+def _job_or_404(job_id: int) -> ImportJob:
+    job = db.session.get(ImportJob, job_id)
+    if job is None:
+        abort(404)
+    if current_user.role != "admin" and job.created_by != current_user.id:
+        abort(403)
+    return job
+
+
+def _job_response(job: ImportJob) -> dict:
+    data = bulk_import.job_data(job)
+    data["links"] = {"self": url_for("imports.import_status", job_id=job.id)}
+    if data["has_report"]:
+        data["links"]["errors"] = url_for("imports.import_errors", job_id=job.id)
+    return data
+
+
+@import_bp.route("/<kind>", methods=["POST"])
+@login_required
+def import_upload(kind):
+    """Принимает файл (поле ``file``) и ставит импорт в фон; 202 со ссылкой."""
+    if current_user.role != "admin":
+        return jsonify({"error": "Импорт доступен только администратору"}), 403
+    upload = request.files.get("file")
+    if upload is None or not upload.filename:
+        return jsonify({"error": "Файл не выбран"}), 400
+    try:
+        job = bulk_import.create_job(
+            kind, upload.filename, upload.stream, current_user.id
+        )
+    except bulk_import.ImportFormatError as exc:
+        db.session.rollback()
+        return jsonify({"error": str(exc)}), 400
+    current_app.logger.info(
+        f"Импорт {job.id} ({kind}) из {job.filename} запущен пользователем "
+        f"{current_user.username}"
+    )
+    bulk_import.start(job)
+    return jsonify(_job_response(job)), 202
+
+
+@import_bp.route("/<int:job_id>", methods=["GET"])
+@login_required
+def import_status(job_id):
+    """Прогресс и итоги импорта."""
+    return jsonify(_job_response(_job_or_404(job_id)))
+
+
+@import_bp.route("/<int:job_id>/errors", methods=["GET"])
+@login_required
+def import_errors(job_id):
+    """CSV со строками, которые не были импортированы, и причинами."""
+    job = _job_or_404(job_id)
+    path = bulk_import.report_path(job)
+    if not os.path.exists(path):
+        abort(404)
+    name = os.path.splitext(job.filename)[0]
+    return send_file(
+        path,
+        mimetype="text/csv",
+        as_attachment=True,
+        download_name=f"{name}-errors.csv",
+    )
@@ -16,7 +16,7 @@ from flask import (
 )
 from flask_login import current_user, login_required
 
-from models import Contractor, Object, Request, User, db
+from models import Request, db
 from security_utils import safe_log, validate_password_strength
 from utils.statuses import RequestStatus
 
@@ -81,281 +81,75 @@ def dashboard():
         if my_requests_only:
             query = query.filter_by(created_by=current_user.id)
 
-        # Поиск
-        request_order = {}  # нициализируем по умолчанию
+        # Поиск: фильтры вида ключ:значение уходят в SQL; нечётко ранжируется
+        # только свободный текст и только среди отфильтрованных заявок
+        free_text = ""
         if search_query:
-            from routes.search_routes import search_with_multiple_fields
-
-            # Получаем все заявки для поиска
-            all_requests = query.all()
-
-            # Подготавливаем данные для расширенного поиска
-            enhanced_requests = []
-
-            # Предварительно загружаем связанные данные для поиска
-            if all_requests:
-                request_ids = [req.id for req in all_requests]
-                object_ids = list(set(req.object_id for req in all_requests))
-
-                # Загружаем объекты
-                objects_dict = {
-                    obj.id: obj
-                    for obj in db.session.query(Object)
-                    .filter(Object.id.in_(object_ids))
-                    .all()
-                }
-
-                # Загружаем подрядчиков
-                contractor_ids = set()
-                for req in all_requests:
-                    contractor_ids.update(req.contractor_ids_list)
-                contractor_ids = list(contractor_ids)
-
-                contractors_dict = {
-                    c.id: c
-                    for c in db.session.query(Contractor)
-                    .filter(Contractor.id.in_(contractor_ids))
-                    .all()
-                }
-
-                # Создаем расширенные объекты для поиска
-                for req in all_requests:
-                    obj = objects_dict.get(req.object_id)
-
-                    # Собираем имена подрядчиков для этой заявки
-                    contractor_names = []
-                    for cid in req.contractor_ids_list:
-                        contractor = contractors_dict.get(cid)
-                        if contractor:
-                            contractor_names.append(contractor.name)
-
-                    # Создаем объект с дополнительными полями для поиска
-                    enhanced_req = type(
-                        "EnhancedRequest",
-                        (),
-                        {
-                            "id": req.id,
-                            "original_request": req,
-                            "object_name": obj.name if obj else "",
-                            "object_address": obj.address if obj else "",
-                            "object_customer": obj.customer if obj else "",
-                            "manufacturers": req.manufacturers or "",
-                            "contractor_names": " ".join(contractor_names),
-                            "combined_search_text": " ".join(
-                                filter(
-                                    None,
-                                    [
-                                        obj.name if obj else "",
-                                        obj.address if obj else "",
-                                        obj.customer if obj else "",
-                                        req.manufacturers or "",
-                                        " ".join(contractor_names),
-                                    ],
-                                )
-                            ),
-                        },
-                    )()
-
-                    enhanced_requests.append(enhanced_req)
-
-            # спользуем продвинутый поиск с низким порогом для гибкости
-            search_fields = [
-                "object_name",
-                "object_address",
-                "object_customer",
-                "manufacturers",
-                "contractor_names",
-                "combined_search_text",
-            ]
-
-            search_results = search_with_multiple_fields(
-                search_query, enhanced_requests, search_fields, threshold=0.3
+            from utils.search_query import apply_filters, parse_query
+
+            parsed = parse_query(search_query)
+            query = apply_filters(query, parsed)
+            free_text = parsed.text
+            for error in parsed.errors:
+                flash(error, "warning")
+
+        # Свободный текст: RERANK_LIMIT самых релевантных кандидатов из
+        # полнотекстового индекса БД, переранжированных нечётким скорером
+        if free_text:
+            from utils.search_backend import search_requests_page
+            from utils.search_cache import results_key
+
+            # Ранжированный список кешируется: следующие страницы — срез из кеша
+            cache_key = results_key(
+                free_text,
+                (status_filter, my_requests_only, parsed.cache_key()),
+                current_user.id if my_requests_only else None,
             )
-
-            # Получаем ID найденных заявок
-            if search_results:
-                found_request_ids = [result[0].id for result in search_results]
-                query = Request.query.filter(Request.id.in_(found_request_ids))
-
-                # Сохраняем порядок релевантности
-                request_order = {
-                    req_id: i for i, req_id in enumerate(found_request_ids)
-                }
-            else:
-                # Если нет совпадений, возвращаем пустой результат
-                query = Request.query.filter(Request.id == -1)
-                request_order = {}
-
-        # Пагинация с оптимизированными запросами
-        if search_query and "request_order" in locals() and request_order:
-            # Для поисковых результатов сортируем по релевантности
-            requests_with_relevance = query.all()
-
-            # Сортируем по релевантности
-            requests_with_relevance.sort(key=lambda x: request_order.get(x.id, 999))
-
-            # Ручная пагинация для поисковых результатов
-            total_items = len(requests_with_relevance)
-            start_idx = (page - 1) * per_page
-            end_idx = start_idx + per_page
-            requests = requests_with_relevance[start_idx:end_idx]
-
-            # Создаем объект пагинации вручную
-            class ManualPagination:
-                def __init__(self, items, page, per_page, total):
-                    self.items = items
-                    self.page = page
-                    self.per_page = per_page
-                    self.total = total
-                    self.pages = (total + per_page - 1) // per_page if total > 0 else 1
-                    self.has_prev = page > 1
-                    self.has_next = page < self.pages
-                    self.prev_num = page - 1 if self.has_prev else None
-                    self.next_num = page + 1 if self.has_next else None
-
-                def iter_pages(
-                    self, left_edge=2, left_current=2, right_current=3, right_edge=2
-                ):
-                    last = self.pages
-                    for num in range(1, last + 1):
-                        if (
-                            num <= left_edge
-                            or (
-                                self.page - left_current - 1
-                                < num
-                                < self.page + right_current
-                            )
-                            or num > last - right_edge
-                        ):
-                            yield num
-
-            pagination = ManualPagination(requests, page, per_page, total_items)
-        else:
-            # Обычная пагинация для не-поисковых запросов
-            pagination = query.order_by(Request.created_at.desc()).paginate(
-                page=page, per_page=per_page, error_out=False
+            pagination = search_requests_page(
+                query, free_text, page, per_page, threshold=0.3, cache_key=cache_key
             )
             requests = pagination.items
-
-        # Оптимизированная загрузка связанных данных
-        if requests:
-            # Собираем все ID за один проход
-            contractor_ids = set()
-            object_ids = {req.object_id for req in requests}
-            request_ids = [req.id for req in requests]
-            creator_ids = {
-                req.created_by for req in requests
-            }  # Авторов собираем отдельно
-
-            for req in requests:
-                contractor_ids.update(req.contractor_ids_list)
-
-            # Загружаем данные одним запросом
-            contractors = {
-                c.id: c
-                for c in Contractor.query.filter(
-                    Contractor.id.in_(contractor_ids)
-                ).all()
-            }
-            objects = {
-                o.id: o for o in Object.query.filter(Object.id.in_(object_ids)).all()
-            }
-            users = {u.id: u for u in User.query.filter(User.id.in_(creator_ids)).all()}
-
-            # Загружаем вложения одним запросом
-            from models import Attachment
-
-            attachments = Attachment.query.filter(
-                Attachment.request_id.in_(request_ids)
-            ).all()
-            attachment_map = {}
-            for att in attachments:
-                key = (att.request_id, att.contractor_id)
-                if key not in attachment_map:
-                    attachment_map[key] = set()
-                attachment_map[key].add(att.manufacturer)
         else:
-            contractors = {}
-            objects = {}
-            users = {}
-            attachment_map = {}
-
-        # Формируем строки для отображения
-        table_rows = []
-        for req in requests:
-            obj = objects.get(req.object_id)
-            obj_name = obj.name if obj else "Без объекта"
-
-            for cid in req.contractor_ids_list:
-                contractor = contractors.get(cid)
-                contractor_name = contractor.name if contractor else "Неизвестно"
-
-                # Все производители в заявке
-                all_manufacturers = req.manufacturers_list
-
-                # Обработанные производители для этого подрядчика
-                processed_manufacturers = attachment_map.get((req.id, cid), set())
-
-                # Формируем строки с цветами
-                manufacturer_badges = []
-                for mfr in all_manufacturers:
-                    is_processed = mfr in processed_manufacturers
-                    manufacturer_badges.append(
-                        {"name": mfr, "is_processed": is_processed}
-                    )
-
-                # Определяем статус заявки
-                all_processed = True
-                for other_cid in req.contractor_ids_list:
-                    other_key = (req.id, other_cid)
-                    other_processed = attachment_map.get(other_key, set())
-                    other_manufacturers = set(req.manufacturers_list)
-                    if not other_manufacturers.issubset(other_processed):
-                        all_processed = False
-                        break
-
-                display_status = req.status
-
-                creator = users.get(req.created_by)
-                creator_name = creator.username if creator else "Неизвестно"
-
-                table_rows.append(
-                    {
-                        "request": req,
-                        "contractor": contractor,
-                        "contractor_name": contractor_name,
-                        "object_name": obj_name,
-                        "creator_name": creator_name,
-                        "manufacturer_badges": manufacturer_badges,
-                        "created_at": req.created_at,
-                        "status": display_status,
-                    }
+            from utils.dashboard_counters import status_total
+            from utils.pagination import (
+                cached_count,
+                keyset_paginate,
+                keyset_requested,
+                offset_paginate,
+            )
+
+            # Итог для номеров страниц: счётчики дашборда или кешированный COUNT
+            total = None
+            if not my_requests_only and not search_query:
+                total = status_total(status_filter)
+            if total is None:
+                total = cached_count(query)
+            if keyset_requested():
+                pagination = keyset_paginate(
+                    query,
+                    (Request.created_at, Request.id),
+                    request.args.get("cursor"),
+                    per_page,
+                    total,
                 )
+            else:
+                pagination = offset_paginate(
+                    query.order_by(Request.created_at.desc(), Request.id.desc()),
+                    page,
+                    per_page,
+                    total,
+                )
+            requests = pagination.items
 
-        # Подсчёт заявок, созданных сегодня
-        from datetime import date, datetime
-
-        today = date.today()
-        today_start = datetime.combine(today, datetime.min.time())
-        today_end = datetime.combine(today, datetime.max.time())
-        today_count = Request.query.filter(
-            Request.created_at >= today_start, Request.created_at <= today_end
-        ).count()
-
-        # Подсчёт общей статистики из базы данных (не из пагинированных данных)
-        total_requests = Request.query.count()
-        processed_requests = Request.query.filter_by(
-            status=RequestStatus.DONE.value
-        ).count()
-        unprocessed_requests = Request.query.filter(
-            Request.status.in_(
-                [
-                    RequestStatus.OPEN.value,
-                    RequestStatus.IN_PROGRESS.value,
-                    RequestStatus.NEED_INFO.value,
-                ]
-            )
-        ).count()
+        # Строки таблицы: готовые пары (заявка, подрядчик) из модели чтения
+        from utils.request_summary import dashboard_rows
+
+        table_rows = dashboard_rows(requests)
+
+        # Карточки статистики: материализованные счётчики вместо COUNT(*)
+        from utils.dashboard_counters import snapshot
+
+        counters = snapshot()
 
         return render_template(
             "dashboard.html",
@@ -363,10 +157,7 @@ def dashboard():
             pagination=pagination,
             current_filter=status_filter,
             per_page=per_page,
-            today_count=today_count,
-            total_requests=total_requests,
-            processed_requests=processed_requests,
-            unprocessed_requests=unprocessed_requests,
+            **counters,
             search_query=search_query,
             my_requests_only=my_requests_only,
         )
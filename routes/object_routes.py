@@ -19,8 +19,14 @@ from sqlalchemy import func
 
 from models import Object, Request, db
 from models.op import OpComment, OpFile, OpKPCategory
-from routes.search_routes import search_with_multiple_fields
 from security_utils import safe_log
+from utils.pagination import (
+    cached_count,
+    keyset_paginate,
+    keyset_requested,
+    offset_paginate,
+)
+from utils.search_backend import search_entity_ids
 
 object_bp = Blueprint("object", __name__)
 
@@ -40,15 +46,9 @@ def objects():
 
         # Применяем поиск, если есть
         if search:
-            # спользуем продвинутый поиск по нескольким полям
-            all_objects = query.all()
-            search_fields = ["name", "address", "customer"]
-            filtered_objects = search_with_multiple_fields(
-                search, all_objects, search_fields, threshold=0.4
-            )
-
-            # Получаем ID отфильтрованных объектов
-            filtered_ids = [obj[0].id for obj in filtered_objects]
+            # Кандидаты отбирает полнотекстовый индекс БД, нечёткий скорер
+            # переранжирует только их
+            filtered_ids = search_entity_ids("object", search, threshold=0.4)
 
             # Применяем фильтр к основному запросу
             if filtered_ids:
@@ -73,9 +73,25 @@ def objects():
                 if hasattr(Object, field):
                     query = query.filter(getattr(Object, field) == value)
 
-        pagination = query.order_by(sort_col).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        # Итог кешируется; по дате создания доступен keyset-режим с курсорами
+        total = cached_count(query)
+        if sort not in sort_columns or sort == "created_at":
+            sort_key = (Object.created_at, Object.id)
+        else:
+            sort_key = None
+        if sort_key and keyset_requested():
+            pagination = keyset_paginate(
+                query,
+                sort_key,
+                request.args.get("cursor"),
+                per_page,
+                total,
+                descending=order == "desc",
+            )
+        else:
+            pagination = offset_paginate(
+                query.order_by(sort_col, Object.id), page, per_page, total
+            )
         objects = pagination.items
 
         # Оптимизированный подсчет заявок
@@ -2,10 +2,11 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
 import mimetypes
 import os
-import time
 import uuid
 from typing import Any
 
@@ -14,17 +15,28 @@ from flask import (
     abort,
     current_app,
     jsonify,
-    render_template,
     request,
     send_from_directory,
 )
 from flask_login import current_user, login_required
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import selectinload
 from werkzeug.utils import safe_join, secure_filename
 
 from models import Object, OpComment, OpFile, OpKPCategory, Request, User, db
 from security_utils import safe_log
+from utils import blob_store
+from utils.cache import TTLCache
+from utils.comment_threads import (
+    DEFAULT_LIMIT,
+    load_comments,
+    page_args,
+    render_comment,
+)
 from utils.constants import MANUFACTURERS
+from utils.pagination import decode_cursor, encode_cursor
 from utils.request_helpers import get_request_contractor
+from utils.request_manufacturers import group_counts, has_manufacturer
 
 op_api_bp = Blueprint("op_api", __name__)
 
@@ -37,7 +49,12 @@ ALLOWED_EXTENSIONS = {
     ".jpeg": "image/jpeg",
 }
 CACHE_TTL = 45  # секунды
-_GROUPS_CACHE: dict[tuple[int, tuple[str, ...]], tuple[float, list[Any]]] = {}
+MAX_BATCH_OBJECTS = 100
+KP_SIDES = ("OV", "VK")
+KP_BULK_FIELDS = ("name", "invoice_number")
+BUNDLE_SECTIONS = ("groups", "requests", "comments", "files", "kp")
+# Группы производителей по объекту; сбрасываются записью заявок объекта
+GROUPS_CACHE = TTLCache("op_groups", ttl=CACHE_TTL, max_entries=2048)
 MANUFACTURER_SIDES: dict[str, str | None] = {
     m: ("OV" if "ОВ" in m.upper() else "VK" if "ВК" in m.upper() else None)
     for m in MANUFACTURERS
@@ -53,13 +70,60 @@ def _check_role(allow_demo: bool = False) -> None:
 
 
 def _upload_dir() -> str:
-    path = current_app.config.get(
-        "OP_UPLOAD_DIR", os.path.join(current_app.root_path, "uploads", "op")
-    )
+    path = blob_store.op_upload_dir()
     os.makedirs(path, exist_ok=True)
     return path
 
 
+def _csv_args(name: str, upper: bool = False) -> tuple[str, ...]:
+    """Значения параметра вида ?name=A,B или ?name=A&name=B."""
+    values: list[str] = []
+    for raw in request.args.getlist(name):
+        for item in raw.split(","):
+            item = item.strip()
+            if item:
+                values.append(item.upper() if upper else item)
+    return tuple(values)
+
+
+def _group_names(sides: tuple[str, ...]) -> list[str]:
+    """Производители из шага 3, видимые при фильтре по сторонам OV/VK."""
+    return [
+        name
+        for name in sorted(MANUFACTURERS, key=lambda x: x.lower())
+        if not sides or MANUFACTURER_SIDES.get(name) in (None, *sides)
+    ]
+
+
+def _groups_for_objects(
+    object_ids: list[int], statuses: tuple[str, ...], sides: tuple[str, ...]
+) -> dict[int, list[dict[str, Any]]]:
+    """Группы производителей для объектов; недостающие — одним запросом."""
+    result: dict[int, list[dict[str, Any]]] = {}
+    missing: list[int] = []
+    for object_id in object_ids:
+        cached = GROUPS_CACHE.get((object_id, statuses, sides))
+        if cached is not None:
+            result[object_id] = cached
+        else:
+            missing.append(object_id)
+    if missing:
+        names = _group_names(sides)
+        counts = group_counts(missing, statuses, names)
+        for object_id in missing:
+            per_object = counts.get(object_id, {})
+            # Полный список: все производители из шага 3, даже если 0 заявок
+            groups = [
+                {"id": name, "name": name, "count": per_object.get(name, 0)}
+                for name in names
+            ]
+            GROUPS_CACHE.set(
+                (object_id, statuses, sides), groups, tags=[f"object:{object_id}"]
+            )
+            result[object_id] = groups
+    return result
+
+
 @op_api_bp.route("/api/op/<int:object_id>/groups")
 @login_required
 def op_groups(object_id: int):
@@ -70,76 +134,43 @@ def op_groups(object_id: int):
     Поддерживается фильтрация по статусам и сторонам ОВ/ВК.
     """
     _check_role(allow_demo=True)
+    statuses = _csv_args("status")
+    sides = _csv_args("side", upper=True)
+    return jsonify(_groups_for_objects([object_id], statuses, sides)[object_id])
 
-    # Поддержка множественных статусов в виде ?status=A,B или ?status=A&status=B
-    raw_statuses = request.args.getlist("status")
-    statuses: list[str] = []
-    for rs in raw_statuses:
-        statuses.extend([s.strip() for s in rs.split(",") if s.strip()])
-    statuses_t = tuple(statuses)
-
-    # Фильтр по сторонам (OV/VK) в формате ?side=OV или ?side=OV,VK
-    raw_sides = request.args.getlist("side")
-    sides: list[str] = []
-    for rs in raw_sides:
-        sides.extend([s.strip().upper() for s in rs.split(",") if s.strip()])
-    sides_t = tuple(sides)
-
-    cache_key = (object_id, statuses_t, sides_t)
-    now = time.time()
-    cached = _GROUPS_CACHE.get(cache_key)
-    if cached and now - cached[0] < CACHE_TTL:
-        return jsonify(cached[1])
-
-    # Собираем все заявки по объекту и считаем по производителям
-    q = db.session.query(Request.manufacturers).filter(Request.object_id == object_id)
-    if statuses_t:
-        q = q.filter(Request.status.in_(statuses_t))
-
-    counts: dict[str, int] = {}
-    for (manufacturers_str,) in q.all():
-        if not manufacturers_str:
-            continue
-        for raw in manufacturers_str.split(","):
-            name = (raw or "").strip()
-            if not name or name not in MANUFACTURERS:
-                continue
-            m_side = MANUFACTURER_SIDES.get(name)
-            if sides_t and m_side and m_side not in sides_t:
-                continue
-            counts[name] = counts.get(name, 0) + 1
-
-    # Формируем полный список: все производители из шага 3, даже если 0 заявок
-    groups: list[dict[str, Any]] = []
-    for m_name in sorted(MANUFACTURERS, key=lambda x: x.lower()):
-        m_side = MANUFACTURER_SIDES.get(m_name)
-        if sides_t and m_side and m_side not in sides_t:
-            continue
-        cnt = counts.get(m_name, 0)
-        groups.append({"id": m_name, "name": m_name, "count": cnt})
-
-    _GROUPS_CACHE[cache_key] = (now, groups)
-    return jsonify(groups)
 
-
-@op_api_bp.route("/api/op/<int:object_id>/requests")
+@op_api_bp.route("/api/op/groups")
 @login_required
-def op_requests(object_id: int):
-    """Список заявок по объекту с учётом фильтров, используемых в OP."""
-    _check_role(allow_demo=True)
-    Object.query.get_or_404(object_id)
+def op_groups_batch():
+    """Группы производителей сразу для нескольких объектов.
 
-    raw_statuses = request.args.getlist("status")
-    statuses: list[str] = []
-    for rs in raw_statuses:
-        statuses.extend([s.strip() for s in rs.split(",") if s.strip()])
+    Принимает ``?objects=1,2,3`` (не более ``MAX_BATCH_OBJECTS``) и те же
+    фильтры, что и ``op_groups``; возвращает ``{object_id: [группы]}``.
+    """
+    _check_role(allow_demo=True)
+    object_ids: list[int] = []
+    for raw in _csv_args("objects"):
+        try:
+            object_id = int(raw)
+        except ValueError:
+            return jsonify({"error": f"Некорректный id объекта: {raw}"}), 400
+        if object_id not in object_ids:
+            object_ids.append(object_id)
+    if len(object_ids) > MAX_BATCH_OBJECTS:
+        return (
+            jsonify({"error": f"Не более {MAX_BATCH_OBJECTS} объектов за запрос"}),
+            400,
+        )
+    groups = _groups_for_objects(
+        object_ids, _csv_args("status"), _csv_args("side", upper=True)
+    )
+    return jsonify({str(object_id): items for object_id, items in groups.items()})
 
-    raw_sides = request.args.getlist("side")
-    sides: list[str] = []
-    for rs in raw_sides:
-        sides.extend([s.strip().upper() for s in rs.split(",") if s.strip()])
-    sides_set = {s for s in sides if s}
 
+def _requests_page(object_id: int) -> dict[str, Any]:
+    """Страница заявок объекта по фильтрам из параметров запроса."""
+    statuses = _csv_args("status")
+    sides = set(_csv_args("side", upper=True))
     manufacturer = (request.args.get("manufacturer") or "").strip()
 
     try:
@@ -154,28 +185,34 @@ def op_requests(object_id: int):
         offset = 0
     offset = max(0, offset)
 
-    query = Request.query.filter(Request.object_id == object_id)
+    query = Request.query.options(selectinload(Request.contractors)).filter(
+        Request.object_id == object_id
+    )
     if statuses:
-        query = query.filter(Request.status.in_(tuple(statuses)))
+        query = query.filter(Request.status.in_(statuses))
     if manufacturer:
-        query = query.filter(Request.manufacturers.contains(manufacturer))
+        query = query.filter(has_manufacturer([manufacturer]))
+    if sides:
+        query = query.filter(
+            has_manufacturer(
+                m for m, side in MANUFACTURER_SIDES.items() if side in sides
+            )
+        )
 
-    requests = query.order_by(Request.id.desc()).all()
+    cursor = decode_cursor(request.args.get("cursor"))
+    if cursor is not None and cursor[0] == "next" and len(cursor[1]) == 1:
+        query = query.filter(Request.id < cursor[1][0])
+        offset = 0
+    # На одну строку больше: есть ли следующая страница, без COUNT
+    rows = query.order_by(Request.id.desc()).offset(offset).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
     result: list[dict[str, Any]] = []
-    for req in requests:
+    for req in rows:
         manufacturers_list = [
             item.strip() for item in req.manufacturers_list if item.strip()
         ]
-        if manufacturer and manufacturer not in manufacturers_list:
-            continue
-        if sides_set:
-            if not any(
-                MANUFACTURER_SIDES.get(item) in sides_set
-                for item in manufacturers_list
-                if item in MANUFACTURERS
-            ):
-                continue
         contractors = get_request_contractor(req)
         result.append(
             {
@@ -189,39 +226,39 @@ def op_requests(object_id: int):
             }
         )
 
-    paginated = result[offset : offset + limit]
-    has_more = len(result) > offset + limit
-    return jsonify({"data": paginated, "has_more": has_more})
+    next_cursor = encode_cursor([rows[-1].id]) if has_more else None
+    return {"data": result, "has_more": has_more, "next_cursor": next_cursor}
+
+
+@op_api_bp.route("/api/op/<int:object_id>/requests")
+@login_required
+def op_requests(object_id: int):
+    """Список заявок по объекту с учётом фильтров, используемых в OP.
+
+    Все фильтры и страница выполняются в БД. Следующая страница — по
+    ``offset`` или по непрозрачному ``cursor`` из ``next_cursor`` ответа
+    (курсор важнее ``offset`` и не сдвигается при добавлении новых заявок).
+    """
+    _check_role(allow_demo=True)
+    Object.query.get_or_404(object_id)
+    return jsonify(_requests_page(object_id))
 
 
 @op_api_bp.route("/api/op/<int:object_id>/comments")
 @login_required
 def op_comments(object_id: int):
-    """Получение списка комментариев."""
+    """Получение списка комментариев.
+
+    Отдаёт последние ``limit`` комментариев (по умолчанию 50), более ранние —
+    с ``?before_id=<id первого полученного>``; заголовок ``X-Has-More: 1``
+    сообщает, что есть ещё.
+    """
     _check_role(allow_demo=True)
-    comments = (
-        OpComment.query.filter_by(object_id=object_id)
-        .order_by(OpComment.created_at)
-        .all()
-    )
-    data = []
-    for c in comments:
-        user = User.query.get(c.user_id)
-        comment_data = {
-            "id": c.id,
-            "content": c.content,
-            "username": user.username if user else "",
-            "created_at": c.created_at.strftime("%d.%m.%Y %H:%M"),
-            "user_id": c.user_id,
-            "can_delete": current_user.role == "admin" or c.user_id == current_user.id,
-            "remaining_time": 0,
-        }
-        rendered = render_template(
-            "_comment_item.html", comment=comment_data, current_user=current_user
-        )
-        comment_data["rendered_html"] = rendered
-        data.append(comment_data)
-    return jsonify(data)
+    before_id, limit = page_args(request.args)
+    data, has_more = load_comments(OpComment, object_id, before_id, limit)
+    resp = jsonify(data)
+    resp.headers["X-Has-More"] = "1" if has_more else "0"
+    return resp
 
 
 @op_api_bp.route("/api/op/<int:object_id>/comments", methods=["POST"])
@@ -252,10 +289,7 @@ def op_comment_add(object_id: int):
         "can_delete": True,
         "remaining_time": 0,
     }
-    rendered = render_template(
-        "_comment_item.html", comment=comment_data, current_user=current_user
-    )
-    comment_data["rendered_html"] = rendered
+    comment_data["rendered_html"] = render_comment(OpComment, comment_data)
     return jsonify(comment_data), 201
 
 
@@ -277,17 +311,13 @@ def op_comment_delete(comment_id: int):
     return jsonify({"success": True})
 
 
-@op_api_bp.route("/api/op/<int:object_id>/files")
-@login_required
-def op_files(object_id: int):
-    """Список файлов объекта."""
-    _check_role(allow_demo=True)
+def _files_data(object_id: int) -> list[dict[str, Any]]:
     files = (
         OpFile.query.filter_by(object_id=object_id)
         .order_by(OpFile.uploaded_at.desc())
         .all()
     )
-    data = [
+    return [
         {
             "id": f.id,
             "original_name": f.original_name,
@@ -296,7 +326,14 @@ def op_files(object_id: int):
         }
         for f in files
     ]
-    return jsonify(data)
+
+
+@op_api_bp.route("/api/op/<int:object_id>/files")
+@login_required
+def op_files(object_id: int):
+    """Список файлов объекта."""
+    _check_role(allow_demo=True)
+    return jsonify(_files_data(object_id))
 
 
 @op_api_bp.route("/api/op/<int:object_id>/files", methods=["POST"])
@@ -313,21 +350,14 @@ def op_file_upload(object_id: int):
     if ext not in ALLOWED_EXTENSIONS or ALLOWED_EXTENSIONS[ext] != mime:
         return jsonify({"error": "Недопустимый тип файла"}), 400
     unique = f"{uuid.uuid4().hex}_{filename}"
-    dest = os.path.join(_upload_dir(), unique)
-    size = 0
     try:
-        with open(dest, "wb") as f:
-            for chunk in iter(lambda: file.stream.read(64 * 1024), b""):
-                size += len(chunk)
-                if size > MAX_FILE_SIZE:
-                    raise ValueError("Файл слишком большой")
-                f.write(chunk)
+        sha, size = blob_store.store_stream(file.stream, MAX_FILE_SIZE)
     except ValueError:
-        try:
-            os.remove(dest)
-        except OSError:
-            pass
         return jsonify({"error": "Файл слишком большой"}), 400
+    # Одинаковые файлы хранятся один раз: по пути лежит ссылка на блоб
+    blob_store.link(
+        sha, size, os.path.join(_upload_dir(), unique), blob_store.op_key(unique)
+    )
     op_file = OpFile(
         object_id=object_id,
         user_id=current_user.id,
@@ -357,6 +387,7 @@ def op_file_delete(file_id: int):
         os.remove(path)
     except OSError:
         pass
+    blob_store.release([blob_store.op_key(op_file.filename)])
     db.session.delete(op_file)
     db.session.commit()
     safe_log(
@@ -391,13 +422,9 @@ def op_file_download(file_id: int):
     )
 
 
-@op_api_bp.route("/api/op/<int:object_id>/kp")
-@login_required
-def op_kp_get(object_id: int):
-    """Категории КП объекта."""
-    _check_role(allow_demo=True)
+def _kp_data(object_id: int) -> list[dict[str, Any]]:
     cats = OpKPCategory.for_object(object_id, current_user.id)
-    data = [
+    return [
         {
             "id": c.id,
             "side": c.side,
@@ -408,7 +435,99 @@ def op_kp_get(object_id: int):
         }
         for c in cats
     ]
-    return jsonify(data)
+
+
+@op_api_bp.route("/api/op/<int:object_id>/kp")
+@login_required
+def op_kp_get(object_id: int):
+    """Категории КП объекта."""
+    _check_role(allow_demo=True)
+    return jsonify(_kp_data(object_id))
+
+
+def _section_version(model, object_id: int) -> tuple:
+    """``(число строк, max id)`` раздела: строки только добавляются и удаляются."""
+    return tuple(
+        db.session.execute(
+            select(func.count(model.id), func.max(model.id)).where(
+                model.object_id == object_id
+            )
+        ).one()
+    )
+
+
+def _bundle_etag(object_id: int, include, kp: list | None) -> str:
+    """ETag пакета по дешёвым признакам версии разделов, без сборки ответа.
+
+    Группы и заявки меняются вместе с поколениями таблиц ``request`` и
+    ``contractor``, комментарии и файлы — числом строк и последним id,
+    категории КП (их единицы на объект) входят в признак целиком.
+    """
+    from utils.search_cache import current_generations
+
+    parts: list[Any] = [
+        current_user.id,
+        current_user.role,
+        sorted(request.args.items(multi=True)),
+    ]
+    if "groups" in include or "requests" in include:
+        parts.append(current_generations())
+    if "comments" in include:
+        parts.append(_section_version(OpComment, object_id))
+    if "files" in include:
+        parts.append(_section_version(OpFile, object_id))
+    if kp is not None:
+        parts.append(kp)
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@op_api_bp.route("/api/op/<int:object_id>/bundle")
+@login_required
+def op_bundle(object_id: int):
+    """Данные страницы OP одним запросом.
+
+    ``?include=groups,requests,comments,files,kp`` выбирает разделы (по
+    умолчанию — все). Фильтры ``status``/``side`` действуют на группы и
+    заявки, ``manufacturer``/``limit``/``cursor`` — на заявки; комментарии —
+    последняя страница. ETag считается до сборки ответа (``_bundle_etag``):
+    при совпадении ``If-None-Match`` возвращается 304 без запросов разделов.
+    """
+    _check_role(allow_demo=True)
+    Object.query.get_or_404(object_id)
+    include = _csv_args("include") or BUNDLE_SECTIONS
+    unknown = sorted(set(include) - set(BUNDLE_SECTIONS))
+    if unknown:
+        return jsonify({"error": f"Неизвестные разделы: {', '.join(unknown)}"}), 400
+
+    kp = _kp_data(object_id) if "kp" in include else None
+    etag = _bundle_etag(object_id, include, kp)
+    # Ответ зависит от пользователя: кешировать можно только в браузере
+    if request.if_none_match.contains(etag):
+        resp = current_app.response_class(status=304)
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp
+
+    data: dict[str, Any] = {}
+    if "groups" in include:
+        statuses, sides = _csv_args("status"), _csv_args("side", upper=True)
+        data["groups"] = _groups_for_objects([object_id], statuses, sides)[object_id]
+    if "requests" in include:
+        data["requests"] = _requests_page(object_id)
+    if "comments" in include:
+        comments, has_more = load_comments(OpComment, object_id, limit=DEFAULT_LIMIT)
+        data["comments"] = {"items": comments, "has_more": has_more}
+    if "files" in include:
+        data["files"] = _files_data(object_id)
+    if kp is not None:
+        data["kp"] = kp
+
+    body = json.dumps(data, ensure_ascii=False, sort_keys=True)
+    resp = current_app.response_class(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
 
 
 @op_api_bp.route("/api/op/<int:object_id>/kp", methods=["POST"])
@@ -491,6 +610,76 @@ def op_kp_patch(cat_id: int):
     return jsonify({"success": True})
 
 
+@op_api_bp.route("/api/op/<int:object_id>/kp", methods=["PATCH"])
+@login_required
+def op_kp_bulk(object_id: int):
+    """Порядок и правки категорий одной стороны КП одним запросом.
+
+    Тело: ``{"side": "OV", "items": [{"id": 1, "name": "...",
+    "invoice_number": "..."}, ...]}``. ``items`` — все категории стороны
+    (иначе 400), их порядок задаёт позиции (с 1); ``name``/``invoice_number``
+    необязательны. Все изменения — одно ``UPDATE ... CASE`` в одной транзакции.
+    """
+    _check_role()
+    payload = request.get_json(silent=True) or {}
+    side = payload.get("side")
+    items = payload.get("items")
+    if side not in KP_SIDES or not isinstance(items, list) or not items:
+        return jsonify({"error": "Неверные данные"}), 400
+    ids: list[int] = []
+    for item in items:
+        cat_id = item.get("id") if isinstance(item, dict) else None
+        if not isinstance(cat_id, int) or cat_id in ids:
+            return jsonify({"error": "Неверные данные"}), 400
+        for field in KP_BULK_FIELDS:
+            if field in item and not isinstance(item[field], (str, type(None))):
+                return jsonify({"error": "Неверные данные"}), 400
+        if "name" in item and not (item["name"] or "").strip():
+            return jsonify({"error": "Название категории не может быть пустым"}), 400
+        ids.append(cat_id)
+
+    side_ids = set(
+        db.session.execute(
+            select(OpKPCategory.id).where(
+                OpKPCategory.object_id == object_id,
+                OpKPCategory.side == side,
+            )
+        ).scalars()
+    )
+    if not set(ids) <= side_ids:
+        return jsonify({"error": "Категории не найдены"}), 404
+    # Позиции пересчитываются для всей стороны: частичный список оставил бы
+    # повторы и пропуски
+    if set(ids) != side_ids:
+        return jsonify({"error": "Нужен полный список категорий стороны"}), 400
+
+    values: dict[str, Any] = {
+        "position": case(
+            {cat_id: pos for pos, cat_id in enumerate(ids, start=1)},
+            value=OpKPCategory.id,
+        )
+    }
+    for field in KP_BULK_FIELDS:
+        changes = {item["id"]: item[field] for item in items if field in item}
+        if changes:
+            column = getattr(OpKPCategory, field)
+            values[field] = case(changes, value=OpKPCategory.id, else_=column)
+    db.session.execute(
+        update(OpKPCategory)
+        .where(OpKPCategory.id.in_(ids))
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    safe_log(
+        current_app.logger,
+        logging.INFO,
+        f"[OP] Пользователь {current_user.username} обновил {len(ids)} категорий "
+        f"{side} объекта {object_id}",
+    )
+    return jsonify({"success": True, "updated": len(ids)})
+
+
 @op_api_bp.route("/api/op/kp/<int:cat_id>", methods=["DELETE"])
 @login_required
 def op_kp_delete(cat_id: int):
@@ -4,11 +4,11 @@ CRUD операции для заявок (создание, просмотр, 
 
 import logging
 import os
-import shutil
 from datetime import datetime, timezone, tzinfo
 
 from flask import (
     Blueprint,
+    abort,
     current_app,
     flash,
     jsonify,
@@ -23,14 +23,23 @@ from sqlalchemy.exc import SQLAlchemyError
 from werkzeug.utils import secure_filename
 
 from extensions import limiter
-from models import Attachment, Comment, Contractor, Object, Request, User, db
+from models import Attachment, Object, Request, db
 from security_utils import safe_log
+from utils import blob_store, request_detail, request_files
 from utils.constants import MANUFACTURERS
+from utils.pagination import (
+    cached_count,
+    keyset_paginate,
+    keyset_requested,
+    offset_paginate,
+)
+from utils.request_batch import BatchError, BatchItem, create_requests
 from utils.request_helpers import get_request_contractor
-from utils.statuses import RequestStatus
 
 request_crud_bp = Blueprint("request_crud", __name__)
 
+MAX_REQUEST_FILE_SIZE = 50 * 1024 * 1024
+
 
 def _get_local_timezone() -> tzinfo | None:
     """Возвращает часовую зону сервера."""
@@ -91,7 +100,7 @@ def _get_timezone_info() -> dict[str, str]:
 @login_required
 def requests_list():
     page = request.args.get("page", 1, type=int)
-    per_page = request.args.get("per_page", 25, type=int)
+    per_page = max(request.args.get("per_page", 25, type=int), 1)
     sort = request.args.get("sort", "created_at")
     order = request.args.get("order", "desc")
 
@@ -110,9 +119,21 @@ def requests_list():
     sort_col = sort_columns.get(sort, Request.created_at)
     sort_col = sort_col.desc() if order == "desc" else sort_col.asc()
 
-    pagination = query.order_by(sort_col).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    # Итог кешируется; по дате создания доступен keyset-режим с курсорами
+    total = cached_count(query)
+    if sort == "created_at" and keyset_requested():
+        pagination = keyset_paginate(
+            query,
+            (Request.created_at, Request.id),
+            request.args.get("cursor"),
+            per_page,
+            total,
+            descending=order == "desc",
+        )
+    else:
+        pagination = offset_paginate(
+            query.order_by(sort_col, Request.id), page, per_page, total
+        )
     data = [
         {
             "id": r.id,
@@ -122,7 +143,11 @@ def requests_list():
         }
         for r in pagination.items
     ]
-    return jsonify({"data": data, "total": pagination.total})
+    payload = {"data": data, "total": pagination.total}
+    if getattr(pagination, "cursor_mode", False):
+        payload["next_cursor"] = pagination.next_cursor
+        payload["prev_cursor"] = pagination.prev_cursor
+    return jsonify(payload)
 
 
 def _parse_contractor_ids(raw) -> list[int]:
@@ -207,10 +232,9 @@ def create_request():
                     "create_request.html", manufacturers=MANUFACTURERS
                 )
 
-            created_requests = []
-
-            # Загружаем файлы один раз, чтобы избежать ошибок потока
-            # при множественных подрядчиках
+            # Файлы уже на диске (UploadRequest): они хешируются и
+            # становятся блобами, заявкам каждого подрядчика достаются
+            # жёсткие ссылки на те же блобы — байты не перезаписываются
             raw_files = request.files.getlist("files[]")
             prepared_files = []
             if raw_files:
@@ -218,9 +242,11 @@ def create_request():
                     if not file or not file.filename:
                         continue
                     file.stream.seek(0)
-                    file_data = file.read()
-                    size = len(file_data)
-                    if size > 50 * 1024 * 1024:
+                    try:
+                        sha, size = blob_store.store_stream(
+                            file.stream, MAX_REQUEST_FILE_SIZE
+                        )
+                    except ValueError:
                         if request.headers.get("X-Requested-With") != "XMLHttpRequest":
                             flash(
                                 (
@@ -231,53 +257,26 @@ def create_request():
                             )
                         continue
                     filename = secure_filename(file.filename)
-                    prepared_files.append((filename, file_data))
+                    prepared_files.append((filename, sha, size))
 
+            item = BatchItem(
+                object_id=int(object_id),
+                contractor_ids=contractor_ids,
+                manufacturers=manufacturers,
+                comment=request_comment,
+            )
             try:
-                for cid in contractor_ids:
-                    new_request = Request(
-                        object_id=int(object_id),
-                        manufacturers=",".join(manufacturers),
-                        created_by=current_user.id,
-                        status=RequestStatus.OPEN.value,
-                    )
-                    new_request.contractor_id = cid
-                    db.session.add(new_request)
-                    db.session.flush()
-
-                    saved_files = []
-                    if prepared_files:
-                        upload_dir = os.path.join(
-                            current_app.config["UPLOAD_FOLDER"], str(new_request.id)
-                        )
-                        os.makedirs(upload_dir, exist_ok=True)
-
-                        for filename, file_data in prepared_files:
-                            unique_filename = (
-                                f"{new_request.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_"
-                                f"{filename}"
-                            )
-                            filepath = os.path.join(upload_dir, unique_filename)
-                            with open(filepath, "wb") as f:
-                                f.write(file_data)
-                            saved_files.append(
-                                f"uploads/{new_request.id}/{unique_filename}"
-                            )
-
-                        if saved_files:
-                            new_request.file_path = ",".join(saved_files)
-
-                    if request_comment:
-                        new_comment = Comment(
-                            request_id=new_request.id,
-                            user_id=current_user.id,
-                            content=request_comment,
-                        )
-                        db.session.add(new_comment)
-
-                    created_requests.append(new_request)
-
-                db.session.commit()
+                created_requests = create_requests(
+                    [item], current_user.id, files=prepared_files
+                )
+            except BatchError as exc:
+                db.session.rollback()
+                if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+                    return jsonify({"error": str(exc)}), 400
+                flash(str(exc), "danger")
+                return render_template(
+                    "create_request.html", manufacturers=MANUFACTURERS
+                )
             except SQLAlchemyError:
                 db.session.rollback()
                 current_app.logger.exception("Ошибка при создании заявок")
@@ -362,10 +361,10 @@ def view_request(id):
             logging.INFO,
             f"Пользователь {current_user.username} открыл заявку {id}",
         )
-        req = Request.query.get_or_404(id)
         is_ajax = request.headers.get("X-Requested-With") == "XMLHttpRequest"
 
         if request.method == "POST":
+            req = Request.query.get_or_404(id)
             if current_user.role != "admin":
                 message = "Доступ запрещён"
                 if is_ajax:
@@ -454,72 +453,12 @@ def view_request(id):
             flash(message, "success")
             return redirect(url_for("request_crud.view_request", id=id))
 
-        processed_by_user = None
-        if req.processed_by:
-            processed_by_user = db.session.get(User, req.processed_by)
-
-        object_info = db.session.get(Object, req.object_id) if req.object_id else None
-        contractors = get_request_contractor(req)
-
-        # Загружаем комментарии
-        comments = []
-        for comment in req.comments:
-            user = db.session.get(User, comment.user_id)
-            # Вычисляем оставшееся время для удаления (для обычных пользователей)
-            time_diff = datetime.utcnow() - comment.created_at
-            can_delete = current_user.role == "admin" or (
-                comment.user_id == current_user.id and time_diff.total_seconds() <= 60
-            )
-            remaining_time = (
-                max(0, 60 - int(time_diff.total_seconds()))
-                if comment.user_id == current_user.id
-                else 0
-            )
-
-            comments.append(
-                {
-                    "id": comment.id,
-                    "content": comment.content,
-                    "created_at": comment.created_at,
-                    "username": user.username if user else "Неизвестный",
-                    "user_id": comment.user_id,
-                    "can_delete": can_delete,
-                    "remaining_time": remaining_time,
-                }
-            )
-
-        # Загружаем файлы
-        files = []
-        request_dir = os.path.join(
-            current_app.root_path, "static", "uploads", str(req.id)
-        )
-        if os.path.exists(request_dir):
-            for filename in os.listdir(request_dir):
-                filepath = os.path.join(request_dir, filename)
-                if os.path.isfile(filepath) and not filename.startswith("."):
-                    size = os.path.getsize(filepath)
-                    files.append(
-                        {
-                            "path": filepath,
-                            "rel_path": os.path.relpath(
-                                filepath, os.path.join(current_app.root_path, "static")
-                            ),
-                            "filename": filename,
-                            "size": (
-                                f"{size // 1024} KB" if size > 1024 else f"{size} B"
-                            ),
-                        }
-                    )
-
-        # Загружаем вложения (скриншоты)
-        attachments = []
-        attachment_contractors = {}
-        for attachment in Attachment.query.filter_by(request_id=req.id).all():
-            contractor = db.session.get(Contractor, attachment.contractor_id)
-            attachment_contractors[attachment.id] = (
-                contractor.name if contractor else "Неизвестный"
-            )
-            attachments.append(attachment)
+        # Заявка, объект, подрядчики, комментарии, файлы и вложения —
+        # фиксированным числом запросов
+        detail = request_detail.load(id)
+        if detail is None:
+            abort(404)
+        req = detail.req
 
         formatted_created_at = _format_request_created_at(req.created_at)
         timezone_info = _get_timezone_info()
@@ -527,13 +466,13 @@ def view_request(id):
         return render_template(
             "view_request.html",
             req=req,
-            object_info=object_info,
-            contractors=contractors,
-            processed_by_user=processed_by_user,
-            comments=comments,
-            files=files,
-            attachments=attachments,
-            attachment_contractors=attachment_contractors,
+            object_info=detail.object_info,
+            contractors=detail.contractors,
+            processed_by_user=detail.processed_by_user,
+            comments=detail.comments,
+            files=detail.files,
+            attachments=detail.attachments,
+            attachment_contractors=detail.attachment_contractors,
             created_at_display=formatted_created_at["display"],
             created_at_form_value=formatted_created_at["form_value"],
             timezone_info=timezone_info,
@@ -569,45 +508,15 @@ def delete_request(id):
             flash("Только администратор может удалять заявки", "danger")
             return redirect(url_for("main.dashboard"))
 
-        # Удаляем файлы с диска
-        upload_dir = os.path.join(current_app.config["UPLOAD_FOLDER"], str(req.id))
-        if os.path.exists(upload_dir):
-            shutil.rmtree(upload_dir)  # Удаляем всю папку рекурсивно
-            current_app.logger.info(f"Deleted upload directory: {upload_dir}")
+        # Файлы заявки и скриншоты — по request_file; ссылки на блобы
+        # снимаются в той же транзакции, сами блобы удалит cleanup:uploads
+        keys = blob_store.request_keys(req)
+        blob_store.release(keys)
 
         # Удаляем вложения (скриншоты)
-        attachments = Attachment.query.filter_by(request_id=req.id).all()
-        for att in attachments:
-            if att.screenshot and os.path.exists(
-                os.path.join(current_app.root_path, "static", att.screenshot)
-            ):
-                try:
-                    os.remove(
-                        os.path.join(current_app.root_path, "static", att.screenshot)
-                    )
-                except OSError as e:
-                    current_app.logger.warning(
-                        f"Could not delete attachment file: {str(e)}"
-                    )
+        for att in Attachment.query.filter_by(request_id=req.id).all():
             db.session.delete(att)
 
-        # Удаляем файлы из старой схемы (если они есть)
-        if req.file_path:
-            file_paths = req.file_path.split(",")
-            for path in file_paths:
-                if path.strip():
-                    file_path = os.path.join(
-                        current_app.root_path, "static", path.strip()
-                    )
-                    if os.path.exists(file_path):
-                        try:
-                            os.remove(file_path)
-                            current_app.logger.info(f"Deleted file: {file_path}")
-                        except OSError as e:
-                            current_app.logger.warning(
-                                f"Could not delete file {file_path}: {str(e)}"
-                            )
-
         # Удаляем комментарии
         for comment in req.comments:
             db.session.delete(comment)
@@ -616,6 +525,15 @@ def delete_request(id):
         db.session.delete(req)
         db.session.commit()
 
+        # Файлы — только после коммита: при откате заявка остаётся с файлами
+        request_files.remove_files(keys)
+        upload_dir = os.path.join(current_app.config["UPLOAD_FOLDER"], str(id))
+        try:
+            os.rmdir(upload_dir)
+        except OSError:
+            pass  # каталога нет или в нём чужие файлы — их найдёт cleanup:uploads
+        current_app.logger.info(f"Deleted {len(keys)} files of request {id}")
+
         flash("Заявка и все связанные файлы удалены", "success")
         return redirect(url_for("main.dashboard"))
 
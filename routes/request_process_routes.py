@@ -20,6 +20,7 @@ from werkzeug.utils import secure_filename
 
 from extensions import limiter
 from models import Attachment, Object, Request, db
+from utils import blob_store, request_files
 from utils.constants import MANUFACTURERS
 from utils.request_helpers import get_request_contractor
 from utils.statuses import RequestStatus, get_status_class, get_status_label
@@ -138,9 +139,12 @@ def submit_process_request(id):
                         f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
                     )
                     file_path = os.path.join(upload_dir, unique_filename)
+                    rel_path = f"uploads/{req.id}/{unique_filename}"
 
                     try:
-                        file.save(file_path)
+                        sha, size = blob_store.store_stream(file.stream)
+                        blob_store.link(sha, size, file_path, rel_path)
+                        request_files.record(req.id, rel_path, sha, size)
                         current_app.logger.debug(f"File saved to: {file_path}")
 
                         # Создаём запись в базе
@@ -148,7 +152,7 @@ def submit_process_request(id):
                             request_id=req.id,
                             contractor_id=int(contractor_id),
                             manufacturer=manufacturer,
-                            screenshot=f"uploads/{req.id}/{unique_filename}",
+                            screenshot=rel_path,
                             uploaded_by=current_user.id,
                         )
                         db.session.add(attachment)
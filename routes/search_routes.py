@@ -1,14 +1,16 @@
 """Маршруты для поиска и вспомогательные функции."""
 
+import heapq
 from difflib import SequenceMatcher
 
 from flask import Blueprint, current_app, jsonify, request
 from flask_login import login_required
 from jellyfish import levenshtein_distance, metaphone, soundex
+from sqlalchemy import select
 from thefuzz import fuzz
 
 from security_utils import sanitize_input
-from utils.text_utils import similarity
+from utils.autocomplete import suggest
 
 search_bp = Blueprint("search", __name__)
 
@@ -101,23 +103,34 @@ def advanced_search_similarity(query, text, threshold=0.4):
 def search_with_multiple_fields(query, items, fields, threshold=0.4):
     """
     Поиск по нескольким полям с продвинутым алгоритмом
+
+    Оценки считаются пакетно по каждому полю (см. ``utils.fuzzy_scorer``)
+    и совпадают с ``advanced_search_similarity`` для каждой пары.
     """
-    results = []
+    from utils.fuzzy_scorer import score_batch
 
-    for item in items:
-        max_score = 0
-        best_field = None
+    items = list(items)
+    best = [(0, None)] * len(items)
 
-        for field in fields:
+    for field in fields:
+        positions = []
+        values = []
+        for pos, item in enumerate(items):
             field_value = getattr(item, field, None)
             if field_value:
-                score = advanced_search_similarity(query, str(field_value), threshold)
-                if score > max_score:
-                    max_score = score
-                    best_field = field
-
-        if max_score >= threshold:
-            results.append((item, max_score, best_field))
+                positions.append(pos)
+                values.append(str(field_value))
+        if not values:
+            continue
+        for pos, score in zip(positions, score_batch(query, values, threshold)):
+            if score > best[pos][0]:
+                best[pos] = (score, field)
+
+    results = [
+        (item, max_score, best_field)
+        for item, (max_score, best_field) in zip(items, best)
+        if max_score >= threshold
+    ]
 
     # Сортируем по релевантности
     results.sort(key=lambda x: x[1], reverse=True)
@@ -129,8 +142,6 @@ def search_with_multiple_fields(query, items, fields, threshold=0.4):
 @login_required
 def search_objects():
     try:
-        from models import Object
-
         query = request.args.get("query", "").strip()
 
         # Валидация и санитизация запроса
@@ -142,18 +153,13 @@ def search_objects():
             return jsonify({"items": [], "has_next": False})
 
         page = request.args.get("page", 1, type=int)
-        per_page = 10
-        pagination = (
-            Object.query.filter(Object.name.ilike(f"%{query}%"))
-            .order_by(Object.name)
-            .paginate(page=page, per_page=per_page, error_out=False)
-        )
-
+        # Префиксный индекс в памяти: без ILIKE по таблице и без COUNT
+        found, has_next = suggest("object", query, page=page, per_page=10)
         items = [
-            {"id": obj.id, "name": obj.name, "address": obj.address or ""}
-            for obj in pagination.items
+            {"id": obj_id, "name": name, "address": address}
+            for obj_id, name, address in found
         ]
-        return jsonify({"items": items, "has_next": pagination.has_next})
+        return jsonify({"items": items, "has_next": has_next})
     except Exception as e:
         current_app.logger.error(f"Error in search_objects: {str(e)}")
         return jsonify({"error": "Ошибка поиска"}), 500
@@ -163,8 +169,6 @@ def search_objects():
 @login_required
 def search_contractors():
     try:
-        from models import Contractor
-
         query = request.args.get("query", "").strip()
 
         # Валидация и санитизация запроса
@@ -175,16 +179,76 @@ def search_contractors():
         if len(query) < 2:
             return jsonify([])
 
-        contractors = (
-            Contractor.query.filter(Contractor.name.ilike(f"%{query}%")).limit(10).all()
-        )
+        contractors, _has_next = suggest("contractor", query, per_page=10)
 
-        return jsonify([{"id": c.id, "name": c.name} for c in contractors])
+        return jsonify([{"id": c_id, "name": name} for c_id, name, _ in contractors])
     except Exception as e:
         current_app.logger.error(f"Error in search_contractors: {str(e)}")
         return jsonify({"error": "Ошибка поиска"}), 500
 
 
+# Параметры общего поиска по умолчанию и пределы
+SEARCH_DEFAULT_LIMIT = 5
+SEARCH_MAX_LIMIT = 50
+SEARCH_MIN_SCORE = 0.6
+# Размер порции строк при потоковом чтении каталога
+SEARCH_CHUNK = 1000
+
+
+def top_similar(model, entity, query, limit, min_score, use_index=False):
+    """Лучшие ``limit`` названий сущности по ``utils.text_utils.similarity``.
+
+    Оценки те же, что у ``similarity``, но ORM-объекты не загружаются:
+    читаются только ``(id, name)`` порциями, ограниченная куча хранит лучшие
+    результаты, строки отсекаются по быстрым верхним границам SequenceMatcher,
+    а перебор останавливается, когда набрано ``limit`` точных совпадений. С
+    ``use_index`` перебираются только кандидаты триграммного индекса.
+    """
+    from database import db
+    from utils.search_index import candidate_select
+
+    stmt = select(model.id, model.name).order_by(model.id)
+    if use_index:
+        candidates = candidate_select(entity, query, None)
+        if candidates is None:
+            return []
+        stmt = stmt.where(model.id.in_(candidates.subquery().select()))
+
+    query_lower = query.lower()
+    matcher = SequenceMatcher(None)
+    matcher.set_seq1(query_lower)
+    heap = []  # (score, -порядковый номер, id, name): минимум — худший результат
+    rows = db.session.execute(stmt.execution_options(yield_per=SEARCH_CHUNK))
+    for position, (item_id, name) in enumerate(rows):
+        if not name:
+            continue
+        full = len(heap) >= limit
+        if full and heap[0][0] >= 1.0:
+            break  # лучше точного совпадения ничего не будет
+        name_lower = name.lower()
+        if name_lower == query_lower:
+            score = 1.0
+        else:
+            matcher.set_seq2(name_lower)
+            bar = heap[0][0] if full else min_score
+            if matcher.real_quick_ratio() < bar or matcher.quick_ratio() < bar:
+                continue
+            score = matcher.ratio()
+        if score < min_score:
+            continue
+        entry = (score, -position, item_id, name)
+        if not full:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    rows.close()
+    best = sorted(heap, reverse=True)
+    return [
+        {"id": item_id, "name": name, "similarity": score}
+        for score, _pos, item_id, name in best
+    ]
+
+
 @search_bp.route("/search")
 @login_required
 def search():
@@ -195,27 +259,21 @@ def search():
         if not query or not search_type:
             return jsonify({"items": [], "query": query})
 
-        items = []
-        if search_type == "object":
-            from models import Object
+        limit = request.args.get("limit", SEARCH_DEFAULT_LIMIT, type=int)
+        limit = max(1, min(limit or SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT))
+        min_score = request.args.get("min_score", SEARCH_MIN_SCORE, type=float)
+        min_score = max(0.0, min(min_score, 1.0))
+        use_index = request.args.get("index", "0") in ("1", "true", "yes")
 
-            items = Object.query.all()
+        if search_type == "object":
+            from models import Object as model
         elif search_type == "contractor":
-            from models import Contractor
-
-            items = Contractor.query.all()
+            from models import Contractor as model
         else:
             return jsonify({"items": [], "query": query})
 
-        results = []
-        for item in items:
-            sim = similarity(query, item.name)
-            if sim >= 0.6:  # 60% совпадение
-                results.append({"id": item.id, "name": item.name, "similarity": sim})
-
-        # Сортируем по степени схожести
-        results.sort(key=lambda x: x["similarity"], reverse=True)
-        return jsonify({"items": results[:5], "query": query})
+        results = top_similar(model, search_type, query, limit, min_score, use_index)
+        return jsonify({"items": results, "query": query})
     except Exception as e:
         current_app.logger.error(f"Error in /search: {str(e)}")
         return jsonify({"items": [], "query": query}), 500
@@ -0,0 +1,88 @@
+"""Бенчмарк пакетного нечёткого скорера против поштучного расчёта.
+
+Запуск: ``python -m scripts.bench_fuzzy --sizes 10000 100000``.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from routes.search_routes import advanced_search_similarity  # noqa: E402
+from utils.fuzzy_scorer import score_batch  # noqa: E402
+
+WORDS = [
+    "склад",
+    "офис",
+    "торговый",
+    "центр",
+    "школа",
+    "больница",
+    "Ромашка",
+    "Вектор",
+    "Казань",
+    "Москва",
+    "улица",
+    "Ленина",
+    "Пульсар",
+    "Болид",
+    "Рубеж",
+    "ООО",
+    "АО",
+]
+QUERIES = ["ромашка", "вектр склад", "казань ленина", "болид", "торговый центр"]
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    if len(word) < 4 or rng.random() > 0.3:
+        return word
+    pos = rng.randrange(len(word))
+    return word[:pos] + word[pos + 1 :]
+
+
+def make_corpus(size: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(_typo(rng.choice(WORDS), rng) for _ in range(rng.randint(1, 4)))
+        + f" {rng.randint(1, 200)}"
+        for _ in range(size)
+    ]
+
+
+def run(size: int, threshold: float) -> None:
+    texts = make_corpus(size)
+    for query in QUERIES:
+        started = time.perf_counter()
+        expected = [advanced_search_similarity(query, t, threshold) for t in texts]
+        baseline = time.perf_counter() - started
+
+        started = time.perf_counter()
+        scores = score_batch(query, texts, threshold)
+        batched = time.perf_counter() - started
+
+        matched = sum(1 for s in scores if s)
+        status = "OK" if scores == expected else "MISMATCH"
+        print(
+            f"{size:>7} {query!r:<18} поштучно {baseline:7.2f}s  "
+            f"пакетно {batched:7.2f}s  x{baseline / batched:5.1f}  "
+            f"найдено {matched:>6}  {status}"
+        )
+
+
+def main() -> None:
+    """Сравнить скорость и результаты двух реализаций."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--threshold", type=float, default=0.4)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""Бенчмарк поиска на синтетических данных с бюджетами регрессий.
+
+Наполняет БД через ``utils.demo_seed.DemoDataGenerator`` до 1k/10k/100k
+объектов, подрядчиков и заявок (размеры идут по возрастанию, генератор
+досоздаёт недостающее), прогоняет фиксированный набор русских запросов с
+опечатками через ``search_with_multiple_fields``, ``/search/search``,
+``/search/search_objects`` и поиск дашборда и печатает перцентили задержки,
+число кандидатов и полноту относительно полного перебора текущим скорером.
+
+Запуск: ``python -m scripts.bench_search --sizes 1000 10000 100000``.
+По умолчанию БД — SQLite в памяти (``FLASK_ENV=testing``); для файла или
+другой СУБД задайте ``FLASK_ENV``/``DB_TYPE``/``DB_NAME`` как для приложения.
+Код возврата 1, если превышен бюджет из ``scripts/bench_search_budget.json``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+DEFAULT_BUDGET = Path(__file__).with_name("bench_search_budget.json")
+
+# Запросы в стиле пользователей: опечатки, пропуски букв, латиница в ё/ь
+QUERIES = [
+    "обьект 12",
+    "Объект №125",
+    "подрядчк 7",
+    "подрядчик №40",
+    "казан",
+    "санкт петербур",
+    "екатеринбург улица",
+    "заказчик 15",
+    "пульсар",
+    "термолаин",
+    "ридан ов",
+]
+
+OBJECT_FIELDS = ["name", "address", "customer"]
+SUGGEST_FIELDS = ["name"]
+DASHBOARD_PER_PAGE = 20
+SEARCH_LIMIT = 5
+SEARCH_MIN_SCORE = 0.6
+SUGGEST_LIMIT = 10
+SCORER_THRESHOLD = 0.4
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Перцентиль методом ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def recall(found: list[int], scored: list[tuple[int, float]], k: int) -> float:
+    """Доля эталонного top-k (``(id, оценка)`` по убыванию), попавшая в выдачу.
+
+    Элементы с оценкой, равной k-й, взаимозаменяемы: любой из них в выдаче
+    засчитывается, иначе полнота зависела бы от порядка среди равных.
+    """
+    if not scored:
+        return 1.0
+    top = scored[:k]
+    cutoff = top[-1][1]
+    expected = {item_id for item_id, score in scored if score >= cutoff}
+    return min(len(set(found) & expected), len(top)) / len(top)
+
+
+def seed(size: int, seed_value: int = 1) -> None:
+    """Досоздаёт объекты, подрядчиков и заявки до ``size`` каждого."""
+    from utils.demo_seed import DemoDataGenerator
+
+    random.seed(seed_value + size)
+    DemoDataGenerator(size, size, size).run()
+
+
+def _timed(func, repeat: int) -> tuple[list[float], object]:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples, result
+
+
+class _Surface:
+    """Накопитель замеров одной поверхности поиска."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.samples: list[float] = []
+        self.candidates: list[int] = []
+        self.recalls: list[float] = []
+
+    def add(self, samples, candidates: int, recall_value: float | None) -> None:
+        self.samples.extend(samples)
+        self.candidates.append(candidates)
+        if recall_value is not None:
+            self.recalls.append(recall_value)
+
+    def row(self, size: int) -> dict:
+        return {
+            "size": size,
+            "surface": self.name,
+            "p50_ms": round(percentile(self.samples, 50), 2),
+            "p95_ms": round(percentile(self.samples, 95), 2),
+            "p99_ms": round(percentile(self.samples, 99), 2),
+            "candidates": (
+                round(sum(self.candidates) / len(self.candidates), 1)
+                if self.candidates
+                else 0
+            ),
+            "recall": (
+                round(sum(self.recalls) / len(self.recalls), 3)
+                if self.recalls
+                else None
+            ),
+        }
+
+
+def measure(client, size: int, queries=QUERIES, repeat: int = 5) -> list[dict]:
+    """Замеры всех поверхностей поиска на текущем наполнении БД.
+
+    Эталон полноты — полный перебор: ``search_with_multiple_fields`` по всем
+    объектам для автодополнения, ``similarity`` по всем именам для
+    ``/search`` и ``rank_requests`` по всем заявкам для дашборда.
+    """
+    from sqlalchemy.orm import selectinload
+
+    from models import Object, Request
+    from routes.search_routes import search_with_multiple_fields
+    from utils import search_backend
+    from utils.search_cache import RESULTS
+    from utils.text_utils import similarity
+
+    surfaces = {
+        name: _Surface(name)
+        for name in (
+            "multiple_fields",
+            "search",
+            "search_index",
+            "search_objects",
+            "dashboard",
+        )
+    }
+    objects = Object.query.order_by(Object.id).all()
+    by_id = {obj.id: obj for obj in objects}
+    documents = [
+        search_backend._RequestDocument(req, by_id.get(req.object_id))
+        for req in Request.query.options(selectinload(Request.contractors))
+        .order_by(Request.id)
+        .all()
+    ]
+
+    for query in queries:
+        samples, _scored = _timed(
+            lambda: search_with_multiple_fields(
+                query, objects, OBJECT_FIELDS, SCORER_THRESHOLD
+            ),
+            1,
+        )
+        surfaces["multiple_fields"].add(samples, len(objects), None)
+
+        expected = sorted(
+            (
+                (obj.id, score)
+                for obj in objects
+                if (score := similarity(query, obj.name)) >= SEARCH_MIN_SCORE
+            ),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        for surface, index in (("search", "0"), ("search_index", "1")):
+            params = {
+                "type": "object",
+                "query": query,
+                "limit": SEARCH_LIMIT,
+                "index": index,
+            }
+            samples, response = _timed(
+                lambda: client.get("/search/search", query_string=params), repeat
+            )
+            found = [item["id"] for item in response.get_json()["items"]]
+            candidates = (
+                len(search_backend.candidate_ids("object", query, limit=None))
+                if index == "1"
+                else len(objects)
+            )
+            surfaces[surface].add(
+                samples, candidates, recall(found, expected, SEARCH_LIMIT)
+            )
+
+        samples, response = _timed(
+            lambda: client.get("/search/search_objects", query_string={"query": query}),
+            repeat,
+        )
+        found = [item["id"] for item in response.get_json()["items"]]
+        suggested = search_with_multiple_fields(
+            query, objects, SUGGEST_FIELDS, SCORER_THRESHOLD
+        )
+        expected = [(obj.id, score) for obj, score, _field in suggested]
+        surfaces["search_objects"].add(
+            samples, len(found), recall(found, expected, SUGGEST_LIMIT)
+        )
+
+        def dashboard():
+            # Холодный запрос: без кеша ранжированных результатов
+            RESULTS.clear()
+            return client.get(
+                "/dashboard",
+                query_string={"search": query, "per_page": DASHBOARD_PER_PAGE},
+            )
+
+        samples, _response = _timed(dashboard, repeat)
+        page = search_backend.search_requests_page(
+            Request.query, query, 1, DASHBOARD_PER_PAGE
+        )
+        ranked = search_with_multiple_fields(
+            query, documents, search_backend._RequestDocument.SEARCH_FIELDS, 0.3
+        )
+        candidates = Request.query.filter(
+            search_backend.request_candidate_clause(query)
+        ).count()
+        surfaces["dashboard"].add(
+            samples,
+            candidates,
+            recall(
+                [req.id for req in page.items],
+                [(doc.original_request.id, score) for doc, score, _field in ranked],
+                DASHBOARD_PER_PAGE,
+            ),
+        )
+
+    return [surface.row(size) for surface in surfaces.values()]
+
+
+def check_budget(rows: list[dict], budget: dict) -> list[str]:
+    """Нарушения бюджета: p95 выше лимита для размера или полнота ниже порога."""
+    violations = []
+    for row in rows:
+        limits = budget.get(row["surface"], {})
+        p95_limit = limits.get("p95_ms", {}).get(str(row["size"]))
+        if p95_limit is not None and row["p95_ms"] > p95_limit:
+            violations.append(
+                f"{row['surface']}@{row['size']}: p95 {row['p95_ms']} мс "
+                f"> {p95_limit} мс"
+            )
+        min_recall = limits.get("min_recall")
+        if (
+            min_recall is not None
+            and row["recall"] is not None
+            and row["recall"] < min_recall
+        ):
+            violations.append(
+                f"{row['surface']}@{row['size']}: полнота {row['recall']} "
+                f"< {min_recall}"
+            )
+    return violations
+
+
+def _print_rows(rows: list[dict]) -> None:
+    for row in rows:
+        recall_text = "—" if row["recall"] is None else f"{row['recall']:.3f}"
+        print(
+            f"{row['size']:>7} {row['surface']:<16} p50 {row['p50_ms']:9.2f}  "
+            f"p95 {row['p95_ms']:9.2f}  p99 {row['p99_ms']:9.2f} мс  "
+            f"кандидатов {row['candidates']:>9}  полнота {recall_text}"
+        )
+
+
+def main() -> None:
+    """Наполнить БД, замерить поиск и сверить с бюджетом."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--budget", type=Path, default=DEFAULT_BUDGET)
+    parser.add_argument("--json", type=Path, help="сохранить результаты в файл")
+    args = parser.parse_args()
+
+    os.environ.setdefault("FLASK_ENV", "testing")
+    logging.disable(logging.INFO)
+    from app import app
+    from database import db
+    from extensions import limiter
+    from models import User
+
+    limiter.enabled = False
+    budget = json.loads(args.budget.read_text(encoding="utf-8")) if args.budget else {}
+
+    rows: list[dict] = []
+    with app.app_context():
+        db.create_all()
+        client = app.test_client()
+        for size in sorted(args.sizes):
+            started = time.perf_counter()
+            seed(size, args.seed)
+            print(f"Наполнение до {size}: {time.perf_counter() - started:.1f}s")
+            user = User.query.filter_by(role="admin").first() or User.query.first()
+            with client.session_transaction() as session:
+                session["_user_id"] = str(user.id)
+                session["_fresh"] = True
+            size_rows = measure(client, size, repeat=args.repeat)
+            _print_rows(size_rows)
+            rows.extend(size_rows)
+
+    if args.json:
+        args.json.write_text(
+            json.dumps(rows, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+    violations = check_budget(rows, budget)
+    for violation in violations:
+        print(f"БЮДЖЕТ ПРЕВЫШЕН: {violation}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
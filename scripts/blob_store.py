@@ -0,0 +1,27 @@
+from flask import current_app
+
+from utils import request_files
+from utils.blob_store import migrate
+
+
+def register_blob_commands(app):
+    """Регистрация CLI-команд хранилища файлов по содержимому."""
+
+    @app.cli.command("blobs:migrate")
+    def blobs_migrate():
+        """Хеширует загруженные файлы и заменяет дубли ссылками на блобы."""
+        request_files.backfill()
+        stats = migrate()
+        current_app.logger.info(
+            f"Файлов перенесено: {stats['files']}, дублей: {stats['duplicates']}, "
+            f"освобождено байт: {stats['saved_bytes']}, "
+            f"не найдено: {stats['missing']}"
+        )
+
+    @app.cli.command("files:backfill")
+    def files_backfill():
+        """Вносит в request_file файлы заявок, загруженные до её появления."""
+        stats = request_files.backfill()
+        current_app.logger.info(
+            f"Файлов заявок внесено: {stats['files']}, не найдено: {stats['missing']}"
+        )
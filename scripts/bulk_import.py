@@ -0,0 +1,32 @@
+import os
+
+import click
+from flask import current_app
+
+from models import User
+from utils import bulk_import
+
+
+def register_import_commands(app):
+    """Регистрация CLI-команд импорта из CSV."""
+
+    @app.cli.command("import:file")
+    @click.argument("kind", type=click.Choice(sorted(bulk_import.SCHEMA_KEYS)))
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--user", "username", required=True, help="Автор записей")
+    def import_file(kind: str, path: str, username: str):
+        """Импортирует файл сразу, без фонового потока."""
+        user = User.query.filter_by(username=username).first()
+        if user is None:
+            raise click.BadParameter(f"Пользователь {username} не найден")
+        with open(path, "rb") as f:
+            job = bulk_import.create_job(kind, os.path.basename(path), f, user.id)
+        bulk_import.run(job.id)
+        data = bulk_import.job_data(job)
+        current_app.logger.info(
+            f"Импорт {job.id}: {data['status']}, вставлено {data['inserted']}, "
+            f"пропущено {data['skipped']}, ошибок {data['failed']}"
+        )
+        if data["has_report"]:
+            click.echo(f"report={bulk_import.report_path(job)}")
+        click.echo(f"inserted={data['inserted']}")
@@ -4,8 +4,7 @@ from pathlib import Path
 import click
 from flask import current_app
 
-from database import db
-from models import Attachment, Request
+from utils import blob_store, request_files
 
 
 def register_cleanup_commands(app):
@@ -55,30 +54,30 @@ def register_cleanup_commands(app):
         "--dry-run/--no-dry-run", default=True, help="Только отчёт без удаления"
     )
     def cleanup_uploads(dry_run: bool):
-        """Находит и удаляет файлы без записей в БД."""
+        """Находит и удаляет файлы без записей в БД и блобы без ссылок."""
         upload_root = Path(current_app.config["UPLOAD_FOLDER"])
         if not upload_root.exists():
             current_app.logger.info("Каталог загрузок не найден")
-            return
-
-        static_root = upload_root.parent
-        db_paths = set()
+        else:
+            _cleanup_upload_files(upload_root, dry_run)
+        blobs, size = blob_store.collect_garbage(dry_run)
+        suffix = " (dry-run)" if dry_run else ""
+        current_app.logger.info(f"Блобов без ссылок: {blobs}, байт: {size}{suffix}")
 
-        # Сбор путей из Request.file_path
-        for (file_paths,) in db.session.query(Request.file_path).all():
-            if not file_paths:
-                continue
-            for rel in file_paths.split(","):
-                db_paths.add((static_root / rel).resolve())
+    def _cleanup_upload_files(upload_root: Path, dry_run: bool) -> None:
+        blob_root = Path(blob_store.blob_root()).resolve()
 
-        # Сбор путей из Attachment.screenshot
-        for (rel_path,) in db.session.query(Attachment.screenshot).all():
-            if rel_path:
-                db_paths.add((static_root / rel_path).resolve())
+        if not dry_run:
+            # Старые файлы заявок заодно вносятся в request_file
+            request_files.backfill()
+        # live_keys учитывает и Request.file_path, так что dry-run ничего не пишет
+        db_paths = {
+            Path(blob_store.ref_path(key)).resolve() for key in blob_store.live_keys()
+        }
 
         checked = removed = 0
         for file in upload_root.rglob("*"):
-            if not file.is_file():
+            if not file.is_file() or blob_root in file.resolve().parents:
                 continue
             checked += 1
             if file.resolve() not in db_paths:
@@ -0,0 +1,30 @@
+import click
+from flask import current_app
+
+from utils import request_summary
+from utils.dashboard_counters import reconcile
+
+
+def register_dashboard_commands(app):
+    """Регистрация CLI-команд счётчиков дашборда."""
+
+    @app.cli.command("dashboard:reconcile")
+    @click.option(
+        "--dry-run/--no-dry-run", default=False, help="Только отчёт без исправления"
+    )
+    def dashboard_reconcile(dry_run: bool):
+        """Пересчитывает счётчики дашборда и сообщает о расхождениях."""
+        drift = reconcile(fix=not dry_run)
+        for name, (stored, actual) in drift.items():
+            current_app.logger.warning(
+                f"Счётчик {name}: хранится {stored}, фактически {actual}"
+            )
+        suffix = " (dry-run)" if dry_run else ""
+        current_app.logger.info(f"Расхождений счётчиков: {len(drift)}{suffix}")
+        click.echo(f"drift={len(drift)}")
+
+    @app.cli.command("dashboard:rebuild-summary")
+    def dashboard_rebuild_summary():
+        """Полностью пересобирает модель чтения строк дашборда."""
+        documents = request_summary.rebuild()
+        current_app.logger.info(f"Модель чтения дашборда: заявок {documents}")
@@ -0,0 +1,13 @@
+from flask import current_app
+
+from utils.request_manufacturers import backfill
+
+
+def register_manufacturer_commands(app):
+    """Регистрация CLI-команд таблицы производителей заявок."""
+
+    @app.cli.command("manufacturers:backfill")
+    def manufacturers_backfill():
+        """Переносит производителей всех заявок в ``request_manufacturer``."""
+        documents = backfill()
+        current_app.logger.info(f"Производители заявок перенесены: заявок {documents}")
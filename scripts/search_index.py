@@ -0,0 +1,25 @@
+import click
+from flask import current_app
+
+from utils import search_keys
+from utils.search_index import INDEXED_FIELDS, rebuild
+
+
+def register_search_commands(app):
+    """Регистрация CLI-команд поискового индекса."""
+
+    @app.cli.command("search:reindex")
+    @click.option(
+        "--entity",
+        type=click.Choice(sorted(INDEXED_FIELDS)),
+        multiple=True,
+        help="Сущность для перестройки (по умолчанию все)",
+    )
+    def search_reindex(entity: tuple[str, ...]):
+        """Полностью перестраивает триграммный индекс и ключи поиска."""
+        for name in entity or tuple(INDEXED_FIELDS):
+            documents = rebuild(name)
+            current_app.logger.info(f"Индекс {name}: документов {documents}")
+            if name in search_keys.KEYED_FIELDS:
+                documents = search_keys.rebuild(name)
+                current_app.logger.info(f"Ключи {name}: документов {documents}")
@@ -39,7 +39,69 @@
     window.location.href = currentUrl.toString();
   }
 
+  function appendFrom(doc, containerSelector, itemSelector) {
+    const target = document.querySelector(containerSelector);
+    const source = doc.querySelector(containerSelector);
+    if (!target || !source) return;
+    source.querySelectorAll(itemSelector).forEach((item) => {
+      target.appendChild(document.importNode(item, true));
+    });
+  }
+
+  // Keyset-режим: следующая страница подгружается при прокрутке к навигации
+  function initInfiniteScroll() {
+    const nav = document.querySelector('[data-infinite-scroll]');
+    if (!nav || !('IntersectionObserver' in window)) return;
+    let loading = false;
+    const observer = new IntersectionObserver(
+      async (entries) => {
+        if (loading || !entries.some((e) => e.isIntersecting)) return;
+        const url = nav.getAttribute('data-next-url');
+        if (!url) {
+          observer.disconnect();
+          return;
+        }
+        loading = true;
+        try {
+          const response = await fetch(url, { credentials: 'same-origin' });
+          if (!response.ok) throw new Error(String(response.status));
+          const doc = new DOMParser().parseFromString(
+            await response.text(),
+            'text/html'
+          );
+          appendFrom(doc, '#requests-cards', '.request-card');
+          appendFrom(doc, '#requests-table tbody', 'tr');
+          const nextNav = doc.querySelector('[data-infinite-scroll]');
+          const nextUrl = nextNav
+            ? nextNav.getAttribute('data-next-url')
+            : null;
+          const nextLink = nav.querySelector('[data-cursor-next]');
+          if (nextUrl) {
+            nav.setAttribute('data-next-url', nextUrl);
+            if (nextLink) nextLink.setAttribute('href', nextUrl);
+            // Повторная проверка, если навигация всё ещё в зоне видимости
+            observer.unobserve(nav);
+            observer.observe(nav);
+          } else {
+            nav.removeAttribute('data-next-url');
+            if (nextLink)
+              nextLink.closest('.page-item').classList.add('disabled');
+            observer.disconnect();
+          }
+        } catch (e) {
+          // Без подгрузки остаются обычные ссылки «назад/вперёд»
+          observer.disconnect();
+        } finally {
+          loading = false;
+        }
+      },
+      { rootMargin: '200px' }
+    );
+    observer.observe(nav);
+  }
+
   document.addEventListener('DOMContentLoaded', () => {
+    initInfiniteScroll();
     const tableView = document.getElementById('requests-table');
     const cardsView = document.getElementById('requests-cards');
     const buttons = document.querySelectorAll('[data-view]');
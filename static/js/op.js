@@ -17,6 +17,12 @@
     };
   }
 
+  // Данные раздела из общего ответа /bundle или отдельным запросом
+  function sectionData(preloaded, url) {
+    if (preloaded !== undefined) return Promise.resolve(preloaded);
+    return fetch(url).then((r) => r.json());
+  }
+
   let selected = { id: null, name: '', address: '' };
   let currentStatuses = [];
   let currentSide = '';
@@ -191,12 +197,11 @@
     }
   }
 
-  function loadGroupTags(objectId) {
+  function loadGroupTags(objectId, preloaded) {
     const params = new URLSearchParams();
     currentStatuses.forEach((s) => params.append('status', s));
     if (currentSide) params.append('side', currentSide);
-    fetch(`/api/op/${objectId}/groups?${params.toString()}`)
-      .then((r) => r.json())
+    sectionData(preloaded, `/api/op/${objectId}/groups?${params.toString()}`)
       .then((data) => {
         const wrap = qs('#op-groups');
         if (!wrap) return;
@@ -272,19 +277,39 @@
       });
   }
 
-  function initComments(objectId) {
+  function initComments(objectId, preloaded) {
     const form = qs('#op-comment-form');
     const list = qs('#op-comments');
     if (!form || !list) return;
 
-    fetch(`/api/op/${objectId}/comments`)
-      .then((r) => r.json())
-      .then((data) => {
-        list.innerHTML = '';
-        (data || []).forEach((c) => {
-          list.insertAdjacentHTML('beforeend', c.rendered_html);
-        });
-      });
+    // Последняя страница ветки; более ранние — по кнопке, через before_id
+    function loadComments(beforeId, page) {
+      const params = new URLSearchParams();
+      if (beforeId) params.set('before_id', beforeId);
+      const request = page
+        ? Promise.resolve([page.items, page.has_more])
+        : fetch(`/api/op/${objectId}/comments?${params.toString()}`).then((r) =>
+            r.json().then((data) => [data, r.headers.get('X-Has-More') === '1'])
+          );
+      request
+        .then(([data, hasMore]) => {
+          if (!beforeId) list.innerHTML = '';
+          const more = qs('.op-comments-more', list);
+          if (more) more.remove();
+          const html = (data || []).map((c) => c.rendered_html).join('');
+          list.insertAdjacentHTML('afterbegin', html);
+          if (hasMore && data.length) {
+            const btn = document.createElement('button');
+            btn.type = 'button';
+            btn.className = 'btn btn-sm btn-link op-comments-more';
+            btn.textContent = 'Показать ранние';
+            btn.addEventListener('click', () => loadComments(data[0].id));
+            list.prepend(btn);
+          }
+        })
+        .catch((e) => console.error('comments', e));
+    }
+    loadComments(null, preloaded);
 
     if (form.dataset.initialized === '1') return;
     form.dataset.initialized = '1';
@@ -355,7 +380,7 @@
     });
   }
 
-  function initFiles(objectId) {
+  function initFiles(objectId, preloaded) {
     const zone = qs('#op-files-dropzone');
     const list = qs('#op-files');
     const fileInput = qs('#op-file-input');
@@ -366,32 +391,30 @@
         const fd = new FormData();
         fd.append('file', file);
         fetch(`/api/op/${objectId}/files`, { method: 'POST', body: fd })
-          .then(refresh)
+          .then(() => refresh())
           .catch((err) => console.error('upload', err));
       });
     }
 
-    function refresh() {
-      fetch(`/api/op/${objectId}/files`)
-        .then((r) => r.json())
-        .then((data) => {
-          list.innerHTML = '';
-          (data || []).forEach((f) => {
-            const row = document.createElement('div');
-            row.className = 'mb-2';
-            row.innerHTML = `<a href="/op/files/${f.id}/download" target="_blank">${f.original_name}</a>`;
-            const del = document.createElement('button');
-            del.className = 'btn btn-sm btn-danger ms-2';
-            del.textContent = 'Удалить';
-            del.addEventListener('click', () => {
-              fetch(`/api/op/files/${f.id}`, { method: 'DELETE' }).then(
-                refresh
-              );
-            });
-            row.appendChild(del);
-            list.appendChild(row);
+    function refresh(initial) {
+      sectionData(initial, `/api/op/${objectId}/files`).then((data) => {
+        list.innerHTML = '';
+        (data || []).forEach((f) => {
+          const row = document.createElement('div');
+          row.className = 'mb-2';
+          row.innerHTML = `<a href="/op/files/${f.id}/download" target="_blank">${f.original_name}</a>`;
+          const del = document.createElement('button');
+          del.className = 'btn btn-sm btn-danger ms-2';
+          del.textContent = 'Удалить';
+          del.addEventListener('click', () => {
+            fetch(`/api/op/files/${f.id}`, { method: 'DELETE' }).then(() =>
+              refresh()
+            );
           });
+          row.appendChild(del);
+          list.appendChild(row);
         });
+      });
     }
 
     zone.addEventListener('dragover', (e) => {
@@ -414,7 +437,7 @@
       });
     }
 
-    refresh();
+    refresh(preloaded);
   }
 
   function validateCategoryName(input) {
@@ -442,21 +465,23 @@
     return true;
   }
 
-  function initSortable(container) {
+  function initSortable(container, objectId, side) {
     if (!window.Sortable || !container) return;
     window.Sortable.create(container, {
       handle: '.kp-drag-handle',
       animation: 150,
       onEnd: () => {
-        qsa('tr', container).forEach((tr, idx) => {
-          const id = tr.dataset.catId;
-          if (!id) return;
-          fetch(`/api/op/kp/${id}`, {
-            method: 'PATCH',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ position: idx + 1 }),
-          }).catch((e) => console.error('kp-order', e));
-        });
+        // Новый порядок стороны целиком — одним запросом
+        const items = qsa('tr', container)
+          .map((tr) => Number(tr.dataset.catId))
+          .filter(Boolean)
+          .map((id) => ({ id }));
+        if (!items.length) return;
+        fetch(`/api/op/${objectId}/kp`, {
+          method: 'PATCH',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ side, items }),
+        }).catch((e) => console.error('kp-order', e));
       },
     });
   }
@@ -479,7 +504,7 @@
     });
   }
 
-  function initKP(objectId) {
+  function initKP(objectId, preloaded) {
     // Р С™Р Р…Р С•Р С—Р С”Р С‘ Р Т‘Р С•Р В±Р В°Р Р†Р В»Р ВµР Р…Р С‘РЎРЏ Р Т‘Р С•Р С—. Р С”Р В°РЎвЂљР ВµР С–Р С•РЎР‚Р С‘Р в„–
     qsa('.kp-add').forEach((btn) => {
       btn.onclick = () => {
@@ -493,8 +518,7 @@
     });
 
     // Р вЂ”Р В°Р С–РЎР‚РЎС“Р В·Р С”Р В° Р С”Р В°РЎвЂљР ВµР С–Р С•РЎР‚Р С‘Р в„– Р С‘ РЎР‚Р ВµР Р…Р Т‘Р ВµРЎР‚ Р Р† РЎРѓРЎвЂљРЎР‚Р С•Р С–Р С•Р в„– РЎвЂљР В°Р В±Р В»Р С‘РЎвЂ Р Вµ
-    fetch(`/api/op/${objectId}/kp`)
-      .then((r) => r.json())
+    sectionData(preloaded, `/api/op/${objectId}/kp`)
       .then((cats) => {
         ['OV', 'VK'].forEach((side) => {
           const sideEl = qs(`.kp-side[data-side="${side}"]`);
@@ -600,7 +624,7 @@
                 fitTextToInput(invoice);
               });
             });
-          initSortable(rowsEl);
+          initSortable(rowsEl, objectId, side);
         });
       })
       .catch((e) => console.error('kp', e));
@@ -642,15 +666,29 @@
       return suggestBox;
     }
 
+    // Все разделы страницы одним запросом; при ошибке — по отдельности
+    function loadBundle(id) {
+      const params = new URLSearchParams();
+      params.set('include', 'groups,comments,files,kp');
+      currentStatuses.forEach((s) => params.append('status', s));
+      if (currentSide) params.append('side', currentSide);
+      fetch(`/api/op/${id}/bundle?${params.toString()}`)
+        .then((r) => (r.ok ? r.json() : {}))
+        .catch(() => ({}))
+        .then((bundle) => {
+          loadGroupTags(id, bundle.groups);
+          initComments(id, bundle.comments);
+          initFiles(id, bundle.files);
+          initKP(id, bundle.kp);
+        });
+    }
+
     function startForObject(id, name, address) {
       currentObjectId = id;
       hideSearchWithAnimation(() => {
         showContent();
         renderObjectCard(name, address);
-        loadGroupTags(id);
-        initComments(id);
-        initFiles(id);
-        initKP(id);
+        loadBundle(id);
       });
     }
 
@@ -686,6 +724,7 @@
         });
         box.appendChild(el);
       });
+      loadSuggestionCounts(box, items);
       if (hasMore) {
         const more = document.createElement('div');
         more.className = 'op-suggest-more';
@@ -698,6 +737,28 @@
       }
     }
 
+    // Счётчики заявок по производителям для всех подсказок одним запросом
+    function loadSuggestionCounts(box, items) {
+      const ids = (items || []).map((it) => it.id);
+      if (!ids.length) return;
+      fetch(`/api/op/groups?objects=${ids.join(',')}`)
+        .then((r) => (r.ok ? r.json() : {}))
+        .then((data) => {
+          Object.entries(data || {}).forEach(([id, groups]) => {
+            const el = qs(`.op-suggest-item[data-id="${id}"]`, box);
+            const nonZero = (groups || []).filter((g) => Number(g.count) > 0);
+            if (!el || !nonZero.length || qs('.op-suggest-counts', el)) return;
+            const counts = document.createElement('div');
+            counts.className = 'op-suggest-counts small text-muted';
+            counts.textContent = nonZero
+              .map((g) => `${g.name}: ${g.count}`)
+              .join(' · ');
+            el.appendChild(counts);
+          });
+        })
+        .catch((e) => console.error('groups batch', e));
+    }
+
     function fetchSuggestions(append = false) {
       fetch(
         `${searchUrl}?query=${encodeURIComponent(
@@ -30,6 +30,13 @@ from extensions import limiter  # noqa: E402
 from models import User  # noqa: E402
 
 
+@pytest.fixture(scope="session", autouse=True)
+def blob_store_dir(tmp_path_factory):
+    """Хранилище блобов тестов вне каталога проекта."""
+    flask_app.config["BLOB_STORE_DIR"] = str(tmp_path_factory.mktemp("blobs"))
+    return flask_app.config["BLOB_STORE_DIR"]
+
+
 @pytest.fixture()
 def app():
     """Flask-приложение для тестов."""
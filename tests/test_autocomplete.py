@@ -0,0 +1,90 @@
+from models import Object
+from utils.autocomplete import INDEXES, PrefixIndex
+from utils.search_cache import bump_generations
+
+
+def test_prefix_index_orders_heads_before_word_matches():
+    index = PrefixIndex(Object, "address")
+    index.upsert(1, "Склад Ромашка", "")
+    index.upsert(2, "Ромашка", "Казань")
+    index.upsert(3, "Ромб", "")
+
+    page, has_next = index.search("ром", 0, 2)
+    assert [item[0] for item in page] == [2, 3]
+    assert has_next
+    page, has_next = index.search("ром", 2, 2)
+    assert [item[0] for item in page] == [1]
+    assert not has_next
+
+    index.remove(1)
+    assert index.search("ром", 0, 10)[0] == [(2, "Ромашка", "Казань"), (3, "Ромб", "")]
+
+
+def test_objects_autocomplete_follows_commits(user_client, db):
+    db.session.add(Object(name="Ромашка", address="Казань"))
+    db.session.commit()
+
+    data = user_client.get("/search/search_objects?query=Ром").get_json()
+    assert data == {
+        "items": [{"id": 1, "name": "Ромашка", "address": "Казань"}],
+        "has_next": False,
+    }
+    assert INDEXES["object"].built
+
+    db.session.add(Object(name="Ромб"))
+    db.session.commit()
+    obj = db.session.get(Object, 1)
+    obj.name = "Лютик"
+    db.session.flush()
+    db.session.rollback()
+
+    data = user_client.get("/search/search_objects?query=ром").get_json()
+    assert [i["name"] for i in data["items"]] == ["Ромашка", "Ромб"]
+
+    db.session.delete(db.session.get(Object, 1))
+    db.session.commit()
+    data = user_client.get("/search/search_objects?query=ром").get_json()
+    assert [i["name"] for i in data["items"]] == ["Ромб"]
+
+
+def test_other_worker_writes_trigger_rebuild(app, user_client, db, monkeypatch):
+    monkeypatch.setitem(app.config, "AUTOCOMPLETE_REFRESH_SECONDS", 0)
+    monkeypatch.setitem(app.config, "AUTOCOMPLETE_BACKGROUND_REFRESH", False)
+    db.session.add(Object(name="Ромашка"))
+    db.session.commit()
+    user_client.get("/search/search_objects?query=ром")
+
+    # Запись «другого воркера»: мимо событий ORM, но с новым поколением
+    db.session.execute(Object.__table__.insert().values(name="Ромб"))
+    db.session.commit()
+    index = INDEXES["object"]
+    data = user_client.get("/search/search_objects?query=ром").get_json()
+    assert [i["name"] for i in data["items"]] == ["Ромашка"]
+
+    bump_generations(db.engine, ["object"])
+    # Пока другой поток перестраивает индекс, запрос читает прежний
+    index.build_lock.acquire()
+    try:
+        data = user_client.get("/search/search_objects?query=ром").get_json()
+        assert [i["name"] for i in data["items"]] == ["Ромашка"]
+    finally:
+        index.build_lock.release()
+    data = user_client.get("/search/search_objects?query=ром").get_json()
+    assert [i["name"] for i in data["items"]] == ["Ромашка", "Ромб"]
+
+
+def test_local_writes_do_not_trigger_rebuild(app, user_client, db, monkeypatch):
+    monkeypatch.setitem(app.config, "AUTOCOMPLETE_REFRESH_SECONDS", 0)
+    monkeypatch.setitem(app.config, "AUTOCOMPLETE_BACKGROUND_REFRESH", False)
+    db.session.add(Object(name="Ромашка"))
+    db.session.commit()
+    user_client.get("/search/search_objects?query=ром")
+
+    index = INDEXES["object"]
+    builds = []
+    monkeypatch.setattr(index, "build", lambda: builds.append(1))
+    db.session.add(Object(name="Ромб"))
+    db.session.commit()
+    data = user_client.get("/search/search_objects?query=ром").get_json()
+    assert [i["name"] for i in data["items"]] == ["Ромашка", "Ромб"]
+    assert builds == []
@@ -0,0 +1,31 @@
+from scripts.bench_search import check_budget, measure, percentile, recall, seed
+
+
+def test_percentile_and_tie_aware_recall():
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+    assert percentile([5, 1, 3, 2, 4], 99) == 5
+    scored = [(1, 1.0), (2, 0.9), (3, 0.9), (4, 0.5)]
+    assert recall([1, 3], scored, 2) == 1.0
+    assert recall([4], scored, 2) == 0.0
+    assert recall([], [], 5) == 1.0
+
+
+def test_measure_reports_all_surfaces_and_budget(admin_client, db):
+    seed(30)
+    rows = measure(admin_client, 30, queries=["казан", "пульсар"], repeat=1)
+
+    assert [row["surface"] for row in rows] == [
+        "multiple_fields",
+        "search",
+        "search_index",
+        "search_objects",
+        "dashboard",
+    ]
+    for row in rows:
+        assert row["p50_ms"] <= row["p95_ms"] <= row["p99_ms"]
+        assert row["recall"] is None or 0.0 <= row["recall"] <= 1.0
+
+    budget = {"search": {"p95_ms": {"30": 0.0}, "min_recall": 1.01}}
+    violations = check_budget(rows, budget)
+    assert len(violations) == 2
+    assert check_budget(rows, {"search": {"p95_ms": {"1000": 0.0}}}) == []
@@ -0,0 +1,163 @@
+import io
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from flask import request as flask_request
+
+import routes.request_crud_routes as request_crud_routes
+from models import Blob, BlobRef, Contractor, Object, OpFile, Request
+from utils import blob_store
+
+
+def _age_blob(db, sha):
+    old = datetime.utcnow() - timedelta(seconds=blob_store.ORPHAN_GRACE + 60)
+    db.session.get(Blob, sha).created_at = old
+    db.session.commit()
+    stamp = time.time() - blob_store.ORPHAN_GRACE - 60
+    os.utime(blob_store.blob_path(sha), (stamp, stamp))
+
+
+def _refcounts():
+    return {b.sha256: b.refcount for b in Blob.query.all()}
+
+
+def test_create_request_links_one_blob(app, db, admin_client, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    obj = Object(name="Объект")
+    first, second = Contractor(name="А"), Contractor(name="Б")
+    db.session.add_all([obj, first, second])
+    db.session.commit()
+
+    resp = admin_client.post(
+        "/requests/crud/create_request",
+        data={
+            "object_id": str(obj.id),
+            "contractor_ids[]": [str(first.id), str(second.id)],
+            "manufacturers[]": ["Болид"],
+            "files[]": (io.BytesIO(b"spec" * 100), "spec.pdf"),
+        },
+        content_type="multipart/form-data",
+        headers={"X-Requested-With": "XMLHttpRequest"},
+    )
+    assert resp.status_code == 200
+    paths = [blob_store.ref_path(r.file_path) for r in Request.query.all()]
+    assert len(paths) == 2 and all(os.path.isfile(p) for p in paths)
+    assert os.path.samefile(paths[0], paths[1])
+    assert list(_refcounts().values()) == [2]
+    assert BlobRef.query.count() == 2
+
+
+def test_op_duplicates_and_garbage_collection(app, db, admin_client):
+    obj = Object(name="O")
+    db.session.add(obj)
+    db.session.commit()
+    ids = [
+        admin_client.post(
+            f"/api/op/{obj.id}/files",
+            data={"file": (io.BytesIO(b"same"), f"{name}.txt")},
+            content_type="multipart/form-data",
+        ).get_json()["id"]
+        for name in ("a", "b")
+    ]
+    (sha,) = _refcounts()
+    assert _refcounts() == {sha: 2}
+    assert admin_client.get(f"/op/files/{ids[1]}/download").data == b"same"
+
+    for file_id in ids:
+        admin_client.delete(f"/api/op/files/{file_id}")
+    db.session.expire_all()
+    assert _refcounts() == {sha: 0}
+
+    runner = app.test_cli_runner()
+    runner.invoke(args=["cleanup:uploads"])
+    assert os.path.exists(blob_store.blob_path(sha))
+    # Свежий блоб без ссылок может как раз переиспользовать загрузка
+    runner.invoke(args=["cleanup:uploads", "--no-dry-run"])
+    assert os.path.exists(blob_store.blob_path(sha))
+
+    _age_blob(db, sha)
+    runner.invoke(args=["cleanup:uploads", "--no-dry-run"])
+    assert not os.path.exists(blob_store.blob_path(sha))
+    assert Blob.query.count() == 0 and OpFile.query.count() == 0
+
+
+def test_garbage_collection_spares_blob_reused_by_upload(app, db):
+    sha, size = blob_store.store_stream(io.BytesIO(b"payload"))
+    db.session.add(Blob(sha256=sha, size=size, refcount=0))
+    db.session.commit()
+    _age_blob(db, sha)
+
+    # Загрузка того же содержимого: блоб найден, ссылка ещё не записана
+    assert blob_store.store_stream(io.BytesIO(b"payload")) == (sha, size)
+    assert blob_store.collect_garbage(dry_run=False) == (0, 0)
+    assert os.path.exists(blob_store.blob_path(sha))
+
+
+def test_migrate_dedupes_existing_uploads(app, db, admin_user, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    obj = Object(name="O")
+    db.session.add(obj)
+    db.session.commit()
+    paths = []
+    for _ in range(2):
+        req = Request(object_id=obj.id, manufacturers="m", created_by=admin_user.id)
+        db.session.add(req)
+        db.session.flush()
+        req.file_path = f"uploads/{req.id}/plan.pdf"
+        path = Path(blob_store.ref_path(req.file_path))
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"plan")
+        paths.append(path)
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["blobs:migrate"])
+    assert result.exit_code == 0
+    assert list(_refcounts().values()) == [2]
+    assert os.path.samefile(paths[0], paths[1])
+    assert paths[0].read_bytes() == b"plan"
+    # Повторный запуск ничего не меняет
+    assert blob_store.migrate()["files"] == 0
+
+
+def test_uploads_are_spooled_to_disk(app):
+    with app.test_request_context(
+        "/", method="POST", data={"f": (io.BytesIO(b"tiny"), "a.txt")}
+    ):
+        stream = flask_request.files["f"].stream
+        assert os.path.dirname(stream.name) == blob_store._tmp_dir()
+        sha, size = blob_store.store_stream(stream)
+        # Блоб — та же запись на диске, что и спул
+        assert os.path.samefile(stream.name, blob_store.blob_path(sha))
+        assert size == 4
+
+
+def test_create_request_size_limit_while_spooled(
+    app, db, admin_client, tmp_path, monkeypatch
+):
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    monkeypatch.setattr(request_crud_routes, "MAX_REQUEST_FILE_SIZE", 10)
+    obj, contractor = Object(name="O"), Contractor(name="А")
+    db.session.add_all([obj, contractor])
+    db.session.commit()
+
+    resp = admin_client.post(
+        "/requests/crud/create_request",
+        data={
+            "object_id": str(obj.id),
+            "contractor_ids[]": [str(contractor.id)],
+            "manufacturers[]": ["Болид"],
+            "files[]": [
+                (io.BytesIO(b"x" * 11), "big.pdf"),
+                (io.BytesIO(b"ok"), "small.pdf"),
+            ],
+        },
+        content_type="multipart/form-data",
+        headers={"X-Requested-With": "XMLHttpRequest"},
+    )
+    assert resp.status_code == 200
+    (req,) = Request.query.all()
+    assert req.file_path.endswith("small.pdf")
+    assert [b.size for b in Blob.query.all()] == [2]
+    assert os.listdir(blob_store._tmp_dir()) == []
@@ -0,0 +1,168 @@
+import io
+
+from sqlalchemy import event
+
+from models import Contractor, ImportJob, Object, Request
+from utils import bulk_import
+from utils.request_batch import BatchError, create_requests
+
+
+def _upload(client, kind, text, filename="data.csv"):
+    return client.post(
+        f"/imports/{kind}",
+        data={"file": (io.BytesIO(text.encode("utf-8")), filename)},
+        content_type="multipart/form-data",
+    )
+
+
+def _setup(app, monkeypatch, tmp_path):
+    monkeypatch.setitem(app.config, "IMPORT_DIR", str(tmp_path))
+    monkeypatch.setitem(app.config, "IMPORT_BACKGROUND", False)
+
+
+def test_import_objects_dedupes_and_reports(
+    app, db, admin_client, tmp_path, monkeypatch
+):
+    _setup(app, monkeypatch, tmp_path)
+    monkeypatch.setattr(bulk_import, "CHUNK_ROWS", 2)
+    db.session.add(Object(name="Склад"))
+    db.session.commit()
+    text = (
+        "Название;Адрес;Заказчик\n"
+        "СКЛАД;ул. Ленина;ООО Ромашка\n"
+        "Офис;ул. Мира;ООО Лютик\n"
+        ";без названия;\n"
+        "\n"
+        "Цех;ул. Заводская;\n"
+        "офис;повтор в файле;\n"
+        "Гараж;;\n"
+    )
+    selects = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "object" in statement:
+            selects.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        resp = _upload(admin_client, "objects", text)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    assert resp.status_code == 202
+    data = admin_client.get(resp.get_json()["links"]["self"]).get_json()
+    assert data["status"] == "done"
+    assert (data["total"], data["processed"]) == (6, 6)
+    assert (data["inserted"], data["skipped"], data["failed"]) == (3, 2, 1)
+    names = {o.name for o in Object.query.all()}
+    assert names == {"Склад", "Офис", "Цех", "Гараж"}
+    # Дубли ищутся по индексу в памяти, а не запросом на строку
+    assert len([s for s in selects if "FROM object" in s]) < 3
+
+    report = admin_client.get(data["links"]["errors"])
+    assert report.status_code == 200
+    lines = report.get_data(as_text=True).lstrip("﻿").splitlines()
+    assert lines[0] == "row,error,name,address,customer,phone"
+    assert [line.split(",")[0] for line in lines[1:]] == ["2", "4", "7"]
+
+
+def test_import_contractors_and_requests(app, db, admin_client, tmp_path, monkeypatch):
+    _setup(app, monkeypatch, tmp_path)
+    db.session.add(Contractor(name="Старый", inn="7700000000"))
+    db.session.commit()
+    resp = _upload(
+        admin_client,
+        "contractors",
+        "name,inn,email\n"
+        "Монтаж,7701000000,m@example.com\n"
+        "Дубль ИНН,7700000000,\n"
+        "Плохой ИНН,12,\n",
+    )
+    data = resp.get_json()
+    assert (data["inserted"], data["skipped"], data["failed"]) == (1, 1, 1)
+    assert Contractor.query.filter_by(inn="7701000000").one().email == "m@example.com"
+
+    db.session.add(Object(name="Склад"))
+    db.session.commit()
+    resp = _upload(
+        admin_client,
+        "requests",
+        "Объект,Подрядчик,Производители,Комментарий\n"
+        'склад,7701000000,"Болид, Рубеж",срочно\n'
+        "Склад,старый,Болид,\n"
+        "Нет такого,Старый,Болид,\n",
+    )
+    data = resp.get_json()
+    assert (data["inserted"], data["failed"], data["skipped"]) == (2, 0, 1)
+    assert sorted(r.manufacturers for r in Request.query.all()) == [
+        "Болид",
+        "Болид,Рубеж",
+    ]
+
+
+def test_import_rejects_bad_files(
+    app, db, admin_client, user_client, tmp_path, monkeypatch
+):
+    _setup(app, monkeypatch, tmp_path)
+    assert _upload(admin_client, "objects", "x", "data.txt").status_code == 400
+    resp = _upload(admin_client, "objects", "x", "data.xlsx")
+    assert resp.status_code == 400
+    assert "CSV" in resp.get_json()["error"]
+    assert _upload(admin_client, "users", "x").status_code == 400
+    resp = _upload(admin_client, "objects", "address\nул. Мира\n")
+    data = resp.get_json()
+    assert data["status"] == "failed"
+    assert "name" in data["message"]
+    assert ImportJob.query.count() == 1
+
+
+def test_import_requests_at_real_chunk_size(
+    app, db, admin_client, tmp_path, monkeypatch
+):
+    _setup(app, monkeypatch, tmp_path)
+    db.session.add_all([Object(name="Склад"), Contractor(name="Монтаж")])
+    db.session.commit()
+    batches = []
+
+    def counted(items, user_id):
+        batches.append(len(items))
+        return create_requests(items, user_id)
+
+    monkeypatch.setattr(bulk_import, "create_requests", counted)
+    rows = "".join(f"Склад,Монтаж,Болид,строка {i}\n" for i in range(1500))
+    resp = _upload(
+        admin_client, "requests", "object,contractor,manufacturers,comment\n" + rows
+    )
+    data = resp.get_json()
+    assert data["status"] == "done"
+    assert (data["processed"], data["inserted"], data["failed"]) == (1500, 1500, 0)
+    assert Request.query.count() == 1500
+    # Порции не больше MAX_BATCH_REQUESTS, без построчных повторов
+    assert batches == [1000, 500]
+
+
+def test_failed_rows_do_not_sink_their_chunk(
+    app, db, admin_client, tmp_path, monkeypatch
+):
+    _setup(app, monkeypatch, tmp_path)
+    db.session.add_all([Object(name="Склад"), Contractor(name="Монтаж")])
+    db.session.commit()
+    calls = []
+
+    # Объект второй строки «удалили» между проверкой и записью
+    def flaky(items, user_id):
+        calls.append(len(items))
+        if len(calls) == 1:
+            raise BatchError([{"index": 1, "error": "Объект не найден"}])
+        return create_requests(items, user_id)
+
+    monkeypatch.setattr(bulk_import, "create_requests", flaky)
+    rows = "".join(f"Склад,Монтаж,Болид,строка {i}\n" for i in range(5))
+    resp = _upload(
+        admin_client, "requests", "object,contractor,manufacturers,comment\n" + rows
+    )
+    data = resp.get_json()
+    assert calls == [5, 4]
+    assert (data["processed"], data["inserted"], data["failed"]) == (5, 4, 1)
+    assert Request.query.count() == 4
+    report = admin_client.get(data["links"]["errors"]).get_data(as_text=True)
+    assert report.lstrip("﻿").splitlines()[1].startswith("3,Объект не найден")
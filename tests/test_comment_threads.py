@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from models import Comment, Object, OpComment, Request, User
+from utils.comment_threads import FRAGMENTS
+
+
+def _object_with_comments(db, users, count):
+    obj = Object(name="Ветка")
+    db.session.add(obj)
+    db.session.commit()
+    for i in range(count):
+        db.session.add(
+            OpComment(
+                object_id=obj.id,
+                user_id=users[i % len(users)].id,
+                content=f"комментарий {i}",
+            )
+        )
+    db.session.commit()
+    return obj
+
+
+def _count_queries(db, func):
+    statements = []
+
+    def before(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before)
+    try:
+        func()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before)
+    return len(statements)
+
+
+def test_op_comments_pages_with_before_id(admin_client, db, admin_user):
+    obj = _object_with_comments(db, [admin_user], 5)
+
+    resp = admin_client.get(f"/api/op/{obj.id}/comments?limit=2")
+    assert [c["content"] for c in resp.get_json()] == [
+        "комментарий 3",
+        "комментарий 4",
+    ]
+    assert resp.headers["X-Has-More"] == "1"
+    first = resp.get_json()[0]["id"]
+
+    resp = admin_client.get(f"/api/op/{obj.id}/comments?limit=2&before_id={first}")
+    assert [c["content"] for c in resp.get_json()] == [
+        "комментарий 1",
+        "комментарий 2",
+    ]
+    resp = admin_client.get(f"/api/op/{obj.id}/comments?before_id={first - 2}")
+    assert len(resp.get_json()) == 1 and resp.headers["X-Has-More"] == "0"
+
+
+def test_op_comments_query_count_is_constant(admin_client, db, admin_user):
+    others = [User(username=f"u{i}", password="x") for i in range(3)]
+    db.session.add_all(others)
+    db.session.commit()
+    small = _object_with_comments(db, [admin_user], 1)
+    large = _object_with_comments(db, [admin_user, *others], 30)
+
+    def fetch(obj):
+        url = f"/api/op/{obj.id}/comments"
+        return lambda: admin_client.get(url)
+
+    # Прогрев: после коммитов теста первый запрос перечитывает пользователя
+    fetch(small)()
+    assert _count_queries(db, fetch(small)) == _count_queries(db, fetch(large))
+
+
+def test_fragments_cached_per_permission_class(
+    manager_client, db, admin_user, manager_user
+):
+    obj = _object_with_comments(db, [admin_user, manager_user], 2)
+    hits = FRAGMENTS.hits
+
+    foreign, own = manager_client.get(f"/api/op/{obj.id}/comments").get_json()
+    assert "delete-comment-btn" not in foreign["rendered_html"]
+    assert "comment-actions" in own["rendered_html"]
+    manager_client.get(f"/api/op/{obj.id}/comments")
+    assert FRAGMENTS.hits == hits + 2
+
+
+def test_view_request_renders_thread_from_loader(admin_client, db, admin_user):
+    obj = Object(name="Склад")
+    db.session.add(obj)
+    db.session.commit()
+    req = Request(object_id=obj.id, manufacturers="Зана", created_by=admin_user.id)
+    db.session.add(req)
+    db.session.commit()
+    db.session.add_all(
+        [
+            Comment(
+                request_id=req.id,
+                user_id=admin_user.id,
+                content="старый",
+                created_at=datetime.utcnow() - timedelta(hours=1),
+            ),
+            Comment(request_id=req.id, user_id=admin_user.id, content="свежий"),
+        ]
+    )
+    db.session.commit()
+
+    body = admin_client.get(f"/requests/crud/view_request/{req.id}").get_data(
+        as_text=True
+    )
+    assert body.index("старый") < body.index("свежий")
@@ -0,0 +1,91 @@
+from datetime import date, datetime
+
+from sqlalchemy import event
+
+from models import DashboardCounter, Object, Request
+from utils.dashboard_counters import reconcile, snapshot
+
+
+def _request(db, user, obj, **kwargs):
+    req = Request(object_id=obj.id, manufacturers="Болид", created_by=user.id, **kwargs)
+    db.session.add(req)
+    db.session.commit()
+    return req
+
+
+def test_counters_follow_insert_status_change_and_delete(db, admin_user):
+    obj = Object(name="Склад")
+    db.session.add(obj)
+    db.session.commit()
+    first = _request(db, admin_user, obj)
+    _request(db, admin_user, obj, created_at=datetime(2025, 1, 10))
+    assert snapshot() == {
+        "total_requests": 2,
+        "processed_requests": 0,
+        "unprocessed_requests": 2,
+        "today_count": 1,
+    }
+
+    first.status = "DONE"
+    db.session.commit()
+    assert snapshot()["processed_requests"] == 1
+    assert snapshot()["unprocessed_requests"] == 1
+    assert snapshot(date(2025, 1, 10))["today_count"] == 1
+
+    db.session.delete(first)
+    db.session.commit()
+    assert snapshot()["total_requests"] == 1
+    assert snapshot()["processed_requests"] == 0
+    assert reconcile(fix=False) == {}
+
+
+def test_reconcile_reports_and_fixes_drift(db, admin_user):
+    obj = Object(name="Склад")
+    db.session.add(obj)
+    db.session.commit()
+    _request(db, admin_user, obj)
+    # Массовое обновление в обход ORM счётчики не видят
+    Request.query.update({"status": "DONE"})
+    db.session.commit()
+
+    drift = reconcile(fix=False)
+    assert drift == {"status:DONE": (0, 1), "status:OPEN": (1, 0)}
+    assert reconcile() == drift
+    assert reconcile(fix=False) == {}
+    assert db.session.get(DashboardCounter, "status:DONE").value == 1
+
+
+def test_dashboard_renders_counters_without_count_queries(admin_client, db, admin_user):
+    obj = Object(name="Склад")
+    db.session.add(obj)
+    db.session.commit()
+    _request(db, admin_user, obj)
+    db.session.merge(DashboardCounter(name="total", value=42))
+    db.session.commit()
+    body = admin_client.get("/dashboard").get_data(as_text=True)
+    assert "42" in body
+
+
+def test_counter_insert_survives_concurrent_first_row(db, admin_user):
+    obj = Object(name="Склад")
+    db.session.add(obj)
+    db.session.commit()
+    raced = []
+
+    def other_worker(conn, cursor, statement, parameters, context, executemany):
+        # Параллельный запрос успел создать строку ключа перед нашей вставкой
+        if raced or not statement.startswith("INSERT INTO dashboard_counter"):
+            return
+        raced.append(statement)
+        conn.connection.cursor().execute(
+            "INSERT INTO dashboard_counter (name, value) VALUES (?, 1)",
+            ("created:2025-03-01",),
+        )
+
+    event.listen(db.engine, "before_cursor_execute", other_worker)
+    try:
+        _request(db, admin_user, obj, created_at=datetime(2025, 3, 1))
+    finally:
+        event.remove(db.engine, "before_cursor_execute", other_worker)
+    assert raced
+    assert db.session.get(DashboardCounter, "created:2025-03-01").value == 2
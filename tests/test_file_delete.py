@@ -40,7 +40,10 @@ def test_delete_screenshot_forbidden(app, db):
     assert Attachment.query.count() == 1
 
 
-def test_delete_screenshot_success(app, db, admin_client, admin_user):
+def test_delete_screenshot_success(
+    app, db, admin_client, admin_user, tmp_path, monkeypatch
+):
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
     obj = Object(name="Объект")
     contractor = Contractor(name="Подрядчик")
     db.session.add_all([obj, contractor])
@@ -56,7 +59,7 @@ def test_delete_screenshot_success(app, db, admin_client, admin_user):
     db.session.commit()
 
     rel_path = Path("uploads") / str(req.id) / "test.png"
-    full_path = Path(app.root_path) / "static" / rel_path
+    full_path = tmp_path / rel_path
     full_path.parent.mkdir(parents=True, exist_ok=True)
     full_path.write_bytes(b"demo")
 
@@ -82,3 +85,41 @@ def test_delete_screenshot_success(app, db, admin_client, admin_user):
     assert payload["success"] is True
     assert Attachment.query.get(attachment.id) is None
     assert not full_path.exists()
+
+
+def test_delete_screenshot_keeps_file_when_commit_fails(
+    app, db, admin_client, admin_user, tmp_path, monkeypatch
+):
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    obj = Object(name="Объект")
+    contractor = Contractor(name="Подрядчик")
+    db.session.add_all([obj, contractor])
+    db.session.commit()
+    req = Request(object_id=obj.id, manufacturers="П", created_by=admin_user.id)
+    db.session.add(req)
+    db.session.commit()
+    rel_path = Path("uploads") / str(req.id) / "kept.png"
+    full_path = tmp_path / rel_path
+    full_path.parent.mkdir(parents=True, exist_ok=True)
+    full_path.write_bytes(b"demo")
+    attachment = Attachment(
+        request_id=req.id,
+        contractor_id=contractor.id,
+        manufacturer="П",
+        screenshot=rel_path.as_posix(),
+        uploaded_by=admin_user.id,
+    )
+    db.session.add(attachment)
+    db.session.commit()
+
+    def fail():
+        raise RuntimeError("commit failed")
+
+    monkeypatch.setattr(db.session, "commit", fail)
+    response = admin_client.post(
+        f"/files/delete_screenshot/{attachment.id}",
+        headers={"X-Requested-With": "XMLHttpRequest"},
+    )
+    assert response.status_code == 500
+    assert full_path.exists()
+    assert db.session.get(Attachment, attachment.id) is not None
@@ -0,0 +1,74 @@
+import importlib
+import random
+import sys
+
+import pytest
+
+from routes import search_routes
+from utils.fuzzy_scorer import score_batch
+
+WORDS = [
+    "Ромашка",
+    "ромашко",
+    "Вектор",
+    "вектар",
+    "склад",
+    "Казань",
+    "улица Ленина",
+    "ООО",
+    "Пульсар",
+    "Зана",
+    "ёлка",
+    "елка",
+    "Bolid",
+    "bolld",
+    "Rubezh",
+    "7700000001",
+    "д. 12",
+]
+
+
+def _corpus(rng, size):
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        for _ in range(size)
+    ] + ["", None]
+
+
+@pytest.fixture()
+def real_fuzz(monkeypatch):
+    # conftest подменяет thefuzz заглушкой; для сверки нужен настоящий модуль
+    monkeypatch.delitem(sys.modules, "thefuzz", raising=False)
+    monkeypatch.delitem(sys.modules, "thefuzz.fuzz", raising=False)
+    monkeypatch.delitem(sys.modules, "thefuzz.utils", raising=False)
+    fuzz = importlib.import_module("thefuzz.fuzz")
+    monkeypatch.setattr(search_routes, "fuzz", fuzz)
+    return fuzz
+
+
+@pytest.mark.parametrize("threshold", [0, 0.3, 0.4, 0.6])
+def test_scores_match_advanced_search_similarity(real_fuzz, threshold):
+    rng = random.Random(42)
+    texts = _corpus(rng, 400)
+    for query in ["ромашка", "Вектор склад", "bolid", "елка", "770", "пульсар зана"]:
+        expected = [
+            search_routes.advanced_search_similarity(query, t, threshold) for t in texts
+        ]
+        assert score_batch(query, texts, threshold) == expected
+
+
+def test_search_with_multiple_fields_keeps_best_field(real_fuzz):
+    class Item:
+        def __init__(self, name, address):
+            self.name = name
+            self.address = address
+
+    items = [
+        Item("Склад", "Казань"),
+        Item("Вектор", None),
+        Item("Бокс", "Новосибирск"),
+    ]
+    results = search_routes.search_with_multiple_fields(
+        "казан", items, ["name", "address"], threshold=0.4
+    )
+    assert [(r[0].name, r[2]) for r in results] == [("Склад", "address")]
@@ -0,0 +1,118 @@
+import html
+import re
+from datetime import datetime
+
+from models import Contractor, Object, Request
+from utils.pagination import (
+    cached_count,
+    decode_cursor,
+    encode_cursor,
+    keyset_paginate,
+)
+from utils.search_cache import TOTALS
+
+
+def _seed(db, user, count=7):
+    obj = Object(name="Склад")
+    contractor = Contractor(name="Вектор")
+    db.session.add_all([obj, contractor])
+    db.session.commit()
+    # Одинаковые даты у пар заявок: порядок решает id
+    for i in range(count):
+        req = Request(
+            object_id=obj.id,
+            manufacturers="Болид",
+            created_by=user.id,
+            created_at=datetime(2026, 1, 1 + i // 2),
+        )
+        db.session.add(req)
+        req.contractors = [contractor]
+    db.session.commit()
+    return [
+        r.id
+        for r in Request.query.order_by(
+            Request.created_at.desc(), Request.id.desc()
+        ).all()
+    ]
+
+
+def test_cursor_round_trip_and_garbage():
+    cursor = encode_cursor([datetime(2026, 1, 2, 3, 4), 15])
+    assert decode_cursor(cursor) == ("next", [datetime(2026, 1, 2, 3, 4), 15])
+    assert decode_cursor("не-курсор") is None
+    assert decode_cursor(None) is None
+
+
+def test_keyset_walks_forward_and_back(db, admin_user):
+    expected = _seed(db, admin_user)
+    columns = (Request.created_at, Request.id)
+
+    pages, cursor = [], None
+    while True:
+        page = keyset_paginate(Request.query, columns, cursor, 3, total=7)
+        pages.append([r.id for r in page.items])
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+    assert sum(pages, []) == expected
+    assert [len(p) for p in pages] == [3, 3, 1]
+
+    back = keyset_paginate(Request.query, columns, page.prev_cursor, 3, total=7)
+    assert [r.id for r in back.items] == pages[1]
+    assert back.has_next and back.has_prev
+
+
+def test_dashboard_and_api_keyset_mode(admin_client, db, admin_user):
+    expected = _seed(db, admin_user, count=12)
+
+    body = admin_client.get("/dashboard?mode=keyset&per_page=10").get_data(as_text=True)
+    assert body.count('class="table-row"') == 10
+    next_url = html.unescape(re.search(r'data-next-url="([^"]+)"', body).group(1))
+    body = admin_client.get(next_url).get_data(as_text=True)
+    assert body.count('class="table-row"') == 2
+    assert "data-next-url" not in body
+
+    data = admin_client.get("/requests/crud/requests?mode=keyset&per_page=8").get_json()
+    assert [r["id"] for r in data["data"]] == expected[:8]
+    data = admin_client.get(
+        f"/requests/crud/requests?per_page=8&cursor={data['next_cursor']}"
+    ).get_json()
+    assert [r["id"] for r in data["data"]] == expected[8:]
+    assert data["next_cursor"] is None and data["total"] == 12
+
+
+def test_cached_count_reuses_total_until_write(app, db, admin_user, monkeypatch):
+    _seed(db, admin_user, count=2)
+    monkeypatch.setitem(app.config, "PAGINATION_TOTAL_TTL", 0)
+    hits = TOTALS.hits
+    assert cached_count(Request.query) == 2
+    assert cached_count(Request.query) == 2
+    assert TOTALS.hits == hits + 1
+
+    db.session.add(
+        Request(object_id=1, manufacturers="Болид", created_by=admin_user.id)
+    )
+    db.session.commit()
+    assert cached_count(Request.query) == 3
+
+
+def test_cursor_links_keep_order_and_filters(admin_client, db):
+    db.session.add_all(
+        Object(
+            name=f"Склад-{i:02d}",
+            customer="Другой" if i % 5 == 4 else "ООО Ромашка",
+            created_at=datetime(2026, 1, 1 + i),
+        )
+        for i in range(15)
+    )
+    db.session.commit()
+    # 12 объектов «ООО Ромашка» по возрастанию даты: 10 + 2
+    url = (
+        "/objects/objects?mode=keyset&per_page=10&order=asc&filter_customer=ООО Ромашка"
+    )
+    body = admin_client.get(url).get_data(as_text=True)
+    next_url = html.unescape(re.search(r'data-next-url="([^"]+)"', body).group(1))
+    assert "order=asc" in next_url and "filter_customer=" in next_url
+    body = admin_client.get(next_url).get_data(as_text=True)
+    names = sorted(set(re.findall(r"Склад-\d\d", body)))
+    assert names == ["Склад-12", "Склад-13"]
@@ -1,7 +1,9 @@
 import io
 
+from sqlalchemy import event
+
 import routes.op_api as op_api
-from models import Object, Request
+from models import Object, OpKPCategory, Request
 from utils.statuses import RequestStatus
 
 
@@ -126,6 +128,82 @@ def test_kp_patch_position(admin_client, db):
     assert [c["id"] for c in data_sorted] == [id2, id1]
 
 
+def test_kp_bulk_reorder_and_edit(admin_client, db):
+    obj = Object(name="O")
+    db.session.add(obj)
+    db.session.commit()
+    cats = admin_client.get(f"/api/op/{obj.id}/kp").get_json()
+    assert len(cats) == 12
+    ov = [c["id"] for c in cats if c["side"] == "OV"]
+    vk = [c["id"] for c in cats if c["side"] == "VK"]
+
+    updates = []
+
+    def count(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("UPDATE OP_KP_CATEGORY"):
+            updates.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        items = [{"id": ov[-1], "name": "Первая"}] + [{"id": i} for i in ov[:-1]]
+        items[1]["invoice_number"] = "С-1"
+        resp = admin_client.patch(
+            f"/api/op/{obj.id}/kp", json={"side": "OV", "items": items}
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    assert resp.get_json() == {"success": True, "updated": 6}
+    assert len(updates) == 1
+
+    cats = admin_client.get(f"/api/op/{obj.id}/kp").get_json()
+    by_pos = [c for c in cats if c["side"] == "OV"]
+    assert [c["id"] for c in by_pos] == [ov[-1]] + ov[:-1]
+    assert by_pos[0]["name"] == "Первая" and by_pos[1]["invoice_number"] == "С-1"
+    assert by_pos[2]["name"] == "Категория 2"
+
+    bad = {"side": "OV", "items": [{"id": vk[0]}]}
+    assert admin_client.patch(f"/api/op/{obj.id}/kp", json=bad).status_code == 404
+    # Часть стороны: позиции остальных категорий совпали бы с новыми
+    bad = {"side": "OV", "items": [{"id": i} for i in reversed(ov[:2])]}
+    assert admin_client.patch(f"/api/op/{obj.id}/kp", json=bad).status_code == 400
+    positions = [
+        c["position"]
+        for c in admin_client.get(f"/api/op/{obj.id}/kp").get_json()
+        if c["side"] == "OV"
+    ]
+    assert positions == list(range(1, 7))
+    bad = {"side": "XX", "items": [{"id": ov[0]}]}
+    assert admin_client.patch(f"/api/op/{obj.id}/kp", json=bad).status_code == 400
+    bad = {"side": "OV", "items": [{"id": ov[0], "name": " "}]}
+    assert admin_client.patch(f"/api/op/{obj.id}/kp", json=bad).status_code == 400
+
+
+def test_kp_base_recreated_after_last_delete(admin_client, db):
+    obj = Object(name="O")
+    db.session.add(obj)
+    db.session.commit()
+    ids = [c["id"] for c in admin_client.get(f"/api/op/{obj.id}/kp").get_json()]
+    for cat_id in ids:
+        admin_client.delete(f"/api/op/kp/{cat_id}")
+    assert OpKPCategory.query.filter_by(object_id=obj.id).count() == 0
+    assert len(admin_client.get(f"/api/op/{obj.id}/kp").get_json()) == 12
+
+
+def test_kp_base_recreated_after_delete_in_other_worker(admin_client, db):
+    obj = Object(name="O")
+    db.session.add(obj)
+    db.session.commit()
+    assert len(admin_client.get(f"/api/op/{obj.id}/kp").get_json()) == 12
+
+    # Другой воркер удалил все категории в обход этого процесса
+    db.session.execute(
+        OpKPCategory.__table__.delete().where(OpKPCategory.object_id == obj.id)
+    )
+    db.session.commit()
+    assert len(admin_client.get(f"/api/op/{obj.id}/kp").get_json()) == 12
+
+
 def test_groups_filter(admin_client, db, admin_user):
     obj = Object(name="O")
     db.session.add(obj)
@@ -264,3 +342,85 @@ def test_op_requests_filter_by_side_and_limit(admin_client, db, admin_user):
     assert len(items) == 1
     assert all("Ридан ВК" not in item["manufacturers"] for item in items)
     assert payload["has_more"] is True
+
+
+def test_op_requests_cursor_pages(admin_client, db, admin_user):
+    obj = Object(name="OP cursor")
+    db.session.add(obj)
+    db.session.commit()
+    reqs = [
+        Request(object_id=obj.id, manufacturers="Зана", created_by=admin_user.id)
+        for _ in range(5)
+    ]
+    db.session.add_all(reqs)
+    db.session.commit()
+    expected = sorted((r.id for r in reqs), reverse=True)
+
+    seen, cursor = [], None
+    while True:
+        query = {"limit": 2, "offset": 1}
+        if cursor:
+            query["cursor"] = cursor
+        payload = admin_client.get(
+            f"/api/op/{obj.id}/requests", query_string=query
+        ).get_json()
+        seen.extend(item["id"] for item in payload["data"])
+        cursor = payload["next_cursor"]
+        if not payload["has_more"]:
+            assert cursor is None
+            break
+    # offset действует только без курсора
+    assert seen == expected[1:]
+
+
+def test_op_bundle_sections_and_etag(admin_client, db):
+    obj = Object(name="O")
+    db.session.add(obj)
+    db.session.commit()
+    url = f"/api/op/{obj.id}/bundle"
+
+    resp = admin_client.get(f"{url}?include=comments,files")
+    assert resp.status_code == 200
+    assert set(resp.get_json()) == {"comments", "files"}
+    assert resp.get_json()["comments"] == {"items": [], "has_more": False}
+    assert set(admin_client.get(url).get_json()) == set(op_api.BUNDLE_SECTIONS)
+    assert admin_client.get(f"{url}?include=comments,wat").status_code == 400
+
+    etag = resp.headers["ETag"]
+    again = admin_client.get(
+        f"{url}?include=comments,files", headers={"If-None-Match": etag}
+    )
+    assert again.status_code == 304 and again.get_data() == b""
+
+    admin_client.post(f"/api/op/{obj.id}/comments", data={"content": "привет"})
+    fresh = admin_client.get(
+        f"{url}?include=comments,files", headers={"If-None-Match": etag}
+    )
+    assert fresh.status_code == 200 and fresh.headers["ETag"] != etag
+    assert len(fresh.get_json()["comments"]["items"]) == 1
+
+
+def test_op_bundle_304_skips_section_queries(admin_client, db, admin_user, monkeypatch):
+    obj = Object(name="O")
+    db.session.add(obj)
+    db.session.commit()
+    req = Request(object_id=obj.id, manufacturers="Болид", created_by=admin_user.id)
+    db.session.add(req)
+    db.session.commit()
+    url = f"/api/op/{obj.id}/bundle?include=groups,requests,kp"
+    etag = admin_client.get(url).headers["ETag"]
+
+    def fail(*_a, **_k):
+        raise AssertionError("304 не должен собирать разделы")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(op_api, "_requests_page", fail)
+        patch.setattr(op_api, "_groups_for_objects", fail)
+        again = admin_client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["ETag"] == etag
+
+    req.status = "DONE"
+    db.session.commit()
+    fresh = admin_client.get(url, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.headers["ETag"] != etag
+    assert fresh.get_json()["requests"]["data"][0]["status"] == "DONE"
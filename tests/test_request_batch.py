@@ -0,0 +1,105 @@
+from sqlalchemy import event
+
+from models import Comment, Contractor, Object, Request, RequestSummary
+from utils.request_batch import BatchItem, create_requests
+
+
+def _seed(db, contractors=5):
+    obj = Object(name="Склад")
+    items = [Contractor(name=f"Подрядчик {i}") for i in range(contractors)]
+    db.session.add(obj)
+    db.session.add_all(items)
+    db.session.commit()
+    return obj, [c.id for c in items]
+
+
+def test_batch_endpoint_creates_requests_in_bulk(admin_client, db):
+    obj, contractor_ids = _seed(db)
+    inserts = []
+
+    # Вызовы execute() уровня SQLAlchemy: сколько строк уходит одним пакетом,
+    # решает уже диалект (insertmanyvalues)
+    def count(conn, clauseelement, multiparams, params, execution_options):
+        if getattr(clauseelement, "is_insert", False):
+            inserts.append((clauseelement.table.name, len(multiparams)))
+
+    payload = {
+        "requests": [
+            {
+                "object_id": obj.id,
+                "contractor_ids": contractor_ids,
+                "manufacturers": ["Болид", "Рубеж"],
+                "comment": "срочно",
+            },
+            {
+                "object_id": obj.id,
+                "contractor_ids": contractor_ids[:2],
+                "manufacturers": ["Болид"],
+            },
+        ]
+    }
+    event.listen(db.engine, "before_execute", count)
+    try:
+        resp = admin_client.post("/api/v1/requests:batch", json=payload)
+    finally:
+        event.remove(db.engine, "before_execute", count)
+    assert resp.status_code == 201
+    data = resp.get_json()
+    assert data["count"] == 7
+    assert [r["contractor_id"] for r in data["data"]] == (
+        contractor_ids + contractor_ids[:2]
+    )
+    # Заявки, связи и комментарии — по одному пакетному INSERT на таблицу
+    batches = {
+        table: [rows for name, rows in inserts if name == table]
+        for table in ("request", "request_contractor", "comment")
+    }
+    assert batches == {"request": [7], "request_contractor": [7], "comment": [5]}
+    assert Comment.query.count() == 5
+    assert RequestSummary.query.count() == 7
+
+
+def test_batch_is_all_or_nothing(admin_client, db):
+    obj, contractor_ids = _seed(db, contractors=1)
+    payload = {
+        "requests": [
+            {
+                "object_id": obj.id,
+                "contractor_ids": contractor_ids,
+                "manufacturers": ["A"],
+            },
+            {"object_id": obj.id, "contractor_ids": [999], "manufacturers": ["A"]},
+        ]
+    }
+    resp = admin_client.post("/api/v1/requests:batch", json=payload)
+    assert resp.status_code == 400
+    assert resp.get_json()["errors"] == [
+        {"index": 1, "error": "Подрядчики не найдены: 999"}
+    ]
+    assert Request.query.count() == 0
+
+    del payload["requests"][1]["manufacturers"]
+    assert admin_client.post("/api/v1/requests:batch", json=payload).status_code == 400
+
+
+def test_form_uses_batch_service(admin_client, db, admin_user):
+    obj, contractor_ids = _seed(db, contractors=3)
+    resp = admin_client.post(
+        "/requests/crud/create_request",
+        data={
+            "object_id": str(obj.id),
+            "contractor_ids[]": [str(c) for c in contractor_ids],
+            "manufacturers[]": ["Болид"],
+            "request_comment": "привет",
+        },
+        headers={"X-Requested-With": "XMLHttpRequest"},
+    )
+    assert resp.get_json()["success"] is True
+    reqs = Request.query.order_by(Request.id).all()
+    assert [r.contractor_id for r in reqs] == contractor_ids
+    assert all(r.comments[0].content == "привет" for r in reqs)
+
+    created = create_requests(
+        [BatchItem(obj.id, [contractor_ids[0]], ["Рубеж"])], admin_user.id
+    )
+    assert created[0].manufacturers == "Рубеж" and not created[0].comments
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+from flask_login import login_user
+from sqlalchemy import event
+
+from models import Attachment, Comment, Contractor, Object, Request, User
+from utils import request_detail
+
+
+def _seed(db, admin_user, comments, attachments):
+    obj = Object(name="Склад")
+    contractors = [Contractor(name=f"Подрядчик {i}") for i in range(attachments + 1)]
+    authors = [
+        User(username=f"author{comments}_{i}", password="x") for i in range(comments)
+    ]
+    db.session.add(obj)
+    db.session.add_all(contractors + authors)
+    db.session.flush()
+    req = Request(
+        object_id=obj.id,
+        manufacturers="Болид,Рубеж",
+        created_by=admin_user.id,
+        processed_by=admin_user.id,
+        processed_at=datetime.utcnow(),
+    )
+    req.contractors = contractors[:2]
+    db.session.add(req)
+    db.session.flush()
+    db.session.add_all(
+        Comment(request_id=req.id, user_id=author.id, content=f"комментарий {i}")
+        for i, author in enumerate(authors)
+    )
+    db.session.add_all(
+        Attachment(
+            request_id=req.id,
+            contractor_id=contractor.id,
+            manufacturer="Болид",
+            screenshot=f"uploads/{req.id}/shot{i}.png",
+            uploaded_by=admin_user.id,
+        )
+        for i, contractor in enumerate(contractors[1:])
+    )
+    db.session.commit()
+    return req.id
+
+
+def _count_selects(db, action):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    db.session.expire_all()
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        result = action()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    return result, len(statements)
+
+
+def test_detail_query_count_is_constant(app, db, admin_user):
+    small = _seed(db, admin_user, comments=1, attachments=1)
+    large = _seed(db, admin_user, comments=40, attachments=30)
+
+    with app.test_request_context():
+        login_user(admin_user)
+        detail, small_queries = _count_selects(db, lambda: request_detail.load(small))
+        assert len(detail.comments) == 1 and len(detail.attachments) == 1
+        detail, large_queries = _count_selects(db, lambda: request_detail.load(large))
+    assert len(detail.comments) == 40 and len(detail.attachments) == 30
+    assert large_queries == small_queries <= 6
+    assert detail.processed_by_user.username == admin_user.username
+    assert detail.object_info.name == "Склад"
+    assert len(detail.contractors) == 2
+    assert sorted(detail.attachment_contractors.values())[:2] == [
+        "Подрядчик 1",
+        "Подрядчик 10",
+    ]
+
+
+def test_view_page_query_count_is_constant(db, admin_client, admin_user):
+    small = _seed(db, admin_user, comments=1, attachments=1)
+    large = _seed(db, admin_user, comments=40, attachments=30)
+
+    def view(request_id):
+        return lambda: admin_client.get(f"/requests/crud/view_request/{request_id}")
+
+    resp, small_queries = _count_selects(db, view(small))
+    assert resp.status_code == 200
+    resp, large_queries = _count_selects(db, view(large))
+    assert resp.status_code == 200
+    assert "комментарий 39" in resp.get_data(as_text=True)
+    assert large_queries == small_queries
@@ -0,0 +1,156 @@
+import hashlib
+import io
+import os
+from pathlib import Path
+
+from models import Attachment, BlobRef, Contractor, Object, Request, RequestFile
+from utils import blob_store, request_files
+
+
+def _create(admin_client, db, content=b"spec" * 100):
+    obj = Object(name="Объект")
+    contractor = Contractor(name="Подрядчик")
+    db.session.add_all([obj, contractor])
+    db.session.commit()
+    resp = admin_client.post(
+        "/requests/crud/create_request",
+        data={
+            "object_id": str(obj.id),
+            "contractor_ids[]": [str(contractor.id)],
+            "manufacturers[]": ["Болид"],
+            "files[]": (io.BytesIO(content), "spec.pdf"),
+        },
+        content_type="multipart/form-data",
+        headers={"X-Requested-With": "XMLHttpRequest"},
+    )
+    assert resp.status_code == 200
+    return Request.query.one()
+
+
+def test_upload_recorded_and_view_skips_filesystem(
+    app, db, admin_client, tmp_path, monkeypatch
+):
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    content = b"spec" * 100
+    req = _create(admin_client, db, content)
+    item = RequestFile.query.one()
+    assert item.request_id == req.id
+    assert item.path == req.file_path
+    assert (item.size, item.mime) == (len(content), "application/pdf")
+    assert item.sha256 == hashlib.sha256(content).hexdigest()
+
+    calls = []
+
+    # Шаблоны Jinja тоже проверяются через os.path — ловим только каталог загрузок
+    def watch(func):
+        def wrapper(path=".", *args, **kwargs):
+            if "uploads" in str(path):
+                calls.append((func.__name__, path))
+            return func(path, *args, **kwargs)
+
+        return wrapper
+
+    for module, name in (
+        (os, "listdir"),
+        (os, "scandir"),
+        (os, "stat"),
+        (os.path, "exists"),
+        (os.path, "isfile"),
+        (os.path, "getsize"),
+    ):
+        monkeypatch.setattr(module, name, watch(getattr(module, name)))
+    resp = admin_client.get(f"/requests/crud/view_request/{req.id}")
+    assert resp.status_code == 200
+    assert item.filename in resp.get_data(as_text=True)
+    assert calls == []
+
+
+def test_delete_request_uses_request_file(app, db, admin_client, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    req = _create(admin_client, db)
+    path = Path(blob_store.ref_path(req.file_path))
+    assert path.is_file()
+
+    resp = admin_client.post(f"/requests/crud/delete_request/{req.id}")
+    assert resp.status_code == 302
+    assert not path.exists() and not path.parent.exists()
+    assert RequestFile.query.count() == 0
+    assert BlobRef.query.count() == 0
+
+
+def test_files_kept_when_delete_commit_fails(
+    app, db, admin_client, tmp_path, monkeypatch
+):
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    req = _create(admin_client, db)
+    path = Path(blob_store.ref_path(req.file_path))
+
+    def fail():
+        raise RuntimeError("commit failed")
+
+    monkeypatch.setattr(db.session, "commit", fail)
+    resp = admin_client.post(f"/requests/crud/delete_request/{req.id}")
+    assert resp.status_code == 500
+    monkeypatch.undo()
+    assert path.is_file()
+    assert db.session.get(Request, req.id) is not None
+    assert BlobRef.query.count() == 1
+
+
+def _legacy_request(app, db, admin_user, tmp_path, monkeypatch):
+    """Заявка с файлами из времён до ``request_file`` (один файл пропал)."""
+    monkeypatch.setitem(app.config, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    obj = Object(name="O")
+    contractor = Contractor(name="C")
+    db.session.add_all([obj, contractor])
+    db.session.commit()
+    req = Request(object_id=obj.id, manufacturers="m", created_by=admin_user.id)
+    db.session.add(req)
+    db.session.commit()
+    req.file_path = f"uploads/{req.id}/old.txt,uploads/{req.id}/gone.txt"
+    db.session.add(
+        Attachment(
+            request_id=req.id,
+            contractor_id=contractor.id,
+            manufacturer="m",
+            screenshot=f"uploads/{req.id}/shot.png",
+            uploaded_by=admin_user.id,
+        )
+    )
+    db.session.commit()
+    upload_dir = tmp_path / "uploads" / str(req.id)
+    upload_dir.mkdir(parents=True)
+    (upload_dir / "old.txt").write_bytes(b"old")
+    (upload_dir / "shot.png").write_bytes(b"png")
+    return req
+
+
+def test_backfill_legacy_files(app, db, admin_user, tmp_path, monkeypatch):
+    _legacy_request(app, db, admin_user, tmp_path, monkeypatch)
+    result = app.test_cli_runner().invoke(args=["files:backfill"])
+    assert result.exit_code == 0
+    rows = {f.filename: f for f in RequestFile.query.all()}
+    assert set(rows) == {"old.txt", "shot.png"}
+    assert rows["old.txt"].sha256 == hashlib.sha256(b"old").hexdigest()
+    assert rows["shot.png"].mime == "image/png"
+    assert request_files.backfill() == {"files": 0, "missing": 1}
+
+
+def test_legacy_files_listed_before_backfill(
+    app, db, admin_user, admin_client, tmp_path, monkeypatch
+):
+    req = _legacy_request(app, db, admin_user, tmp_path, monkeypatch)
+    page = admin_client.get(f"/requests/crud/view_request/{req.id}").get_data(
+        as_text=True
+    )
+    assert "old.txt" in page and "shot.png" in page
+    assert "gone.txt" not in page
+
+    # dry-run ничего не пишет в БД и не считает старые файлы осиротевшими
+    result = app.test_cli_runner().invoke(args=["cleanup:uploads"])
+    assert result.exit_code == 0
+    assert RequestFile.query.count() == 0
+    result = app.test_cli_runner().invoke(args=["cleanup:uploads", "--no-dry-run"])
+    assert result.exit_code == 0
+    assert (tmp_path / "uploads" / str(req.id) / "old.txt").exists()
+    assert RequestFile.query.count() == 2
@@ -0,0 +1,108 @@
+from sqlalchemy import select
+
+from models import Object, Request, request_manufacturer
+from utils.request_manufacturers import backfill, group_counts
+
+
+def _stored(db):
+    return sorted(
+        db.session.execute(
+            select(
+                request_manufacturer.c.request_id, request_manufacturer.c.manufacturer
+            )
+        ).all()
+    )
+
+
+def test_rows_follow_request_writes_and_backfill(db, admin_user):
+    obj = Object(name="Склад")
+    db.session.add(obj)
+    db.session.commit()
+    req = Request(
+        object_id=obj.id,
+        manufacturers="Пульсар, Зана,Пульсар",
+        created_by=admin_user.id,
+    )
+    db.session.add(req)
+    db.session.commit()
+    assert _stored(db) == [(req.id, "Зана"), (req.id, "Пульсар")]
+    assert req.manufacturers_list == ["Пульсар", " Зана", "Пульсар"]
+
+    req.manufacturers = "Евра"
+    db.session.commit()
+    assert _stored(db) == [(req.id, "Евра")]
+    assert group_counts([obj.id]) == {obj.id: {"Евра": 1}}
+
+    db.session.execute(request_manufacturer.delete())
+    db.session.commit()
+    assert backfill() == 1
+    assert _stored(db) == [(req.id, "Евра")]
+
+    db.session.delete(req)
+    db.session.commit()
+    assert _stored(db) == []
+
+
+def test_op_requests_match_whole_manufacturer_names(admin_client, db, admin_user):
+    obj = Object(name="OP")
+    db.session.add(obj)
+    db.session.commit()
+    exact = Request(
+        object_id=obj.id, manufacturers="Ридан ОВ", created_by=admin_user.id
+    )
+    other = Request(
+        object_id=obj.id, manufacturers="Ридан ОВ-2,Зана", created_by=admin_user.id
+    )
+    db.session.add_all([exact, other])
+    db.session.commit()
+
+    data = admin_client.get(
+        f"/api/op/{obj.id}/requests", query_string={"manufacturer": "Ридан ОВ"}
+    ).get_json()["data"]
+    assert [item["id"] for item in data] == [exact.id]
+
+    groups = admin_client.get(f"/api/op/{obj.id}/groups?status=OPEN").get_json()
+    counts = {g["id"]: g["count"] for g in groups}
+    assert counts["Ридан ОВ"] == 1 and counts["Зана"] == 1
+
+
+def test_batch_groups_one_query_for_many_objects(admin_client, db, admin_user):
+    first, second, empty = Object(name="А"), Object(name="Б"), Object(name="В")
+    db.session.add_all([first, second, empty])
+    db.session.commit()
+    db.session.add_all(
+        [
+            Request(
+                object_id=first.id,
+                manufacturers="Ридан ОВ,Зана",
+                created_by=admin_user.id,
+            ),
+            Request(
+                object_id=second.id, manufacturers="Ридан ВК", created_by=admin_user.id
+            ),
+            Request(
+                object_id=second.id,
+                manufacturers="Ридан ВК",
+                created_by=admin_user.id,
+                status="DONE",
+            ),
+        ]
+    )
+    db.session.commit()
+
+    data = admin_client.get(
+        f"/api/op/groups?objects={first.id},{second.id},{empty.id}&status=OPEN&side=VK"
+    ).get_json()
+    counts = {
+        int(oid): {g["id"]: g["count"] for g in groups} for oid, groups in data.items()
+    }
+    assert "Ридан ОВ" not in counts[first.id]
+    assert counts[first.id]["Зана"] == 1
+    assert counts[second.id]["Ридан ВК"] == 1
+    assert set(counts[empty.id].values()) == {0}
+    single = admin_client.get(
+        f"/api/op/{second.id}/groups?status=OPEN&side=VK"
+    ).get_json()
+    assert single == data[str(second.id)]
+
+    assert admin_client.get("/api/op/groups?objects=x").status_code == 400
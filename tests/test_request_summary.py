@@ -0,0 +1,89 @@
+from models import Attachment, Contractor, Object, Request, RequestSummary
+from utils.request_summary import dashboard_rows, rebuild
+
+
+def _seed(db, user):
+    obj = Object(name="Склад")
+    first, second = Contractor(name="Вектор"), Contractor(name="Сигнал")
+    db.session.add_all([obj, first, second])
+    db.session.commit()
+    req = Request(object_id=obj.id, manufacturers="Болид,Рубеж", created_by=user.id)
+    db.session.add(req)
+    req.contractors = [first, second]
+    db.session.commit()
+    return req, obj, first, second
+
+
+def _rows(req):
+    return {row["contractor_name"]: row for row in dashboard_rows([req])}
+
+
+def test_summary_follows_insert_attachment_and_rename(db, admin_user):
+    req, obj, first, second = _seed(db, admin_user)
+    rows = _rows(req)
+    assert set(rows) == {"Вектор", "Сигнал"}
+    assert rows["Вектор"]["object_name"] == "Склад"
+    assert rows["Вектор"]["creator_name"] == admin_user.username
+    assert not any(b["is_processed"] for b in rows["Вектор"]["manufacturer_badges"])
+
+    db.session.add(
+        Attachment(
+            request_id=req.id,
+            contractor_id=first.id,
+            manufacturer="Рубеж",
+            screenshot="a.png",
+            uploaded_by=admin_user.id,
+        )
+    )
+    obj.name = "Цех"
+    second.name = "Сигнал-2"
+    db.session.commit()
+
+    rows = _rows(req)
+    assert set(rows) == {"Вектор", "Сигнал-2"}
+    assert [b["is_processed"] for b in rows["Вектор"]["manufacturer_badges"]] == [
+        False,
+        True,
+    ]
+    assert rows["Вектор"]["object_name"] == "Цех"
+    assert rows["Вектор"]["all_processed"] is False
+
+    req.contractors = [first]
+    db.session.commit()
+    assert set(_rows(req)) == {"Вектор"}
+
+
+def test_rebuild_matches_incremental_rows(db, admin_user):
+    req, _, first, _ = _seed(db, admin_user)
+    for name in ("Болид", "Рубеж"):
+        db.session.add(
+            Attachment(
+                request_id=req.id,
+                contractor_id=first.id,
+                manufacturer=name,
+                screenshot=f"{name}.png",
+                uploaded_by=admin_user.id,
+            )
+        )
+    db.session.commit()
+
+    def state():
+        return sorted(
+            (s.request_id, s.contractor_id, s.processed_mask, s.all_processed)
+            for s in RequestSummary.query.all()
+        )
+
+    incremental = state()
+    assert incremental[0][2] == 0b11
+    assert rebuild() == 1
+    assert state() == incremental
+
+
+def test_dashboard_renders_from_summary(admin_client, db, admin_user):
+    req, *_ = _seed(db, admin_user)
+    RequestSummary.query.filter_by(request_id=req.id).update(
+        {"object_name": "Из модели чтения"}
+    )
+    db.session.commit()
+    body = admin_client.get("/dashboard").get_data(as_text=True)
+    assert "Из модели чтения" in body
@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import text
+
+from models import Contractor, Object, Request
+from utils import search_backend
+from utils.search_backend import candidate_ids, search_entity_ids, search_requests_page
+
+
+def test_sqlite_uses_fts5_maintained_by_triggers(app, db):
+    assert app.extensions["search_backend"].name == "sqlite_fts5"
+
+    obj = Object(name="Ромашка", address="Казань")
+    db.session.add(obj)
+    db.session.commit()
+    assert candidate_ids("object", "ромашка") == [obj.id]
+
+    obj.name = "Лютик"
+    db.session.commit()
+    assert candidate_ids("object", "ромашка") == []
+    assert candidate_ids("object", "лютик") == [obj.id]
+
+    db.session.delete(obj)
+    db.session.commit()
+    rows = db.session.execute(text("SELECT count(*) FROM search_fts_object")).scalar()
+    assert rows == 0
+
+
+def test_short_query_falls_back_to_ngram_index(db):
+    contractor = Contractor(name="АО", inn="7700000001")
+    db.session.add(contractor)
+    db.session.commit()
+    assert candidate_ids("contractor", "ао") == [contractor.id]
+
+
+def test_search_entity_ids_reranks_candidates(db, monkeypatch):
+    import utils.fuzzy_scorer as fuzzy_scorer
+
+    a = Object(name="Ромашка")
+    b = Object(name="Ромашка плюс")
+    db.session.add_all([a, b])
+    db.session.commit()
+
+    scores = {"Ромашка плюс": 0.9, "Ромашка": 0.5}
+    monkeypatch.setattr(
+        fuzzy_scorer,
+        "score_batch",
+        lambda query, values, threshold: [scores.get(v, 0) for v in values],
+    )
+    assert search_entity_ids("object", "ромашка") == [b.id, a.id]
+
+
+def test_rerank_window_follows_relevance_not_date(db, admin_user, monkeypatch):
+    monkeypatch.setattr(search_backend, "RERANK_LIMIT", 3)
+    exact = Object(name="Ромашка")
+    weak = Object(name="Ромашковый луг", address="Казань, улица Садовая")
+    db.session.add_all([exact, weak])
+    db.session.commit()
+    old = Request(object_id=exact.id, manufacturers="Болид", created_by=admin_user.id)
+    db.session.add(old)
+    db.session.commit()
+    newer = []
+    for _ in range(4):
+        req = Request(
+            object_id=weak.id, manufacturers="Болид", created_by=admin_user.id
+        )
+        db.session.add(req)
+        db.session.commit()
+        newer.append(req)
+
+    first = search_requests_page(Request.query, "Ромашка", 1, 2, threshold=0)
+    second = search_requests_page(Request.query, "Ромашка", 2, 2, threshold=0)
+    # Самая старая заявка лучшего объекта попадает в окно раньше свежих;
+    # итог и все страницы — один и тот же ранжированный список
+    assert [r.id for r in first.items] == [old.id, newer[3].id]
+    assert [r.id for r in second.items] == [newer[2].id]
+    assert first.total == second.total == 3
+    assert first.pages == 2
+
+
+def test_backend_must_implement_candidate_select():
+    class Incomplete(search_backend.SearchBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
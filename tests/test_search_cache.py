@@ -0,0 +1,80 @@
+from models import Object, Request
+from utils import search_backend
+from utils.search_cache import RESULTS, LRUBytesCache, current_generations
+
+
+def test_lru_evicts_by_bytes():
+    cache = LRUBytesCache("t", max_bytes=100)
+    cache.put("a", 1, 40)
+    cache.put("b", 2, 40)
+    assert cache.get("a") == 1
+    cache.put("c", 3, 40)
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.bytes == 80
+
+
+def test_writes_bump_generations(db):
+    before = current_generations()
+    db.session.add(Object(name="Склад"))
+    db.session.commit()
+    after = current_generations()
+    assert after[1] == before[1] + 1 and after[0] == before[0]
+
+
+def test_generations_move_only_on_commit_with_real_changes(db):
+    obj = Object(name="Склад")
+    db.session.add(obj)
+    db.session.commit()
+    before = current_generations()
+
+    assert obj.name == "Склад"
+    obj.name = "Склад"  # то же значение: объект в dirty, но не изменён
+    db.session.commit()
+    assert current_generations() == before
+
+    obj.name = "Склад-2"
+    db.session.flush()
+    assert current_generations() == before
+    db.session.rollback()
+    assert current_generations() == before
+
+    obj.name = "Склад-3"
+    db.session.commit()
+    assert current_generations()[1] == before[1] + 1
+
+
+def test_dashboard_pages_reuse_ranked_list(admin_client, db, admin_user, monkeypatch):
+    obj = Object(name="Склад")
+    db.session.add(obj)
+    db.session.commit()
+    for _ in range(3):
+        db.session.add(
+            Request(object_id=obj.id, manufacturers="Болид", created_by=admin_user.id)
+        )
+    db.session.commit()
+
+    calls = []
+    rank = search_backend.rank_requests
+    monkeypatch.setattr(
+        search_backend,
+        "rank_requests",
+        lambda *a, **k: calls.append(1) or rank(*a, **k),
+    )
+    hits = RESULTS.hits
+    admin_client.get("/dashboard?search=Склад&per_page=10&page=1")
+    admin_client.get("/dashboard?search=склад&per_page=10&page=2")
+    assert len(calls) == 1
+    assert RESULTS.hits == hits + 1
+
+    db.session.add(
+        Request(object_id=obj.id, manufacturers="Болид", created_by=admin_user.id)
+    )
+    db.session.commit()
+    admin_client.get("/dashboard?search=Склад&per_page=10&page=1")
+    assert len(calls) == 2
+
+
+def test_admin_system_page_shows_cache_stats(admin_client, db):
+    body = admin_client.get("/admin/system").get_data(as_text=True)
+    assert "search_results" in body
@@ -0,0 +1,83 @@
+from models import Contractor, Object, Request, SearchNgram
+from utils import search_index
+from utils.search_index import candidate_ids, trigrams
+
+
+def test_trigrams_pad_words_and_fold_yo():
+    grams = trigrams("Ёлка 12")
+    assert "  е" in grams and "елк" in grams and "ка " in grams
+    assert "  1" in grams and "12 " in grams
+
+
+def test_index_follows_inserts_updates_and_deletes(db):
+    romashka = Object(name="Ромашка", address="Казань, улица Ленина")
+    vector = Object(name="Вектор", address="Москва")
+    db.session.add_all([romashka, vector])
+    db.session.commit()
+
+    assert candidate_ids("object", "ромашк") == [romashka.id]
+    assert candidate_ids("object", "казан") == [romashka.id]
+
+    romashka.name = "Лютик"
+    db.session.commit()
+    assert candidate_ids("object", "ромашк") == []
+    assert candidate_ids("object", "лютик") == [romashka.id]
+
+    db.session.delete(vector)
+    db.session.commit()
+    assert candidate_ids("object", "вектор") == []
+    assert (
+        SearchNgram.query.filter_by(entity_id=vector.id, entity="object").count() == 0
+    )
+
+
+def test_rollback_leaves_index_untouched(db):
+    obj = Object(name="Ромашка")
+    db.session.add(obj)
+    db.session.commit()
+
+    obj.name = "Лютик"
+    db.session.flush()
+    db.session.rollback()
+    assert candidate_ids("object", "ромашка") == [obj.id]
+
+
+def test_rebuild_restores_missing_documents(db):
+    db.session.add_all([Contractor(name="ООО Вектор", inn="7700000001")])
+    db.session.commit()
+    SearchNgram.query.delete()
+    db.session.commit()
+    assert candidate_ids("contractor", "вектор") == []
+
+    search_index.ensure_built()
+    assert len(candidate_ids("contractor", "вектор")) == 1
+    assert len(candidate_ids("contractor", "7700000001")) == 1
+
+
+def test_objects_search_uses_candidates(admin_client, db):
+    db.session.add_all([Object(name="Ромашка"), Object(name="Вектор")])
+    db.session.commit()
+
+    body = admin_client.get("/objects/objects?search=Ромашка").get_data(as_text=True)
+    assert "Ромашка" in body
+    assert "Вектор" not in body
+
+
+def test_dashboard_search_by_contractor_and_manufacturer(admin_client, db, admin_user):
+    obj = Object(name="Склад")
+    vector = Contractor(name="Вектор")
+    other = Contractor(name="Альфа")
+    db.session.add_all([obj, vector, other])
+    db.session.commit()
+    r1 = Request(object_id=obj.id, manufacturers="Пульсар", created_by=admin_user.id)
+    r1.contractors = [vector]
+    r2 = Request(object_id=obj.id, manufacturers="Зана", created_by=admin_user.id)
+    r2.contractors = [other]
+    db.session.add_all([r1, r2])
+    db.session.commit()
+
+    body = admin_client.get("/dashboard?search=Вектор").get_data(as_text=True)
+    assert body.count('class="table-row"') == 1
+
+    body = admin_client.get("/dashboard?search=Зана").get_data(as_text=True)
+    assert body.count('class="table-row"') == 1
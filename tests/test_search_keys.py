@@ -0,0 +1,68 @@
+from models import Contractor, Object, SearchKey
+from utils.search_keys import key_match_ids, phonetic_key, transliterate, word_keys
+
+
+def test_keys_fold_yo_and_transliterate():
+    assert transliterate("Ёлка Щит") == "elka shchit"
+    assert word_keys("Ёлка") == [("елка", "elka", phonetic_key("елка"))]
+    assert phonetic_key("Ромашка") == phonetic_key("romashka")
+
+
+def test_keys_follow_writes(db):
+    obj = Object(name="Ромашка", address="Казань")
+    db.session.add(obj)
+    db.session.commit()
+    assert SearchKey.query.filter_by(entity="object", entity_id=obj.id).count() == 2
+
+    obj.name = "Лютик"
+    db.session.commit()
+    assert key_match_ids("object", "ром") == []
+    assert key_match_ids("object", "лют") == [obj.id]
+
+    db.session.delete(obj)
+    db.session.commit()
+    assert SearchKey.query.filter_by(entity="object").count() == 0
+
+
+def test_prefix_translit_and_phonetic_lookup(db):
+    romashka = Object(name="Ромашка", address="Казань, улица Ленина")
+    vector = Object(name="Вектор")
+    db.session.add_all([romashka, vector])
+    db.session.commit()
+
+    assert key_match_ids("object", "Ром") == [romashka.id]
+    assert key_match_ids("object", "romashka") == [romashka.id]
+    assert key_match_ids("object", "казань ленина") == [romashka.id]
+    assert key_match_ids("object", "казань вектор") == []
+    assert key_match_ids("object", "вектар") == [vector.id]
+
+
+def test_prefix_treats_like_wildcards_literally(db):
+    underscore = Object(name="ab_cd")
+    letters = Object(name="abxcd")
+    db.session.add_all([underscore, letters])
+    db.session.commit()
+
+    assert key_match_ids("object", "ab_c") == [underscore.id]
+    assert key_match_ids("object", "abx") == [letters.id]
+
+
+def test_autocomplete_finds_latin_spelling(user_client, db):
+    db.session.add(Contractor(name="Вектор"))
+    db.session.commit()
+
+    data = user_client.get("/search/search_contractors?query=vektor").get_json()
+    assert [c["name"] for c in data] == ["Вектор"]
+
+
+def test_long_word_keys_fit_their_columns(db):
+    obj = Object(name="щ" * 150)
+    db.session.add(obj)
+    db.session.commit()
+
+    (key,) = SearchKey.query.filter_by(entity="object", entity_id=obj.id).all()
+    for column in ("word", "translit", "phonetic"):
+        limit = getattr(SearchKey, column).type.length
+        assert len(getattr(key, column)) <= limit
+    assert len(key.phonetic) == SearchKey.phonetic.type.length
+    assert key_match_ids("object", "щ" * 150) == [obj.id]
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+from models import Contractor, Object, Request
+from utils import search_backend
+from utils.search_query import apply_filters, parse_query
+
+
+def test_parse_query_splits_filters_and_text():
+    parsed = parse_query(
+        'object:Ромашка contractor:"ООО Вектор" status:OPEN mfr:Пульсар '
+        "created:>2026-01-01 первый этаж http://x"
+    )
+    assert parsed.filters == [
+        ("object", "Ромашка"),
+        ("contractor", "ООО Вектор"),
+        ("status", "OPEN"),
+        ("mfr", "Пульсар"),
+        ("created", ">2026-01-01"),
+    ]
+    assert parsed.text == "первый этаж http://x"
+
+
+def _seed(db, user):
+    romashka = Object(name="Ромашка")
+    sklad = Object(name="Склад")
+    vector = Contractor(name="ООО Вектор")
+    db.session.add_all([romashka, sklad, vector])
+    db.session.commit()
+    r1 = Request(
+        object_id=romashka.id,
+        manufacturers="Пульсар",
+        created_by=user.id,
+        created_at=datetime(2026, 2, 1),
+    )
+    r2 = Request(
+        object_id=sklad.id,
+        manufacturers="Болид",
+        status="DONE",
+        created_by=user.id,
+        created_at=datetime(2025, 12, 1),
+    )
+    db.session.add_all([r1, r2])
+    r1.contractors = [vector]
+    db.session.commit()
+    return r1, r2
+
+
+def test_filters_are_pushed_to_sql(db, admin_user):
+    r1, r2 = _seed(db, admin_user)
+
+    def ids(raw):
+        parsed = parse_query(raw)
+        return [r.id for r in apply_filters(Request.query, parsed).all()]
+
+    assert ids('contractor:"ООО Вектор"') == [r1.id]
+    assert ids("status:DONE") == [r2.id]
+    assert ids("статус:Завершена") == [r2.id]
+    assert ids("created:>2026-01-01") == [r1.id]
+    assert ids("created:<=01.12.2025") == [r2.id]
+    assert ids("object:Ромашка mfr:Болид") == []
+    assert ids("mfr:Болид") == [r2.id]
+    assert ids("mfr:Бол") == []
+    assert ids("mfr:Болид,Пульсар") == [r1.id, r2.id]
+    # % и _ в значении — обычные символы, а не шаблон LIKE
+    assert ids("object:%") == []
+
+    parsed = parse_query("created:вчера")
+    apply_filters(Request.query, parsed)
+    assert parsed.errors
+
+
+def test_structured_dashboard_search_skips_fuzzy_scorer(
+    admin_client, db, admin_user, monkeypatch
+):
+    r1, _r2 = _seed(db, admin_user)
+
+    def fail(*_a, **_k):
+        raise AssertionError("нечёткий поиск не должен вызываться")
+
+    monkeypatch.setattr(search_backend, "rank_requests", fail)
+    body = admin_client.get("/dashboard?search=mfr:Пульсар").get_data(as_text=True)
+    assert body.count('class="table-row"') == 1
@@ -0,0 +1,43 @@
+from models import Contractor, Object
+from utils.text_utils import similarity
+
+
+def test_search_returns_top_k_like_full_scan(user_client, db):
+    names = ["Ромашка", "Ромашко", "Ромашка-2", "Вектор", "Рамашка", "ромашка"]
+    db.session.add_all([Object(name=n) for n in names])
+    db.session.commit()
+
+    data = user_client.get("/search/search?query=Ромашка&type=object").get_json()
+    expected = sorted(
+        (
+            (similarity("Ромашка", n), -i, i + 1, n)
+            for i, n in enumerate(names)
+            if similarity("Ромашка", n) >= 0.6
+        ),
+        reverse=True,
+    )[:5]
+    assert [(i["id"], i["similarity"]) for i in data["items"]] == [
+        (e[2], e[0]) for e in expected
+    ]
+
+
+def test_search_limit_min_score_and_index(user_client, db):
+    db.session.add_all(
+        [Contractor(name="Вектор"), Contractor(name="Вектор"), Contractor(name="Бета")]
+    )
+    db.session.commit()
+
+    data = user_client.get(
+        "/search/search?query=вектор&type=contractor&limit=1"
+    ).get_json()
+    assert [i["id"] for i in data["items"]] == [1]
+
+    data = user_client.get(
+        "/search/search?query=Бетта&type=contractor&min_score=0.95"
+    ).get_json()
+    assert data["items"] == []
+
+    data = user_client.get(
+        "/search/search?query=вектор&type=contractor&index=1"
+    ).get_json()
+    assert [i["id"] for i in data["items"]] == [1, 2]
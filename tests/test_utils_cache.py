@@ -3,7 +3,9 @@ from datetime import datetime
 
 import pytest
 
-from utils.cache import prepare_cache
+from models import Object, Request
+from routes.op_api import GROUPS_CACHE
+from utils.cache import MemoryBackend, SQLiteBackend, prepare_cache
 
 
 @pytest.fixture()
@@ -69,3 +71,62 @@ def test_prepare_cache_ignores_invalid_if_modified_since(app, cache_payload):
 
     assert etag == _expected_etag(cache_payload)
     assert last_modified_str.endswith("GMT")
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_backends_lru_ttl_and_tags(kind, tmp_path):
+    def make():
+        if kind == "memory":
+            return MemoryBackend("t", max_entries=2)
+        return SQLiteBackend("t", 2, str(tmp_path / "cache.sqlite3"))
+
+    backend = make()
+    far = 10**10
+    backend.set("a", [1], far, ("object:1",), 3)
+    backend.set("b", [2], far, ("object:2",), 3)
+    assert backend.get("a", 0) == (True, [1])
+    assert backend.set("c", [3], far, ("object:1",), 3) == 1
+    assert backend.get("b", 0) == (False, None)
+    assert backend.usage() == (2, 6)
+
+    assert backend.invalidate(["object:1"]) == 2
+    assert backend.usage() == (0, 0)
+    backend.set("d", [4], 5, (), 3)
+    assert backend.get("d", 10) == (False, None)
+
+    if kind == "sqlite":
+        # Второй воркер видит записи первого
+        backend.set("e", {"x": 1}, far, (), 7)
+        assert make().get("e", 0) == (True, {"x": 1})
+
+
+def test_op_groups_cache_invalidated_by_request_write(admin_client, db, admin_user):
+    obj = Object(name="OP")
+    db.session.add(obj)
+    db.session.commit()
+    url = f"/api/op/{obj.id}/groups"
+
+    def count(status=""):
+        groups = admin_client.get(url, query_string={"status": status}).get_json()
+        return {g["id"]: g["count"] for g in groups}["Зана"]
+
+    hits = GROUPS_CACHE.hits
+    assert count() == 0
+    assert count() == 0
+    assert GROUPS_CACHE.hits == hits + 1
+
+    req = Request(object_id=obj.id, manufacturers="Зана", created_by=admin_user.id)
+    db.session.add(req)
+    db.session.commit()
+    assert count() == 1
+    assert count("DONE") == 0
+    req.status = "DONE"
+    db.session.commit()
+    assert count("DONE") == 1
+    db.session.delete(req)
+    db.session.commit()
+    assert count() == 0
+
+    stats = GROUPS_CACHE.stats()
+    assert stats["name"] == "op_groups (memory)"
+    assert 0 < stats["hit_ratio"] < 1
@@ -0,0 +1,334 @@
+"""Индекс автодополнения по префиксам названий объектов и подрядчиков.
+
+Индекс живёт в памяти процесса: два отсортированных списка строк
+``"<ключ>\\x00<id>"`` — нормализованные названия целиком и «хвосты» названий
+с начала каждого следующего слова вместе с транслитерацией.
+Поиск по префиксу — это ``bisect`` и линейный проход по диапазону, поэтому
+страница подсказок и признак ``has_next`` получаются без ``COUNT``.
+
+Изменения моделей применяются инкрементально после фиксации транзакции,
+и индекс принимает поколение, до которого свой коммит увеличил счётчик.
+Записи других воркеров видны по поколению таблицы (``table_generation``):
+не чаще раза в ``AUTOCOMPLETE_REFRESH_SECONDS`` запрос подсказок сверяет его
+с поколением, на котором построен индекс, и при расхождении один фоновый
+поток перестраивает индекс, а остальные запросы читают прежний.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import re
+import threading
+import time
+from typing import Any
+
+from flask import current_app
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from database import db
+from models import Contractor, Object
+from utils.search_cache import on_generations_bumped, table_generation
+from utils.search_keys import normalize, transliterate
+
+logger = logging.getLogger(__name__)
+
+# Как часто сверять поколение таблицы (изменения других воркеров)
+DEFAULT_REFRESH_SECONDS = 5
+
+_SEP = "\x00"
+_WORD_RE = re.compile(r"\w+")
+_PENDING = "autocomplete_pending"
+_listeners_registered = False
+
+
+def index_keys(name: str | None) -> tuple[set[str], set[str]]:
+    """Ключи названия: ``(целиком, с начала других слов и транслитерация)``."""
+    normalized = normalize(name).strip()
+    if not normalized:
+        return set(), set()
+    tails = {transliterate(normalized)}
+    for match in _WORD_RE.finditer(normalized):
+        tail = normalized[match.start() :]
+        tails.add(tail)
+        tails.add(transliterate(tail))
+    tails.discard(normalized)
+    return {normalized}, tails
+
+
+class PrefixIndex:
+    """Отсортированные массивы ключей с запиской ``id -> (name, extra)``."""
+
+    def __init__(self, model: Any, extra_field: str | None = None) -> None:
+        self.model = model
+        self.extra_field = extra_field
+        self.heads: list[str] = []
+        self.tails: list[str] = []
+        self.items: dict[int, tuple[str, str]] = {}
+        self.built_at: float | None = None
+        self.checked_at = 0.0
+        self.generation: int | None = None
+        self.lock = threading.RLock()
+        # Перестраивает один поток; остальные читают прежний индекс
+        self.build_lock = threading.Lock()
+        # Изменения, применённые за время построения (повторяются поверх него)
+        self.journal: list[tuple] | None = None
+
+    @property
+    def built(self) -> bool:
+        return self.built_at is not None
+
+    def invalidate(self) -> None:
+        with self.lock:
+            self.heads = []
+            self.tails = []
+            self.items = {}
+            self.built_at = None
+            self.generation = None
+
+    def _columns(self):
+        columns = [self.model.id, self.model.name]
+        if self.extra_field:
+            columns.append(getattr(self.model, self.extra_field))
+        return columns
+
+    def build(self) -> None:
+        """Полностью перечитывает названия из БД и подменяет индекс.
+
+        Поколение читается до выборки, поэтому запись, закоммиченная во время
+        построения, оставит индекс устаревшим до следующей проверки.
+        """
+        with self.lock:
+            self.journal = []
+        try:
+            generation = table_generation(self.model)
+            rows = db.session.execute(select(*self._columns())).all()
+            heads: list[str] = []
+            tails: list[str] = []
+            items = {}
+            for row in rows:
+                extra = (row[2] or "") if self.extra_field else ""
+                items[row[0]] = (row[1] or "", extra)
+                row_heads, row_tails = index_keys(row[1])
+                heads.extend(f"{key}{_SEP}{row[0]}" for key in row_heads)
+                tails.extend(f"{key}{_SEP}{row[0]}" for key in row_tails)
+            heads.sort()
+            tails.sort()
+            with self.lock:
+                journal = self.journal
+                self.heads = heads
+                self.tails = tails
+                self.items = items
+                self.generation = generation
+                self.built_at = self.checked_at = time.monotonic()
+                for op, args in journal:
+                    getattr(self, op)(*args)
+        finally:
+            with self.lock:
+                self.journal = None
+
+    def refresh(self, interval: float, background: bool = True) -> None:
+        """Строит индекс или перестраивает его, если таблица сменила поколение.
+
+        Первое построение синхронное (отдавать ещё нечего). Дальше поколение
+        сверяется не чаще раза в ``interval`` секунд, а перестройка идёт
+        в фоновом потоке, пока запросы читают прежний индекс.
+        """
+        if not self.built:
+            with self.build_lock:
+                if not self.built:
+                    self.build()
+            return
+        now = time.monotonic()
+        if now - self.checked_at < interval:
+            return
+        self.checked_at = now
+        if table_generation(self.model) == self.generation:
+            return
+        if not self.build_lock.acquire(blocking=False):
+            return
+        if not background:
+            try:
+                self.build()
+            finally:
+                self.build_lock.release()
+            return
+        app = current_app._get_current_object()
+
+        def target():
+            try:
+                with app.app_context():
+                    self.build()
+            except Exception:
+                logger.exception("Не удалось перестроить индекс автодополнения")
+            finally:
+                self.build_lock.release()
+
+        threading.Thread(
+            target=target,
+            name=f"autocomplete-{self.model.__tablename__}",
+            daemon=True,
+        ).start()
+
+    def advance(self, generation: int) -> None:
+        """Принимает поколение своего коммита, если чужих записей не пропущено."""
+        with self.lock:
+            if self.generation is not None and self.generation == generation - 1:
+                self.generation = generation
+
+    def remove(self, item_id: int) -> None:
+        with self.lock:
+            if self.journal is not None:
+                self.journal.append(("_remove", (item_id,)))
+            self._remove(item_id)
+
+    def upsert(self, item_id: int, name: str | None, extra: str | None) -> None:
+        with self.lock:
+            if self.journal is not None:
+                self.journal.append(("_upsert", (item_id, name, extra)))
+            self._upsert(item_id, name, extra)
+
+    def _remove(self, item_id: int) -> None:
+        old = self.items.pop(item_id, None)
+        if old is None:
+            return
+        for entries, keys in zip((self.heads, self.tails), index_keys(old[0])):
+            for key in keys:
+                entry = f"{key}{_SEP}{item_id}"
+                pos = bisect.bisect_left(entries, entry)
+                if pos < len(entries) and entries[pos] == entry:
+                    del entries[pos]
+
+    def _upsert(self, item_id: int, name: str | None, extra: str | None) -> None:
+        self._remove(item_id)
+        self.items[item_id] = (name or "", extra or "")
+        for entries, keys in zip((self.heads, self.tails), index_keys(name)):
+            for key in keys:
+                bisect.insort(entries, f"{key}{_SEP}{item_id}")
+
+    def search(self, query: str, offset: int, limit: int):
+        """Страница ``(id, name, extra)`` и признак наличия следующей.
+
+        Сначала идут названия, начинающиеся с запроса (в алфавитном порядке),
+        затем совпадения по началу других слов и по транслитерации.
+        """
+        prefix = normalize(query).strip()
+        if not prefix:
+            return [], False
+        found: list[tuple[int, str, str]] = []
+        seen: set[int] = set()
+        wanted = offset + limit + 1
+        with self.lock:
+            for entries in (self.heads, self.tails):
+                pos = bisect.bisect_left(entries, prefix)
+                while pos < len(entries) and len(found) < wanted:
+                    entry = entries[pos]
+                    pos += 1
+                    if not entry.startswith(prefix):
+                        break
+                    item_id = int(entry.rpartition(_SEP)[2])
+                    if item_id in seen:
+                        continue
+                    seen.add(item_id)
+                    found.append((item_id, *self.items[item_id]))
+        return found[offset : offset + limit], len(found) > offset + limit
+
+
+INDEXES: dict[str, PrefixIndex] = {
+    "object": PrefixIndex(Object, "address"),
+    "contractor": PrefixIndex(Contractor),
+}
+
+
+def _entity_of(target: Any) -> str | None:
+    for entity, index in INDEXES.items():
+        if isinstance(target, index.model):
+            return entity
+    return None
+
+
+def _remember(target, op: str) -> None:
+    entity = _entity_of(target)
+    if entity is None or not INDEXES[entity].built:
+        return
+    session = object_session(target)
+    if session is None:
+        return
+    index = INDEXES[entity]
+    extra = getattr(target, index.extra_field) if index.extra_field else None
+    session.info.setdefault(_PENDING, []).append(
+        (entity, op, target.id, target.name, extra)
+    )
+
+
+def _after_insert(mapper, connection, target) -> None:
+    _remember(target, "upsert")
+
+
+def _after_update(mapper, connection, target) -> None:
+    entity = _entity_of(target)
+    if entity is None:
+        return
+    index = INDEXES[entity]
+    fields = ["name"] + ([index.extra_field] if index.extra_field else [])
+    state = inspect(target)
+    if any(state.attrs[f].history.has_changes() for f in fields):
+        _remember(target, "upsert")
+
+
+def _after_delete(mapper, connection, target) -> None:
+    _remember(target, "remove")
+
+
+def _after_commit(session) -> None:
+    for entity, op, item_id, name, extra in session.info.pop(_PENDING, []):
+        index = INDEXES[entity]
+        if op == "remove":
+            index.remove(item_id)
+        else:
+            index.upsert(item_id, name, extra)
+
+
+def _after_rollback(session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+def _advance_generations(generations: dict[str, int]) -> None:
+    for index in INDEXES.values():
+        generation = generations.get(index.model.__tablename__)
+        if generation is not None:
+            index.advance(generation)
+
+
+def _invalidate_all(*_args, **_kwargs) -> None:
+    for index in INDEXES.values():
+        index.invalidate()
+
+
+def register_listeners() -> None:
+    """Подписывает индекс на изменения моделей и схемы (идемпотентно)."""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    for index in INDEXES.values():
+        event.listen(index.model, "after_insert", _after_insert)
+        event.listen(index.model, "after_update", _after_update)
+        event.listen(index.model, "after_delete", _after_delete)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+    on_generations_bumped(_advance_generations)
+    event.listen(db.metadata, "after_create", _invalidate_all)
+    event.listen(db.metadata, "after_drop", _invalidate_all)
+    _listeners_registered = True
+
+
+def suggest(entity: str, query: str, page: int = 1, per_page: int = 10):
+    """Подсказки по префиксу: ``(items, has_next)``, индекс строится лениво."""
+    register_listeners()
+    index = INDEXES[entity]
+    index.refresh(
+        current_app.config.get("AUTOCOMPLETE_REFRESH_SECONDS", DEFAULT_REFRESH_SECONDS),
+        current_app.config.get("AUTOCOMPLETE_BACKGROUND_REFRESH", True),
+    )
+    return index.search(query, (max(page, 1) - 1) * per_page, per_page)
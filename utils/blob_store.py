@@ -0,0 +1,417 @@
+"""Хранилище загруженных файлов по содержимому (sha256).
+
+Каждое содержимое лежит один раз: ``<BLOB_STORE_DIR>/ab/cd/<sha256>``.
+Файлы заявок, скриншоты вложений и файлы OP остаются по своим прежним путям
+(шаблоны и маршруты скачивания не меняются), но это жёсткие ссылки на блоб:
+одинаковый файл у десяти заявок занимает место один раз. Если жёсткую ссылку
+создать нельзя (другая файловая система), файл копируется.
+
+Ссылки учитываются в ``blob_ref`` (ключ — путь в том виде, в каком его хранит
+владелец), ``blob.refcount`` — их число. Блобы без ссылок удаляет
+``flask cleanup:uploads --no-dry-run``; перенос уже загруженных файлов —
+``flask blobs:migrate``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from typing import IO, Iterable
+
+from flask import Request as FlaskRequest
+from flask import current_app
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models import Attachment, Blob, BlobRef, OpFile, Request, RequestFile
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+OP_PREFIX = "op/"
+TMP_DIR = ".tmp"
+# Файлы без записи в БД и блобы без ссылок моложе этого (секунды) ещё
+# могут быть в работе: загрузка записала блоб, но ещё не добавила ссылку
+ORPHAN_GRACE = 3600
+
+
+def blob_root() -> str:
+    return current_app.config.get("BLOB_STORE_DIR") or os.path.join(
+        current_app.root_path, "uploads", "blobs"
+    )
+
+
+def blob_path(digest: str) -> str:
+    return os.path.join(blob_root(), digest[:2], digest[2:4], digest)
+
+
+def op_upload_dir() -> str:
+    return current_app.config.get(
+        "OP_UPLOAD_DIR", os.path.join(current_app.root_path, "uploads", "op")
+    )
+
+
+def op_key(filename: str) -> str:
+    return f"{OP_PREFIX}{filename}"
+
+
+def ref_path(key: str) -> str:
+    """Абсолютный путь файла по ключу ссылки."""
+    if key.startswith(OP_PREFIX):
+        return os.path.join(op_upload_dir(), key[len(OP_PREFIX) :])
+    static_root = os.path.dirname(os.path.normpath(current_app.config["UPLOAD_FOLDER"]))
+    return os.path.join(static_root, key)
+
+
+def _link_or_copy(src: str, dest: str) -> bool:
+    """Жёсткая ссылка ``dest`` на ``src``; ``False``, если пришлось копировать."""
+    try:
+        os.link(src, dest)
+        return True
+    except OSError:
+        shutil.copyfile(src, dest)
+        return False
+
+
+def _tmp_dir() -> str:
+    path = os.path.join(blob_root(), TMP_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def spool_file() -> IO[bytes]:
+    """Временный файл для тела загрузки в каталоге хранилища.
+
+    Лежит на той же файловой системе, что и блобы, поэтому загруженный файл
+    становится блобом жёсткой ссылкой, без повторной записи байтов.
+    """
+    return tempfile.NamedTemporaryFile("wb+", dir=_tmp_dir(), prefix="upload-")
+
+
+class UploadRequest(FlaskRequest):
+    """Запрос, который пишет все файлы multipart-формы на диск.
+
+    Werkzeug держит файлы до 500 КБ в памяти; здесь каждый файл сразу
+    спулится в ``spool_file()``, и память на загрузку ограничена буфером
+    парсера независимо от числа и размера файлов.
+    """
+
+    def _get_file_stream(
+        self,
+        total_content_length: int | None,
+        content_type: str | None,
+        filename: str | None = None,
+        content_length: int | None = None,
+    ) -> IO[bytes]:
+        return spool_file()
+
+
+def _touch(path: str) -> bool:
+    """Обновляет mtime существующего блоба (он снова в работе) или ``False``.
+
+    ``collect_garbage`` не трогает блобы, использованные за последние
+    ``ORPHAN_GRACE`` секунд, поэтому блоб без ссылок, который загрузка
+    как раз переиспользует, не удаляется до того, как она добавит ссылку.
+    """
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _spooled_path(stream: IO[bytes]) -> str | None:
+    name = getattr(stream, "name", None)
+    if isinstance(name, str) and os.path.dirname(name) == _tmp_dir():
+        return name
+    return None
+
+
+def _store_spooled(
+    stream: IO[bytes], path: str, max_size: int | None
+) -> tuple[str, int]:
+    stream.flush()
+    size = os.fstat(stream.fileno()).st_size
+    if max_size is not None and size > max_size:
+        raise ValueError("Файл слишком большой")
+    stream.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+    sha = digest.hexdigest()
+    dest = blob_path(sha)
+    if not _touch(dest):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        _link_or_copy(path, dest)
+    return sha, size
+
+
+def store_stream(stream: IO[bytes], max_size: int | None = None) -> tuple[str, int]:
+    """Записывает поток в хранилище и возвращает ``(sha256, размер)``.
+
+    Содержимое, которое уже есть в хранилище, второй раз не сохраняется.
+    Файл, уже записанный ``UploadRequest``, только хешируется и становится
+    блобом по жёсткой ссылке. При превышении ``max_size`` — ``ValueError``,
+    ничего не остаётся.
+    """
+    spooled = _spooled_path(stream)
+    if spooled is not None:
+        return _store_spooled(stream, spooled, max_size)
+    tmp_dir = _tmp_dir()
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise ValueError("Файл слишком большой")
+                digest.update(chunk)
+                f.write(chunk)
+        sha = digest.hexdigest()
+        dest = blob_path(sha)
+        if not _touch(dest):
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(tmp, dest)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return sha, size
+
+
+def add_ref(sha: str, size: int, key: str) -> None:
+    """Записывает ссылку ``key`` на блоб (в текущей транзакции)."""
+    blobs = Blob.__table__
+    found = db.session.execute(
+        select(blobs.c.sha256).where(blobs.c.sha256 == sha)
+    ).first()
+    if found is None:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(
+                    blobs.insert().values(sha256=sha, size=size, refcount=0)
+                )
+        except IntegrityError:
+            pass  # блоб записал параллельный запрос
+    db.session.execute(
+        update(blobs).where(blobs.c.sha256 == sha).values(refcount=blobs.c.refcount + 1)
+    )
+    db.session.execute(BlobRef.__table__.insert().values(path=key, sha256=sha))
+
+
+def link(sha: str, size: int, dest: str, key: str) -> None:
+    """Ставит файл блоба по пути ``dest`` и записывает ссылку ``key``."""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    _link_or_copy(blob_path(sha), dest)
+    add_ref(sha, size, key)
+
+
+def release(keys: Iterable[str]) -> int:
+    """Снимает ссылки ``keys`` (файлы по путям удаляет вызывающий код)."""
+    keys = [key for key in keys if key]
+    if not keys:
+        return 0
+    refs, blobs = BlobRef.__table__, Blob.__table__
+    released = 0
+    for sha, count in db.session.execute(
+        select(refs.c.sha256, func.count())
+        .where(refs.c.path.in_(keys))
+        .group_by(refs.c.sha256)
+    ):
+        db.session.execute(
+            update(blobs)
+            .where(blobs.c.sha256 == sha)
+            .values(refcount=blobs.c.refcount - count)
+        )
+        released += count
+    db.session.execute(refs.delete().where(refs.c.path.in_(keys)))
+    return released
+
+
+def file_path_keys(file_path: str | None) -> list[str]:
+    """Ключи из строки ``Request.file_path`` (пути через запятую)."""
+    return [key.strip() for key in (file_path or "").split(",") if key.strip()]
+
+
+def request_keys(req: Request) -> list[str]:
+    """Ключи файлов заявки и её вложений.
+
+    Кроме ``request_file`` учитывается ``Request.file_path``: файлы, загруженные
+    до появления таблицы, удаляются вместе с заявкой и без backfill.
+    """
+    keys = set(
+        db.session.execute(
+            select(RequestFile.path).where(RequestFile.request_id == req.id)
+        ).scalars()
+    )
+    keys.update(file_path_keys(req.file_path))
+    keys.update(
+        screenshot
+        for (screenshot,) in db.session.query(Attachment.screenshot).filter(
+            Attachment.request_id == req.id
+        )
+        if screenshot
+    )
+    return sorted(keys)
+
+
+def live_keys() -> set[str]:
+    """Ключи всех файлов, на которые ссылаются записи БД.
+
+    Файлы заявок, ещё не внесённые в ``request_file``, берутся
+    из ``Request.file_path``.
+    """
+    keys: set[str] = set(db.session.execute(select(RequestFile.path)).scalars())
+    for (file_path,) in db.session.query(Request.file_path).filter(
+        Request.file_path.isnot(None)
+    ):
+        keys.update(file_path_keys(file_path))
+    for (screenshot,) in db.session.query(Attachment.screenshot):
+        if screenshot:
+            keys.add(screenshot)
+    for (filename,) in db.session.query(OpFile.filename):
+        keys.add(op_key(filename))
+    return keys
+
+
+def hash_file(path: str) -> tuple[str, int]:
+    """``(sha256, размер)`` файла на диске."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def adopt(path: str) -> tuple[str, int, bool]:
+    """Переносит существующий файл в хранилище: ``(sha256, размер, дубль)``.
+
+    Новое содержимое становится блобом без копирования (жёсткая ссылка), а
+    дубль заменяется ссылкой на уже имеющийся блоб.
+    """
+    sha, size = hash_file(path)
+    dest = blob_path(sha)
+    if not os.path.exists(dest):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        _link_or_copy(path, dest)
+        return sha, size, False
+    if os.path.samefile(path, dest):
+        return sha, size, False
+    tmp = f"{path}.blobtmp"
+    if not _link_or_copy(dest, tmp):
+        os.remove(tmp)  # без жёстких ссылок место не освободить
+        return sha, size, False
+    os.replace(tmp, path)
+    return sha, size, True
+
+
+def migrate() -> dict[str, int]:
+    """Хеширует файлы без ссылок и схлопывает дубли. Возвращает статистику."""
+    known = set(db.session.execute(select(BlobRef.path)).scalars())
+    stats = {"files": 0, "duplicates": 0, "saved_bytes": 0, "missing": 0}
+    for key in sorted(live_keys() - known):
+        path = ref_path(key)
+        if not os.path.isfile(path):
+            stats["missing"] += 1
+            continue
+        sha, size, duplicate = adopt(path)
+        add_ref(sha, size, key)
+        stats["files"] += 1
+        if duplicate:
+            stats["duplicates"] += 1
+            stats["saved_bytes"] += size
+        db.session.commit()
+    logger.info("Файлы перенесены в хранилище блобов: %s", stats)
+    return stats
+
+
+def _recently_used(sha: str, created_at, deadline: float) -> bool:
+    if created_at is not None and created_at > datetime.utcfromtimestamp(deadline):
+        return True
+    try:
+        return os.path.getmtime(blob_path(sha)) > deadline
+    except FileNotFoundError:
+        return False
+
+
+def collect_garbage(dry_run: bool = True) -> tuple[int, int]:
+    """Удаляет блобы без ссылок. Возвращает ``(блобов, байт)``.
+
+    Ссылки на файлы, которых больше нет в БД, снимаются; ``refcount``
+    пересчитывается по ``blob_ref``. Блобы, созданные или переиспользованные
+    за последние ``ORPHAN_GRACE`` секунд, пропускаются: загрузка того же
+    содержимого могла ещё не записать ссылку. Файлы хранилища без записи
+    в ``blob`` (прерванные загрузки) удаляются по тому же порогу.
+    """
+    refs, blobs = BlobRef.__table__, Blob.__table__
+    stale = set(db.session.execute(select(refs.c.path)).scalars()) - live_keys()
+    deadline = time.time() - ORPHAN_GRACE
+    removed = freed = 0
+    if dry_run:
+        unreferenced = select(refs.c.sha256).where(refs.c.path.notin_(stale))
+        rows = [
+            (sha, size)
+            for sha, size, created_at in db.session.execute(
+                select(blobs.c.sha256, blobs.c.size, blobs.c.created_at).where(
+                    blobs.c.sha256.notin_(unreferenced)
+                )
+            )
+            if not _recently_used(sha, created_at, deadline)
+        ]
+        for sha, size in rows:
+            logger.info("Блоб без ссылок: %s (dry-run)", sha)
+        return len(rows), sum(size for _, size in rows)
+
+    release(stale)
+    db.session.execute(
+        update(blobs).values(
+            refcount=select(func.count())
+            .where(refs.c.sha256 == blobs.c.sha256)
+            .scalar_subquery()
+        )
+    )
+    rows = db.session.execute(
+        select(blobs.c.sha256, blobs.c.size, blobs.c.created_at).where(
+            blobs.c.refcount <= 0
+        )
+    ).all()
+    for sha, size, created_at in rows:
+        if _recently_used(sha, created_at, deadline):
+            continue
+        # Строка удаляется, только если ссылок так и не появилось
+        deleted = db.session.execute(
+            blobs.delete().where(blobs.c.sha256 == sha, blobs.c.refcount <= 0)
+        )
+        if deleted.rowcount == 0:
+            continue
+        try:
+            os.remove(blob_path(sha))
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            logger.error("Не удалось удалить блоб %s: %s", sha, exc)
+        removed += 1
+        freed += size
+    db.session.commit()
+
+    known = set(db.session.execute(select(blobs.c.sha256)).scalars())
+    for dirpath, _dirs, files in os.walk(blob_root()):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            if name in known or os.path.getmtime(path) > deadline:
+                continue
+            try:
+                os.remove(path)
+            except OSError as exc:
+                logger.error("Не удалось удалить %s: %s", path, exc)
+    logger.info("Удалено блобов без ссылок: %s (%s байт)", removed, freed)
+    return removed, freed
@@ -0,0 +1,462 @@
+"""Импорт объектов, подрядчиков и заявок из CSV фоновой задачей.
+
+Файл сохраняется в ``IMPORT_DIR`` потоково и читается построчно модулем
+``csv``, поэтому размер файла не ограничен памятью. Таблицы Excel нужно
+сохранить в CSV (разделитель — запятая, точка с запятой или табуляция).
+Строки проверяются схемами ``import_*_row`` из ``validation/schemas.py``.
+Дубли ищутся по индексу в памяти, собранному одним запросом на старте
+(названия без учёта регистра, ИНН), а не запросом на каждую строку.
+Принятые строки пишутся порциями по ``CHUNK_ROWS`` через ORM (``add_all``),
+чтобы сработали обработчики поиска, счётчиков и модели чтения; каждая
+порция — своя транзакция, счётчики задачи сохраняются отдельно от неё.
+Строки, из-за которых порция не записалась, уходят в отчёт, остальные
+строки порции пишутся повторно.
+Отклонённые и пропущенные строки попадают в CSV-отчёт ``<id>-errors.csv``.
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import IO, Any, Iterator
+
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import db
+from models import Contractor, ImportJob, Object
+from utils.request_batch import (
+    MAX_BATCH_REQUESTS,
+    BatchError,
+    BatchItem,
+    create_requests,
+)
+from validation.json_schema import JSONSchemasValidator
+from validation.schemas import SCHEMAS
+
+logger = logging.getLogger(__name__)
+
+# Строк в одной транзакции
+CHUNK_ROWS = 2000
+EXTENSIONS = (".csv",)
+CSV_DELIMITERS = ",;\t"
+
+SCHEMA_KEYS = {
+    "objects": "import_object_row",
+    "contractors": "import_contractor_row",
+    "requests": "import_request_row",
+}
+
+# Русские заголовки столбцов (как в выгрузках из Excel)
+HEADER_ALIASES = {
+    "название": "name",
+    "наименование": "name",
+    "адрес": "address",
+    "заказчик": "customer",
+    "телефон": "phone",
+    "инн": "inn",
+    "контактное лицо": "contact_person",
+    "почта": "email",
+    "объект": "object",
+    "подрядчик": "contractor",
+    "производители": "manufacturers",
+    "комментарий": "comment",
+}
+
+_validator = JSONSchemasValidator({key: SCHEMAS[key] for key in SCHEMA_KEYS.values()})
+
+
+class ImportFormatError(ValueError):
+    """Файл нельзя импортировать целиком (формат, заголовки)."""
+
+
+def import_dir() -> str:
+    return current_app.config.get("IMPORT_DIR") or os.path.join(
+        current_app.instance_path, "imports"
+    )
+
+
+def source_path(job: ImportJob) -> str:
+    ext = os.path.splitext(job.filename)[1].lower()
+    return os.path.join(import_dir(), f"{job.id}{ext}")
+
+
+def report_path(job: ImportJob) -> str:
+    return os.path.join(import_dir(), f"{job.id}-errors.csv")
+
+
+def fields(kind: str) -> list[str]:
+    return list(SCHEMAS[SCHEMA_KEYS[kind]]["properties"])
+
+
+def create_job(kind: str, filename: str, stream: IO[bytes], user_id: int) -> ImportJob:
+    """Заводит задачу и сохраняет файл; запуск — ``start()``."""
+    if kind not in SCHEMA_KEYS:
+        raise ImportFormatError(f"Неизвестный тип импорта: {kind}")
+    if os.path.splitext(filename)[1].lower() not in EXTENSIONS:
+        raise ImportFormatError("Поддерживаются только файлы CSV")
+    job = ImportJob(kind=kind, filename=filename[:255], created_by=user_id)
+    db.session.add(job)
+    db.session.flush()
+    os.makedirs(import_dir(), exist_ok=True)
+    with open(source_path(job), "wb") as dst:
+        while chunk := stream.read(64 * 1024):
+            dst.write(chunk)
+    db.session.commit()
+    return job
+
+
+def start(job: ImportJob) -> None:
+    """Запускает импорт в фоновом потоке (``IMPORT_BACKGROUND=False`` — сразу).
+
+    Поток живёт в процессе, принявшем файл; состояние хранится в БД, так что
+    прогресс отдаёт любой воркер.
+    """
+    app = current_app._get_current_object()
+    job_id = job.id
+    if not app.config.get("IMPORT_BACKGROUND", True):
+        run(job_id)
+        return
+
+    def target():
+        with app.app_context():
+            run(job_id)
+
+    threading.Thread(target=target, name=f"import-{job_id}", daemon=True).start()
+
+
+def _cell(value: str | None) -> str:
+    return (value or "").strip()
+
+
+def _header(names) -> list[str]:
+    header = []
+    for name in names:
+        key = _cell(name).lower()
+        header.append(HEADER_ALIASES.get(key, key))
+    return header
+
+
+@contextmanager
+def open_rows(path: str) -> Iterator[tuple[list[str], Iterator[tuple[int, list]]]]:
+    """Заголовок и строки ``(номер строки в файле, значения)`` без загрузки в память."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(8192)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS)
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(f, dialect)
+        header = _header(next(reader, ()))
+        yield header, ((reader.line_num, row) for row in reader)
+
+
+def count_rows(path: str) -> int:
+    """Число строк данных: отдельный быстрый проход без проверки."""
+    with open_rows(path) as (_, rows):
+        return sum(1 for _, values in rows if any(map(_cell, values)))
+
+
+class _Importer(ABC):
+    """Проверка строк по индексу в памяти и запись порциями.
+
+    ``pending`` — ``(номер строки, данные)``; модели строятся только в
+    ``write()``, поэтому порцию после отката можно записать заново.
+    """
+
+    kind = ""
+    chunk_rows = CHUNK_ROWS
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.pending: list[tuple[int, Any]] = []
+
+    @abstractmethod
+    def accept(self, line: int, row: dict) -> str | None:
+        """Ставит строку в порцию; иначе возвращает причину пропуска."""
+
+    @abstractmethod
+    def write(self, items: list) -> None:
+        """Пишет данные порции в сессию (коммит — у вызывающего)."""
+
+
+class _ObjectImporter(_Importer):
+    kind = "objects"
+
+    def __init__(self, user_id: int):
+        super().__init__(user_id)
+        self.names = {
+            name.lower() for name in db.session.execute(select(Object.name)).scalars()
+        }
+
+    def accept(self, line, row):
+        key = row["name"].lower()
+        if key in self.names:
+            return "Объект с таким названием уже существует"
+        self.names.add(key)
+        self.pending.append((line, row))
+        return None
+
+    def write(self, items):
+        db.session.add_all(Object(**row) for row in items)
+        db.session.flush()
+
+
+class _ContractorImporter(_Importer):
+    kind = "contractors"
+
+    def __init__(self, user_id: int):
+        super().__init__(user_id)
+        self.names: set[str] = set()
+        self.inns: set[str] = set()
+        for name, inn in db.session.execute(select(Contractor.name, Contractor.inn)):
+            self.names.add(name.lower())
+            if inn:
+                self.inns.add(inn)
+
+    def accept(self, line, row):
+        inn = row.get("inn")
+        if inn and inn in self.inns:
+            return "Подрядчик с таким ИНН уже существует"
+        key = row["name"].lower()
+        if key in self.names:
+            return "Подрядчик с таким названием уже существует"
+        self.names.add(key)
+        if inn:
+            self.inns.add(inn)
+        self.pending.append((line, row))
+        return None
+
+    def write(self, items):
+        db.session.add_all(Contractor(**row) for row in items)
+        db.session.flush()
+
+
+class _RequestImporter(_Importer):
+    kind = "requests"
+    # Строка — одна заявка; больше пакет create_requests не примет
+    chunk_rows = min(CHUNK_ROWS, MAX_BATCH_REQUESTS)
+
+    def __init__(self, user_id: int):
+        super().__init__(user_id)
+        self.objects: dict[str, int] = {}
+        for oid, name in db.session.execute(
+            select(Object.id, Object.name).order_by(Object.id)
+        ):
+            self.objects.setdefault(name.lower(), oid)
+        self.contractors: dict[str, int] = {}
+        for cid, name, inn in db.session.execute(
+            select(Contractor.id, Contractor.name, Contractor.inn).order_by(
+                Contractor.id
+            )
+        ):
+            self.contractors.setdefault(name.lower(), cid)
+            if inn:
+                self.contractors[inn] = cid
+
+    def accept(self, line, row):
+        object_id = self.objects.get(row["object"].lower())
+        if object_id is None:
+            return "Объект не найден"
+        contractor = row["contractor"]
+        contractor_id = self.contractors.get(contractor) or self.contractors.get(
+            contractor.lower()
+        )
+        if contractor_id is None:
+            return "Подрядчик не найден"
+        manufacturers = [m.strip() for m in row["manufacturers"].split(",")]
+        if not any(manufacturers):
+            return "Укажите хотя бы одного производителя"
+        self.pending.append(
+            (
+                line,
+                BatchItem(
+                    object_id=object_id,
+                    contractor_ids=[contractor_id],
+                    manufacturers=manufacturers,
+                    comment=row.get("comment", ""),
+                ),
+            )
+        )
+        return None
+
+    def write(self, items):
+        create_requests(items, self.user_id)
+
+
+IMPORTERS = {
+    importer.kind: importer
+    for importer in (_ObjectImporter, _ContractorImporter, _RequestImporter)
+}
+
+
+class _Report:
+    """CSV-отчёт об отклонённых строках; файл создаётся при первой записи."""
+
+    def __init__(self, path: str, columns: list[str]):
+        self.path = path
+        self.columns = columns
+        self._file = None
+        self._writer = None
+
+    def add(self, line: int, error: str, row: dict) -> None:
+        if self._writer is None:
+            self._file = open(self.path, "w", newline="", encoding="utf-8-sig")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["row", "error", *self.columns])
+        self._writer.writerow(
+            [line, error, *(row.get(col, "") for col in self.columns)]
+        )
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+def _row_error(schema_key: str, row: dict) -> str | None:
+    errors = _validator.validate(schema_key, row)
+    if not errors:
+        return None
+    error = errors[0]
+    path = "/".join(map(str, error.path))
+    return f"{path}: {error.message}" if path else error.message
+
+
+def _write_chunk(importer: _Importer, chunk: list[tuple[int, Any]]):
+    """Пишет порцию одной транзакцией; возвращает ``(строка, ошибка)`` отказов.
+
+    Если порция не записалась, виновные строки отбрасываются (по индексам
+    ``BatchError`` или построчной повторной записью), остальные пишутся заново.
+    """
+    try:
+        importer.write([item for _, item in chunk])
+        db.session.commit()
+        return []
+    except BatchError as exc:
+        db.session.rollback()
+        faulty = {
+            chunk[err["index"]][0]: err["error"]
+            for err in exc.errors
+            if err["index"] is not None
+        }
+        if faulty:
+            rest = [entry for entry in chunk if entry[0] not in faulty]
+            return list(faulty.items()) + (_write_chunk(importer, rest) if rest else [])
+        error = str(exc)
+    except SQLAlchemyError as exc:
+        db.session.rollback()
+        error = f"Ошибка записи: {exc.orig or exc}"
+    if len(chunk) == 1:
+        return [(chunk[0][0], error)]
+    failures = []
+    for entry in chunk:
+        failures += _write_chunk(importer, [entry])
+    return failures
+
+
+def _save(job_id: int, **values) -> None:
+    """Счётчики и статус задачи — отдельной короткой транзакцией."""
+    db.session.execute(update(ImportJob).where(ImportJob.id == job_id).values(**values))
+    db.session.commit()
+
+
+def run(job_id: int) -> None:
+    """Выполняет импорт задачи; ошибки файла целиком — статус ``failed``."""
+    job = db.session.get(ImportJob, job_id)
+    if job is None or job.status != "pending":
+        return
+    kind, user_id, path = job.kind, job.created_by, source_path(job)
+    _save(job_id, status="running")
+    columns = fields(kind)
+    schema_key = SCHEMA_KEYS[kind]
+    report = _Report(report_path(job), columns)
+    # Счётчики живут вне сессии: откат порции их не теряет
+    counts = {"processed": 0, "inserted": 0, "skipped": 0, "failed": 0}
+    rows_by_line: dict[int, dict] = {}
+    result: dict = {"status": "done"}
+    try:
+        _save(job_id, total=count_rows(path))
+        importer = IMPORTERS[kind](user_id)
+
+        def flush():
+            chunk, importer.pending = importer.pending, []
+            if chunk:
+                failures = _write_chunk(importer, chunk)
+                for line, error in failures:
+                    report.add(line, error, rows_by_line[line])
+                counts["failed"] += len(failures)
+                counts["inserted"] += len(chunk) - len(failures)
+            rows_by_line.clear()
+            _save(job_id, **counts)
+
+        with open_rows(path) as (header, rows):
+            missing = [
+                name for name in SCHEMAS[schema_key]["required"] if name not in header
+            ]
+            if missing:
+                raise ImportFormatError("Нет столбцов: " + ", ".join(missing))
+            for line, values in rows:
+                values = [_cell(value) for value in values]
+                if not any(values):
+                    continue
+                counts["processed"] += 1
+                row = {
+                    name: value
+                    for name, value in zip(header, values)
+                    if value and name in columns
+                }
+                error = _row_error(schema_key, row)
+                if error:
+                    counts["failed"] += 1
+                    report.add(line, error, row)
+                else:
+                    reason = importer.accept(line, row)
+                    if reason:
+                        counts["skipped"] += 1
+                        report.add(line, reason, row)
+                    else:
+                        rows_by_line[line] = row
+                if len(importer.pending) >= importer.chunk_rows:
+                    flush()
+            flush()
+    except Exception as exc:
+        db.session.rollback()
+        logger.exception("Импорт %s прерван", job_id)
+        result = {"status": "failed", "message": str(exc)[:500]}
+    finally:
+        report.close()
+    _save(job_id, **counts, **result, finished_at=datetime.utcnow())
+    logger.info(
+        "Импорт %s (%s): вставлено %s, пропущено %s, ошибок %s",
+        job_id,
+        kind,
+        counts["inserted"],
+        counts["skipped"],
+        counts["failed"],
+    )
+
+
+def job_data(job: ImportJob) -> dict:
+    """Состояние задачи для API."""
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "filename": job.filename,
+        "status": job.status,
+        "total": job.total,
+        "processed": job.processed,
+        "inserted": job.inserted,
+        "skipped": job.skipped,
+        "failed": job.failed,
+        "message": job.message,
+        "has_report": os.path.exists(report_path(job)),
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
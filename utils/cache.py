@@ -2,17 +2,41 @@
 
 Позволяют использовать условные запросы через заголовки
 ETag/If-None-Match и Last-Modified/If-Modified-Since.
+
+Здесь же — общий кеш данных ``TTLCache``: LRU по числу записей с TTL и
+тегами для инвалидации. Хранилище выбирается настройкой ``CACHE_BACKEND``:
+``memory`` (память процесса), ``sqlite`` (файл, общий для воркеров одного
+сервера) или ``redis`` (``REDIS_URL``, общий для всех серверов). Запись,
+вставка или удаление заявки после коммита сбрасывает теги ``requests`` и
+``object:<id>``, поэтому данные по объекту не устаревают на время TTL.
 """
 
 from __future__ import annotations
 
 import hashlib
 import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
 from email.utils import format_datetime, parsedate_to_datetime
-from typing import Any, Sequence
+from typing import Any, Hashable, Iterable, Sequence
+
+from flask import Response, current_app, has_app_context, request
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
 
-from flask import Response, request
+DEFAULT_TTL = 60
+DEFAULT_MAX_ENTRIES = 1024
+REDIS_PREFIX = "crm:cache"
+_PENDING_TAGS = "cache_pending_tags"
+
+_listeners_registered = False
 
 
 def prepare_cache(
@@ -53,3 +77,481 @@ def prepare_cache(
             pass
 
     return etag, last_modified_str
+
+
+class MemoryBackend:
+    """LRU-хранилище в памяти процесса."""
+
+    kind = "memory"
+
+    def __init__(self, namespace: str, max_entries: int) -> None:
+        self.namespace = namespace
+        self.max_entries = max_entries
+        # ключ -> (истекает, значение, размер, теги)
+        self.entries: OrderedDict[str, tuple[float, Any, int, tuple[str, ...]]] = (
+            OrderedDict()
+        )
+        self.tags: dict[str, set[str]] = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str, now: float) -> tuple[bool, Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= now:
+                self._drop(key)
+                return False, None
+            self.entries.move_to_end(key)
+            return True, entry[1]
+
+    def set(
+        self, key: str, value: Any, expires: float, tags: tuple[str, ...], size: int
+    ) -> int:
+        with self.lock:
+            self._drop(key)
+            self.entries[key] = (expires, value, size, tags)
+            for tag in tags:
+                self.tags.setdefault(tag, set()).add(key)
+            evicted = 0
+            while len(self.entries) > self.max_entries:
+                self._drop(next(iter(self.entries)))
+                evicted += 1
+            return evicted
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        with self.lock:
+            keys = set()
+            for tag in tags:
+                keys |= self.tags.pop(tag, set())
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.tags.clear()
+
+    def usage(self) -> tuple[int, int]:
+        with self.lock:
+            return len(self.entries), sum(e[2] for e in self.entries.values())
+
+    def _drop(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[3]:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+
+
+class SQLiteBackend:
+    """LRU-хранилище в файле SQLite, общее для воркеров одного сервера."""
+
+    kind = "sqlite"
+
+    def __init__(self, namespace: str, max_entries: int, path: str) -> None:
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.path = path
+        self.local = threading.local()
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS cache_entry (
+                    namespace TEXT, key TEXT, value TEXT, size INTEGER,
+                    expires_at REAL, used_at REAL, PRIMARY KEY (namespace, key)
+                );
+                CREATE INDEX IF NOT EXISTS ix_cache_entry_used
+                    ON cache_entry (namespace, used_at);
+                CREATE TABLE IF NOT EXISTS cache_tag (
+                    namespace TEXT, tag TEXT, key TEXT,
+                    PRIMARY KEY (namespace, tag, key)
+                );
+                CREATE INDEX IF NOT EXISTS ix_cache_tag_key
+                    ON cache_tag (namespace, key);
+                """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def _drop(self, conn: sqlite3.Connection, keys: list[str]) -> None:
+        for key in keys:
+            conn.execute(
+                "DELETE FROM cache_entry WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+            conn.execute(
+                "DELETE FROM cache_tag WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+
+    def get(self, key: str, now: float) -> tuple[bool, Any]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache_entry"
+                " WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                return False, None
+            if row[1] <= now:
+                self._drop(conn, [key])
+                return False, None
+            conn.execute(
+                "UPDATE cache_entry SET used_at = ? WHERE namespace = ? AND key = ?",
+                (time.time(), self.namespace, key),
+            )
+            return True, json.loads(row[0])
+
+    def set(
+        self, key: str, value: Any, expires: float, tags: tuple[str, ...], size: int
+    ) -> int:
+        with self._connect() as conn:
+            self._drop(conn, [key])
+            conn.execute(
+                "INSERT INTO cache_entry VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), size, expires, time.time()),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO cache_tag VALUES (?, ?, ?)",
+                [(self.namespace, tag, key) for tag in tags],
+            )
+            (count,) = conn.execute(
+                "SELECT COUNT(*) FROM cache_entry WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()
+            overflow = count - self.max_entries
+            if overflow <= 0:
+                return 0
+            oldest = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT key FROM cache_entry WHERE namespace = ?"
+                    " ORDER BY used_at LIMIT ?",
+                    (self.namespace, overflow),
+                )
+            ]
+            self._drop(conn, oldest)
+            return len(oldest)
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        tags = list(tags)
+        if not tags:
+            return 0
+        marks = ",".join("?" * len(tags))
+        with self._connect() as conn:
+            keys = [
+                row[0]
+                for row in conn.execute(
+                    f"SELECT DISTINCT key FROM cache_tag"  # noqa: S608
+                    f" WHERE namespace = ? AND tag IN ({marks})",
+                    (self.namespace, *tags),
+                )
+            ]
+            self._drop(conn, keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM cache_entry WHERE namespace = ?", (self.namespace,)
+            )
+            conn.execute("DELETE FROM cache_tag WHERE namespace = ?", (self.namespace,))
+
+    def usage(self) -> tuple[int, int]:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entry"
+                " WHERE namespace = ?",
+                (self.namespace,),
+            )
+            .fetchone()
+        )
+        return int(row[0]), int(row[1])
+
+
+class RedisBackend:
+    """LRU-хранилище в Redis, общее для всех воркеров и серверов."""
+
+    kind = "redis"
+
+    def __init__(self, namespace: str, max_entries: int, client) -> None:
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.client = client
+        self.prefix = f"{REDIS_PREFIX}:{namespace}:"
+        # Порядок использования (LRU) и размеры записей
+        self.lru = self.prefix + "lru"
+        self.sizes = self.prefix + "sizes"
+
+    def _entry(self, key: str) -> str:
+        return self.prefix + "e:" + key
+
+    def _tag(self, tag: str) -> str:
+        return self.prefix + "t:" + tag
+
+    def _drop(self, keys: list[str]) -> None:
+        if not keys:
+            return
+        pipe = self.client.pipeline()
+        pipe.delete(*[self._entry(key) for key in keys])
+        pipe.zrem(self.lru, *keys)
+        pipe.hdel(self.sizes, *keys)
+        pipe.execute()
+
+    def get(self, key: str, now: float) -> tuple[bool, Any]:
+        raw = self.client.get(self._entry(key))
+        if raw is None:
+            self._drop([key])
+            return False, None
+        self.client.zadd(self.lru, {key: time.time()})
+        return True, json.loads(raw)
+
+    def set(
+        self, key: str, value: Any, expires: float, tags: tuple[str, ...], size: int
+    ) -> int:
+        ttl = max(1, int(expires - time.time()))
+        pipe = self.client.pipeline()
+        pipe.set(self._entry(key), json.dumps(value), ex=ttl)
+        pipe.zadd(self.lru, {key: time.time()})
+        pipe.hset(self.sizes, key, size)
+        for tag in tags:
+            pipe.sadd(self._tag(tag), key)
+            pipe.expire(self._tag(tag), ttl)
+        pipe.zcard(self.lru)
+        count = pipe.execute()[-1]
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return 0
+        oldest = [
+            member.decode() if isinstance(member, bytes) else member
+            for member, _score in self.client.zpopmin(self.lru, overflow)
+        ]
+        self._drop(oldest)
+        return len(oldest)
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        keys: set[str] = set()
+        for tag in tags:
+            members = self.client.smembers(self._tag(tag))
+            keys |= {m.decode() if isinstance(m, bytes) else m for m in members}
+            self.client.delete(self._tag(tag))
+        self._drop(sorted(keys))
+        return len(keys)
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def usage(self) -> tuple[int, int]:
+        sizes = self.client.hvals(self.sizes)
+        return len(sizes), sum(int(size) for size in sizes)
+
+
+class TTLCache:
+    """Кеш данных с LRU, TTL и тегами поверх сменного хранилища.
+
+    Значения должны сериализоваться в JSON (хранилища ``sqlite``/``redis``).
+    Ошибки хранилища не ломают запрос: они логируются и считаются промахом.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: int = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._backend: Any = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        _CACHES.append(self)
+
+    @property
+    def backend(self):
+        # Хранилище выбирается по конфигурации приложения при первом обращении
+        if self._backend is None:
+            if has_app_context():
+                self._backend = make_backend(current_app, self.name, self.max_entries)
+            else:
+                self._backend = MemoryBackend(self.name, self.max_entries)
+        return self._backend
+
+    @staticmethod
+    def make_key(key: Hashable) -> str:
+        return json.dumps(key, ensure_ascii=False, default=str)
+
+    def get(self, key: Hashable) -> Any:
+        try:
+            found, value = self.backend.get(self.make_key(key), time.time())
+        except Exception as exc:  # noqa: BLE001
+            self._failed("чтение", exc)
+            found, value = False, None
+        if found:
+            self.hits += 1
+            return value
+        self.misses += 1
+        return None
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        tags: Iterable[str] = (),
+        ttl: int | None = None,
+    ) -> None:
+        payload = json.dumps(value, ensure_ascii=False)
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        try:
+            self.evictions += self.backend.set(
+                self.make_key(key), value, expires, tuple(tags), len(payload)
+            )
+        except Exception as exc:  # noqa: BLE001
+            self._failed("запись", exc)
+
+    def invalidate(self, *tags: str) -> int:
+        try:
+            return self.backend.invalidate(tags)
+        except Exception as exc:  # noqa: BLE001
+            self._failed("инвалидация", exc)
+            return 0
+
+    def clear(self) -> None:
+        try:
+            self.backend.clear()
+        except Exception as exc:  # noqa: BLE001
+            self._failed("очистка", exc)
+
+    def stats(self) -> dict[str, Any]:
+        try:
+            entries, size = self.backend.usage()
+        except Exception as exc:  # noqa: BLE001
+            self._failed("статистика", exc)
+            entries, size = 0, 0
+        lookups = self.hits + self.misses
+        return {
+            "name": f"{self.name} ({self.backend.kind})",
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "bytes": size,
+            "max_bytes": 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def _failed(self, action: str, exc: Exception) -> None:
+        self.errors += 1
+        logger.warning("Кеш %s: ошибка (%s): %s", self.name, action, exc)
+
+
+_CACHES: list[TTLCache] = []
+
+
+def cache_stats() -> list[dict[str, Any]]:
+    """Статистика всех кешей ``TTLCache`` процесса."""
+    return [cache.stats() for cache in _CACHES]
+
+
+def invalidate_tags(tags: Iterable[str]) -> None:
+    """Сбрасывает записи с любым из тегов во всех кешах."""
+    tags = sorted(set(tags))
+    if not tags:
+        return
+    for cache in _CACHES:
+        cache.invalidate(*tags)
+
+
+def request_tags(obj: Any) -> set[str]:
+    """Теги, которые устаревают при записи заявки (с прежним объектом)."""
+    tags = {"requests"}
+    history = inspect(obj).attrs.object_id.history
+    for object_id in (obj.object_id, *(history.deleted or ())):
+        if object_id is not None:
+            tags.add(f"object:{object_id}")
+    return tags
+
+
+def _after_flush(session, flush_context) -> None:
+    from models import Request
+
+    pending = session.info.setdefault(_PENDING_TAGS, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Request):
+            pending |= request_tags(obj)
+
+
+def _after_commit(session) -> None:
+    # Сбрасываем только после коммита: иначе параллельный запрос успел бы
+    # положить в кеш ещё старые данные
+    invalidate_tags(session.info.pop(_PENDING_TAGS, ()))
+
+
+def _after_rollback(session) -> None:
+    session.info.pop(_PENDING_TAGS, None)
+
+
+def _clear_all(*_args, **_kwargs) -> None:
+    for cache in _CACHES:
+        cache.clear()
+
+
+def register_listeners() -> None:
+    """Подписывает инвалидацию кешей на записи заявок (идемпотентно)."""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    from database import db
+
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+    event.listen(db.metadata, "after_create", _clear_all)
+    event.listen(db.metadata, "after_drop", _clear_all)
+    _listeners_registered = True
+
+
+def make_backend(app, namespace: str, max_entries: int):
+    """Хранилище кеша по ``CACHE_BACKEND``; при ошибке — память процесса."""
+    kind = (app.config.get("CACHE_BACKEND") or "memory").lower()
+    try:
+        if kind == "sqlite":
+            path = app.config.get("CACHE_SQLITE_PATH") or os.path.join(
+                app.instance_path, "cache.sqlite3"
+            )
+            return SQLiteBackend(namespace, max_entries, path)
+        if kind == "redis":
+            import redis  # локальный импорт, чтобы не тащить зависимость заранее
+
+            url = app.config.get("CACHE_REDIS_URL") or os.getenv("REDIS_URL", "")
+            client = redis.from_url(url, socket_connect_timeout=2, socket_timeout=2)
+            client.ping()
+            return RedisBackend(namespace, max_entries, client)
+    except Exception as exc:  # noqa: BLE001
+        app.logger.warning(f"Кеш {namespace}: хранилище {kind} недоступно: {exc}")
+    return MemoryBackend(namespace, max_entries)
+
+
+def init_cache(app) -> None:
+    """Подключает инвалидацию кешей; хранилища выбираются заново по ``app``."""
+    register_listeners()
+    for cache in _CACHES:
+        cache._backend = make_backend(app, cache.name, cache.max_entries)
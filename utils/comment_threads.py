@@ -0,0 +1,128 @@
+"""Загрузка веток комментариев (OP и заявок) с кешем готовых фрагментов.
+
+Комментарии страницы и имена авторов читаются одним запросом с JOIN.
+HTML карточки (``_comment_item.html``) кешируется по id комментария и
+классу прав зрителя: карточка зависит только от того, админ ли зритель
+и автор ли он. Карточки с таймером удаления (первая минута после
+публикации у автора) не кешируются. Шаблон карточки рендерится напрямую,
+без контекст-процессоров приложения: ему нужны только ``comment`` и
+``current_user``, а процессоры выполняют свои запросы на каждый рендер.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from flask import current_app
+from flask_login import current_user
+from sqlalchemy import select
+
+from database import db
+from models import Comment, OpComment, User
+from utils.cache import TTLCache
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+# Сколько секунд автор может удалить свой комментарий к заявке
+DELETE_WINDOW = 60
+
+FRAGMENTS = TTLCache("comment_fragments", ttl=3600, max_entries=4096)
+
+# Модель комментария -> колонка родителя (объект или заявка)
+PARENTS = {OpComment: OpComment.object_id, Comment: Comment.request_id}
+
+
+def _permission_class(user_id: int) -> str:
+    if getattr(current_user, "role", None) == "admin":
+        return "admin"
+    return "author" if user_id == current_user.id else "other"
+
+
+def _permissions(model, user_id: int, created_at: datetime) -> tuple[bool, int]:
+    """``(can_delete, remaining_time)`` для текущего пользователя."""
+    is_admin = getattr(current_user, "role", None) == "admin"
+    own = user_id == current_user.id
+    if model is OpComment:
+        return is_admin or own, 0
+    age = (datetime.utcnow() - created_at).total_seconds()
+    remaining = max(0, DELETE_WINDOW - int(age)) if own else 0
+    return is_admin or (own and age <= DELETE_WINDOW), remaining
+
+
+def _render(comment: dict[str, Any]) -> str:
+    template = current_app.jinja_env.get_template("_comment_item.html")
+    return template.render(comment=comment, current_user=current_user)
+
+
+def render_comment(model, comment: dict[str, Any]) -> str:
+    """HTML карточки комментария (из кеша, если таймера нет)."""
+    if comment["remaining_time"] > 0:
+        return _render(comment)
+    key = (
+        model.__tablename__,
+        comment["id"],
+        comment["created_at"],
+        comment["username"],
+        _permission_class(comment["user_id"]),
+    )
+    html = FRAGMENTS.get(key)
+    if html is None:
+        html = _render(comment)
+        FRAGMENTS.set(key, html)
+    return html
+
+
+def load_comments(
+    model, parent_id: int, before_id: int | None = None, limit: int | None = None
+) -> tuple[list[dict[str, Any]], bool]:
+    """Комментарии ветки от старых к новым и признак более ранних.
+
+    С ``limit`` возвращается последняя страница (или страница перед
+    ``before_id``); без него — вся ветка.
+    """
+    query = (
+        select(model, User.username)
+        .outerjoin(User, User.id == model.user_id)
+        .where(PARENTS[model] == parent_id)
+        .order_by(model.id.desc())
+    )
+    if before_id is not None:
+        query = query.where(model.id < before_id)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    rows = db.session.execute(query).all()
+    has_more = limit is not None and len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+
+    comments = []
+    for comment, username in reversed(rows):
+        can_delete, remaining_time = _permissions(
+            model, comment.user_id, comment.created_at
+        )
+        data = {
+            "id": comment.id,
+            "content": comment.content,
+            "username": username or ("" if model is OpComment else "Неизвестный"),
+            "created_at": comment.created_at.strftime("%d.%m.%Y %H:%M"),
+            "user_id": comment.user_id,
+            "can_delete": can_delete,
+            "remaining_time": remaining_time,
+        }
+        data["rendered_html"] = render_comment(model, data)
+        comments.append(data)
+    return comments, has_more
+
+
+def page_args(args) -> tuple[int | None, int]:
+    """``(before_id, limit)`` из параметров запроса."""
+    try:
+        before_id = int(args["before_id"]) if args.get("before_id") else None
+    except (TypeError, ValueError):
+        before_id = None
+    try:
+        limit = int(args.get("limit", DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        limit = DEFAULT_LIMIT
+    return before_id, max(1, min(limit, MAX_LIMIT))
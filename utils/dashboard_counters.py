@@ -0,0 +1,242 @@
+"""Материализованные счётчики дашборда.
+
+Карточки дашборда (всего заявок, выполнено, в работе, создано сегодня)
+читаются из таблицы ``dashboard_counter`` одним запросом. Счётчики
+меняются в обработчике ``after_flush`` той же транзакции, что вставляет,
+удаляет заявку или меняет её статус/дату создания, поэтому после коммита
+они согласованы во всех воркерах. Массовые ``UPDATE``/``DELETE`` в обход ORM
+счётчики не видят — расхождения находит и исправляет
+``flask dashboard:reconcile``.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from datetime import date, datetime
+from typing import Any
+
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from database import db
+from models import DashboardCounter, Request
+from utils.statuses import RequestStatus
+
+logger = logging.getLogger(__name__)
+
+TOTAL = "total"
+# Статусы, которые дашборд показывает как «в работе»
+UNPROCESSED_STATUSES = (
+    RequestStatus.OPEN.value,
+    RequestStatus.IN_PROGRESS.value,
+    RequestStatus.NEED_INFO.value,
+)
+
+_listeners_registered = False
+
+
+def status_key(status: str | None) -> str:
+    return f"status:{status or ''}"
+
+
+def created_key(value: datetime | date | str | None) -> str:
+    return f"created:{str(value)[:10] if value else ''}"
+
+
+def _keys(status: str | None, created_at: Any) -> tuple[str, ...]:
+    return TOTAL, status_key(status), created_key(created_at)
+
+
+def _old_value(state, attr: str) -> Any:
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else getattr(state.obj(), attr)
+
+
+def _upsert(dialect: str, table, name: str, delta: int):
+    """``INSERT ... ON CONFLICT/DUPLICATE KEY UPDATE value = value + delta``."""
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+
+        stmt = insert(table).values(name=name, value=delta)
+        return stmt.on_duplicate_key_update(value=table.c.value + delta)
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    stmt = insert(table).values(name=name, value=delta)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.name], set_={"value": table.c.value + delta}
+    )
+
+
+def _apply(connection, deltas: Counter) -> None:
+    # Одна атомарная вставка-или-прибавление на ключ: два запроса, впервые
+    # создающие один и тот же ключ (``created:<сегодня>``), не конфликтуют
+    table = DashboardCounter.__table__
+    dialect = connection.dialect.name
+    for name in sorted(deltas):
+        delta = deltas[name]
+        if not delta:
+            continue
+        stmt = _upsert(dialect, table, name, delta)
+        if stmt is not None:
+            connection.execute(stmt)
+            continue
+        result = connection.execute(
+            update(table)
+            .where(table.c.name == name)
+            .values(value=table.c.value + delta)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(name=name, value=delta))
+
+
+def _after_flush(session, flush_context) -> None:
+    deltas: Counter = Counter()
+    for obj in session.new:
+        if isinstance(obj, Request):
+            deltas.update(_keys(obj.status, obj.created_at))
+    for obj in session.deleted:
+        if isinstance(obj, Request):
+            state = inspect(obj)
+            deltas.subtract(
+                _keys(_old_value(state, "status"), _old_value(state, "created_at"))
+            )
+    for obj in session.dirty:
+        if not isinstance(obj, Request) or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        for attr, key in (("status", status_key), ("created_at", created_key)):
+            history = state.attrs[attr].history
+            if not history.has_changes() or not history.deleted:
+                continue
+            old, new = key(history.deleted[0]), key(getattr(obj, attr))
+            if old != new:
+                deltas[old] -= 1
+                deltas[new] += 1
+    if deltas:
+        _apply(session.connection(), deltas)
+
+
+def _keep_old_value(target, value, oldvalue, initiator) -> None:
+    """Пустой слушатель: нужен только ради ``active_history``."""
+
+
+def register_listeners() -> None:
+    """Подписывает счётчики на flush сессий (идемпотентно)."""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    # active_history: старое значение нужно, даже если атрибут был истёкшим
+    for attr in (Request.status, Request.created_at):
+        event.listen(attr, "set", _keep_old_value, active_history=True)
+    event.listen(Session, "after_flush", _after_flush)
+    _listeners_registered = True
+
+
+def snapshot(today: date | None = None) -> dict[str, int]:
+    """Значения карточек дашборда одним запросом."""
+    today = today or date.today()
+    names = {
+        "total_requests": (TOTAL,),
+        "processed_requests": (status_key(RequestStatus.DONE.value),),
+        "unprocessed_requests": tuple(status_key(s) for s in UNPROCESSED_STATUSES),
+        "today_count": (created_key(today),),
+    }
+    wanted = {name for group in names.values() for name in group}
+    values = dict(
+        db.session.execute(
+            select(DashboardCounter.name, DashboardCounter.value).where(
+                DashboardCounter.name.in_(wanted)
+            )
+        ).all()
+    )
+    return {
+        card: sum(values.get(name, 0) for name in group)
+        for card, group in names.items()
+    }
+
+
+def status_total(status_filter: str) -> int | None:
+    """Число заявок для фильтра статуса дашборда или ``None``, если не счётчик."""
+    if status_filter == "all":
+        names = (TOTAL,)
+    elif status_filter == "processed":
+        names = (status_key(RequestStatus.DONE.value),)
+    elif status_filter == "unprocessed":
+        names = tuple(status_key(s) for s in UNPROCESSED_STATUSES)
+    elif status_filter in RequestStatus.all():
+        names = (status_key(status_filter),)
+    else:
+        return None
+    total = db.session.execute(
+        select(func.coalesce(func.sum(DashboardCounter.value), 0)).where(
+            DashboardCounter.name.in_(names)
+        )
+    ).scalar()
+    return int(total)
+
+
+def recompute() -> dict[str, int]:
+    """Счётчики, посчитанные заново по таблице заявок."""
+    counts = {TOTAL: db.session.query(func.count(Request.id)).scalar() or 0}
+    for status, count in db.session.query(
+        Request.status, func.count(Request.id)
+    ).group_by(Request.status):
+        counts[status_key(status)] = count
+    day = func.date(Request.created_at)
+    for created, count in db.session.query(day, func.count(Request.id)).group_by(day):
+        counts[created_key(created)] = count
+    return counts
+
+
+def reconcile(fix: bool = True) -> dict[str, tuple[int, int]]:
+    """Сверяет счётчики с таблицей заявок.
+
+    Возвращает расхождения ``имя -> (хранится, фактически)``; с ``fix``
+    перезаписывает таблицу счётчиков фактическими значениями.
+    """
+    actual = recompute()
+    stored = dict(
+        db.session.execute(select(DashboardCounter.name, DashboardCounter.value)).all()
+    )
+    drift = {
+        name: (stored.get(name, 0), actual.get(name, 0))
+        for name in sorted(set(stored) | set(actual))
+        if stored.get(name, 0) != actual.get(name, 0)
+    }
+    if fix and (drift or set(stored) - set(actual)):
+        table = DashboardCounter.__table__
+        db.session.execute(table.delete())
+        if actual:
+            db.session.execute(
+                table.insert(),
+                [{"name": name, "value": value} for name, value in actual.items()],
+            )
+        db.session.commit()
+    return drift
+
+
+def ensure_built() -> None:
+    """Заполняет счётчики, если заявки есть, а счётчиков ещё нет."""
+    if db.session.get(DashboardCounter, TOTAL) is not None:
+        return
+    if db.session.query(Request.id).first() is None:
+        return
+    reconcile()
+    logger.info("Счётчики дашборда посчитаны по таблице заявок")
+
+
+def init_dashboard_counters(app) -> None:
+    """Подключает счётчики к приложению."""
+    register_listeners()
+    try:
+        ensure_built()
+    except Exception as exc:  # noqa: BLE001
+        db.session.rollback()
+        app.logger.warning(f"Счётчики дашборда не посчитаны при старте: {exc}")
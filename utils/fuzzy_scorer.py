@@ -0,0 +1,131 @@
+"""Пакетный двухэтапный нечёткий скорер.
+
+Даёт те же оценки, что ``routes.search_routes.advanced_search_similarity``,
+но для списка строк сразу:
+
+1. дешёвый проход — метрики ``rapidfuzz`` считаются пакетно в C для всех
+   строк, SequenceMatcher оценивается сверху через indel-сходство
+   (совпавшие блоки не длиннее наибольшей общей подпоследовательности);
+   строки, чья верхняя граница ниже порога, получают 0 без дальнейших
+   вычислений;
+2. для оставшихся строк вызывается сама ``advanced_search_similarity``,
+   поэтому итоговые оценки совпадают с ней побитово.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+from jellyfish import metaphone, soundex
+from rapidfuzz import fuzz as rf_fuzz
+from rapidfuzz import process
+from rapidfuzz.distance import Levenshtein
+from rapidfuzz.utils import default_process
+
+# thefuzz округляет оценки до целого процента: запас на округление вверх
+_ROUNDING_SLACK = 0.005
+# Запас на погрешность сложения float
+_FLOAT_SLACK = 1e-9
+# Как thefuzz.utils.full_process(force_ascii=True): выбрасываем символы 128-255
+_ASCII_DAMMIT = {i: None for i in range(128, 256)}
+
+
+def _token_process(value: str) -> str:
+    return default_process(value.translate(_ASCII_DAMMIT))
+
+
+def _batch(scorer, query: str, choices: list[str]) -> list[float]:
+    scores = [0.0] * len(choices)
+    for _choice, score, index in process.extract(
+        query, choices, scorer=scorer, limit=None
+    ):
+        scores[index] = score
+    return scores
+
+
+def _code(func, value: str):
+    try:
+        return func(value)
+    except Exception:
+        return None
+
+
+def upper_bounds(query: str, texts: Sequence[str]) -> list[float]:
+    """Верхние границы оценки для непустых строк без вхождения запроса."""
+    query_lower = query.lower()
+    lowered = [text.lower() for text in texts]
+    ratios = _batch(rf_fuzz.ratio, query_lower, lowered)
+    partials = _batch(rf_fuzz.partial_ratio, query_lower, lowered)
+    query_tokens = _token_process(query_lower)
+    tokens = [_token_process(text) for text in lowered]
+    token_sorts = _batch(rf_fuzz.token_sort_ratio, query_tokens, tokens)
+    token_sets = _batch(rf_fuzz.token_set_ratio, query_tokens, tokens)
+    distances = _batch(Levenshtein.distance, query_lower, lowered)
+
+    query_soundex = _code(soundex, query_lower)
+    query_metaphone = _code(metaphone, query_lower)
+    query_words = query_lower.split()
+
+    bounds = []
+    for i, text_lower in enumerate(lowered):
+        ratio = ratios[i] / 100.0
+        bound = (
+            (ratio + _ROUNDING_SLACK) * 0.25
+            + (partials[i] / 100.0 + _ROUNDING_SLACK) * 0.3
+            + (token_sorts[i] / 100.0 + _ROUNDING_SLACK) * 0.15
+            + (token_sets[i] / 100.0 + _ROUNDING_SLACK) * 0.15
+            + ratio * 0.05
+        )
+        if query_soundex is not None and query_soundex == _code(soundex, text_lower):
+            bound += 0.1
+        if query_metaphone is not None and query_metaphone == _code(
+            metaphone, text_lower
+        ):
+            bound += 0.05
+        max_len = max(len(query_lower), len(text_lower))
+        if max_len:
+            bound += (1.0 - distances[i] / max_len) * 0.05
+        if text_lower.startswith(query_lower):
+            bound += 0.1
+        text_words = text_lower.split()
+        word_matches = sum(1 for q_word in query_words if q_word in text_words)
+        if word_matches > 0:
+            bound += min(word_matches / len(query_words), 1.0) * 0.2
+        bounds.append(min(bound + _FLOAT_SLACK, 1.0))
+    return bounds
+
+
+def score_batch(query: str, texts: Sequence[str], threshold: float = 0.4) -> list:
+    """Оценки ``advanced_search_similarity(query, text, threshold)`` для всех строк."""
+    from routes import search_routes
+
+    exact = search_routes.advanced_search_similarity
+    scores: list = [0] * len(texts)
+    if not query:
+        return scores
+
+    query_lower = query.lower()
+    pending: list[int] = []
+    for i, text in enumerate(texts):
+        if not text:
+            continue
+        if query_lower in text.lower():
+            scores[i] = 1.0
+        else:
+            pending.append(i)
+    if not pending:
+        return scores
+
+    if threshold <= 0:
+        survivors = pending
+    else:
+        bounds = upper_bounds(query, [texts[i] for i in pending])
+        survivors = []
+        for i, bound in zip(pending, bounds):
+            if bound < threshold:
+                scores[i] = 0.0
+            else:
+                survivors.append(i)
+    for i in survivors:
+        scores[i] = exact(query, texts[i], threshold)
+    return scores
@@ -0,0 +1,204 @@
+"""Пагинация для списков, собранных вне ``Query.paginate``.
+
+Кроме страниц по номеру (OFFSET) есть keyset-режим: страница начинается с
+позиции непрозрачного курсора по ключу сортировки ``(created_at, id)``.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import time
+from datetime import datetime
+from typing import Any, Iterator, Sequence
+
+from flask import current_app, request
+from sqlalchemy import and_, or_
+
+from database import db
+
+
+class ManualPagination:
+    """Совместимый с шаблонами объект пагинации поверх готовой страницы."""
+
+    def __init__(self, items: Sequence[Any], page: int, per_page: int, total: int):
+        self.items = list(items)
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.pages = (total + per_page - 1) // per_page if total > 0 else 1
+        self.has_prev = page > 1
+        self.has_next = page < self.pages
+        self.prev_num = page - 1 if self.has_prev else None
+        self.next_num = page + 1 if self.has_next else None
+
+    def iter_pages(
+        self, left_edge=2, left_current=2, right_current=3, right_edge=2
+    ) -> Iterator[int]:
+        last = self.pages
+        for num in range(1, last + 1):
+            if (
+                num <= left_edge
+                or (self.page - left_current - 1 < num < self.page + right_current)
+                or num > last - right_edge
+            ):
+                yield num
+
+
+class KeysetPagination:
+    """Страница keyset-пагинации: курсоры «вперёд/назад» и примерный итог.
+
+    Номера страниц не вычисляются (``page`` — ``None``): переход возможен
+    только на соседние страницы, как при бесконечной прокрутке.
+    """
+
+    cursor_mode = True
+
+    def __init__(
+        self,
+        items: Sequence[Any],
+        per_page: int,
+        next_cursor: str | None,
+        prev_cursor: str | None,
+        total: int,
+    ):
+        self.items = list(items)
+        self.page = None
+        self.per_page = per_page
+        self.total = total
+        self.pages = (total + per_page - 1) // per_page if total > 0 else 1
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.has_next = next_cursor is not None
+        self.has_prev = prev_cursor is not None
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _load(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any], direction: str = "next") -> str:
+    """Непрозрачный курсор: значения ключа сортировки и направление."""
+    payload = json.dumps([direction, [_dump(v) for v in values]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> tuple[str, list[Any]] | None:
+    """``(direction, values)`` или ``None`` для пустого/повреждённого курсора."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        direction, values = json.loads(raw)
+        if direction not in ("next", "prev") or not isinstance(values, list):
+            return None
+        return direction, [_load(v) for v in values]
+    except (ValueError, TypeError):
+        return None
+
+
+def _seek_clause(columns, values, after: bool):
+    """Лексикографическое ``(c1, c2, ...) > / < (v1, v2, ...)`` без row values."""
+    terms = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        terms.append(and_(*equal, column > values[i] if after else column < values[i]))
+    return or_(*terms)
+
+
+def keyset_paginate(
+    query,
+    columns: Sequence[Any],
+    cursor: str | None,
+    per_page: int,
+    total: int,
+    descending: bool = True,
+) -> KeysetPagination:
+    """Страница по ключу ``columns`` (последний — уникальный, обычно ``id``).
+
+    Вместо OFFSET запрос начинается с позиции курсора по индексу сортировки,
+    поэтому глубокие страницы не дороже первой. Читается ``per_page + 1``
+    строк, чтобы узнать о следующей странице без COUNT.
+    """
+    decoded = decode_cursor(cursor)
+    if decoded is not None and len(decoded[1]) != len(columns):
+        decoded = None
+    backwards = decoded is not None and decoded[0] == "prev"
+    # Для «назад» идём в обратном порядке и разворачиваем страницу
+    forward_desc = descending != backwards
+    if decoded is not None:
+        query = query.filter(_seek_clause(columns, decoded[1], after=not forward_desc))
+    order = [c.desc() if forward_desc else c.asc() for c in columns]
+    rows = query.order_by(None).order_by(*order).limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    has_next = more if not backwards else True
+    has_prev = decoded is not None if not backwards else more
+    if not rows:
+        has_next = has_prev = False
+
+    def key(item):
+        return [getattr(item, c.key) for c in columns]
+
+    return KeysetPagination(
+        rows,
+        per_page,
+        encode_cursor(key(rows[-1]), "next") if has_next else None,
+        encode_cursor(key(rows[0]), "prev") if has_prev else None,
+        total,
+    )
+
+
+def offset_paginate(query, page: int, per_page: int, total: int) -> ManualPagination:
+    """OFFSET/LIMIT-страница с заранее известным (кешированным) итогом."""
+    page = max(page, 1)
+    items = query.limit(per_page).offset((page - 1) * per_page).all()
+    return ManualPagination(items, page, per_page, total)
+
+
+def keyset_requested() -> bool:
+    """Режим keyset: курсор или ``mode=keyset`` в запросе, иначе настройка."""
+    mode = request.args.get("mode") or current_app.config.get(
+        "PAGINATION_MODE", "offset"
+    )
+    return bool(request.args.get("cursor")) or mode == "keyset"
+
+
+def _query_key(query) -> str:
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    return f"{compiled}|{sorted(compiled.params.items())!r}"
+
+
+def cached_count(query) -> int:
+    """Итог списка для номеров страниц без COUNT(*) на каждый просмотр.
+
+    Значение пересчитывается после записи в ``request``/``object``/
+    ``contractor`` (по поколениям таблиц), но не чаще раза в
+    ``PAGINATION_TOTAL_TTL`` секунд — в пределах этого окна итог примерный.
+    """
+    from utils.search_cache import TOTALS, current_generations
+
+    query = query.order_by(None)
+    key = _query_key(query)
+    generations = current_generations()
+    now = time.monotonic()
+    cached = TOTALS.get(key)
+    if cached is not None:
+        total, cached_generations, counted_at = cached
+        ttl = current_app.config.get("PAGINATION_TOTAL_TTL", 30)
+        if cached_generations == generations or now - counted_at < ttl:
+            return total
+    total = query.count()
+    TOTALS.put(key, (total, generations, now), len(key) + 64)
+    return total
@@ -0,0 +1,159 @@
+"""Пакетное создание заявок: форма создания и ``POST /api/v1/requests:batch``.
+
+Позиция пакета — объект, подрядчики, производители и комментарий; как и в
+форме, на каждого подрядчика создаётся своя заявка. Объекты и подрядчики
+всех позиций проверяются двумя запросами. Заявки, связи с подрядчиками и
+комментарии уходят в БД одним flush: SQLAlchemy группирует INSERT одной
+таблицы в многострочный ``INSERT ... RETURNING`` (insertmanyvalues), где
+диалект это умеет, и в executemany иначе. Вставка идёт через ORM, а не
+``insert()`` ядра, чтобы сработали обработчики ``after_flush`` (счётчики
+дашборда, модель чтения, производители, поиск). Коммит — один на пакет.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.orm import lazyload
+
+from database import db
+from models import Comment, Contractor, Object, Request
+from utils import blob_store, request_files
+from utils.statuses import RequestStatus
+
+# Больше заявок за один пакет не создаётся (после разворота по подрядчикам)
+MAX_BATCH_REQUESTS = 1000
+MANUFACTURERS_MAX_LENGTH = Request.__table__.c.manufacturers.type.length
+
+
+@dataclass
+class BatchItem:
+    """Позиция пакета: по заявке на каждого подрядчика."""
+
+    object_id: int
+    contractor_ids: list[int]
+    manufacturers: list[str]
+    comment: str = ""
+
+
+class BatchError(ValueError):
+    """Пакет не прошёл проверку; ``errors`` — ``[{"index", "error"}, ...]``."""
+
+    def __init__(self, errors: list[dict]):
+        super().__init__("; ".join(e["error"] for e in errors))
+        self.errors = errors
+
+
+def items_from_json(payload: dict) -> list[BatchItem]:
+    """Позиции из тела запроса (структура проверена JSON Schema)."""
+    return [
+        BatchItem(
+            object_id=item["object_id"],
+            contractor_ids=list(dict.fromkeys(item["contractor_ids"])),
+            manufacturers=[m.strip() for m in item["manufacturers"]],
+            comment=(item.get("comment") or "").strip(),
+        )
+        for item in payload["requests"]
+    ]
+
+
+def validate(items: list[BatchItem]) -> dict[int, Contractor]:
+    """Проверяет пакет двумя запросами; возвращает подрядчиков по id."""
+    errors: list[dict] = []
+    total = sum(len(item.contractor_ids) for item in items)
+    if total > MAX_BATCH_REQUESTS:
+        errors.append(
+            {
+                "index": None,
+                "error": f"Не больше {MAX_BATCH_REQUESTS} заявок за раз",
+            }
+        )
+    object_ids = {item.object_id for item in items}
+    contractor_ids = {cid for item in items for cid in item.contractor_ids}
+    known_objects = set(
+        db.session.execute(select(Object.id).where(Object.id.in_(object_ids))).scalars()
+    )
+    # Без selectin-загрузки всех заявок каждого подрядчика (backref requests)
+    contractors = {
+        c.id: c
+        for c in Contractor.query.options(lazyload(Contractor.requests))
+        .filter(Contractor.id.in_(contractor_ids))
+        .all()
+    }
+    for index, item in enumerate(items):
+        if item.object_id not in known_objects:
+            errors.append({"index": index, "error": "Объект не найден"})
+        if not item.contractor_ids:
+            errors.append(
+                {"index": index, "error": "Выберите хотя бы одного подрядчика"}
+            )
+        missing = [cid for cid in item.contractor_ids if cid not in contractors]
+        if missing:
+            errors.append(
+                {
+                    "index": index,
+                    "error": "Подрядчики не найдены: " + ", ".join(map(str, missing)),
+                }
+            )
+        names = [m for m in item.manufacturers if m]
+        if not names:
+            errors.append(
+                {"index": index, "error": "Выберите хотя бы одного производителя"}
+            )
+        elif len(",".join(names)) > MANUFACTURERS_MAX_LENGTH:
+            errors.append({"index": index, "error": "Слишком много производителей"})
+    if errors:
+        raise BatchError(errors)
+    return contractors
+
+
+def create_requests(
+    items: list[BatchItem],
+    user_id: int,
+    files: Iterable[tuple[str, str, int]] = (),
+) -> list[Request]:
+    """Создаёт заявки пакета одной транзакцией и возвращает их.
+
+    ``files`` — ``(имя, sha256, размер)`` уже сохранённых в хранилище файлов;
+    каждая созданная заявка получает на них ссылки.
+    """
+    contractors = validate(items)
+    created: list[Request] = []
+    # Без autoflush: иначе каждая заявка уходит в БД отдельным INSERT
+    with db.session.no_autoflush:
+        for item in items:
+            manufacturers = ",".join(m for m in item.manufacturers if m)
+            for cid in item.contractor_ids:
+                req = Request(
+                    object_id=item.object_id,
+                    manufacturers=manufacturers,
+                    created_by=user_id,
+                    status=RequestStatus.OPEN.value,
+                )
+                req.contractors = [contractors[cid]]
+                if item.comment:
+                    req.comments.append(Comment(user_id=user_id, content=item.comment))
+                created.append(req)
+    db.session.add_all(created)
+    db.session.flush()
+
+    files = list(files)
+    if files:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        for req in created:
+            upload_dir = os.path.join(current_app.config["UPLOAD_FOLDER"], str(req.id))
+            saved = []
+            for filename, sha, size in files:
+                unique = f"{req.id}_{stamp}_{filename}"
+                rel_path = f"uploads/{req.id}/{unique}"
+                blob_store.link(sha, size, os.path.join(upload_dir, unique), rel_path)
+                request_files.record(req.id, rel_path, sha, size)
+                saved.append(rel_path)
+            req.file_path = ",".join(saved)
+    db.session.commit()
+    return created
@@ -0,0 +1,78 @@
+"""Загрузка страницы заявки фиксированным числом запросов.
+
+Заявка вместе с объектом и обработчиком читается одним JOIN, подрядчики,
+файлы и вложения (с названиями подрядчиков) — по одному ``selectin``-запросу,
+комментарии с авторами — одним запросом ``load_comments``. Число запросов не
+зависит от количества комментариев и вложений. Обратная связь
+``Contractor.requests`` (``lazy="selectin"``) для загруженных подрядчиков
+отключена: иначе вместе с ними читались бы все их заявки. Файлы заявки без
+записей ``request_file`` (загружены до её появления) берутся по старым путям.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+
+from database import db
+from models import Attachment, Comment, Contractor, Object, Request, User
+from utils import request_files
+from utils.comment_threads import load_comments
+
+
+@dataclass
+class RequestDetail:
+    """Данные шаблона ``view_request.html``."""
+
+    req: Request
+    object_info: Object | None
+    processed_by_user: User | None
+    contractors: list[Contractor]
+    comments: list[dict]
+    files: list[dict]
+    attachments: list[Attachment]
+    attachment_contractors: dict[int, str]
+
+
+def load(request_id: int) -> RequestDetail | None:
+    """Заявка со всем, что показывает её страница; ``None`` — нет заявки."""
+    req = (
+        db.session.execute(
+            select(Request)
+            .where(Request.id == request_id)
+            .options(
+                joinedload(Request.object),
+                joinedload(Request.processor),
+                selectinload(Request.contractors).lazyload(Contractor.requests),
+                selectinload(Request.files),
+                selectinload(Request.attachments)
+                .joinedload(Attachment.contractor)
+                .lazyload(Contractor.requests),
+            )
+        )
+        .unique()
+        .scalar_one_or_none()
+    )
+    if req is None:
+        return None
+    attachments = sorted(req.attachments, key=lambda a: a.id)
+    comments, _ = load_comments(Comment, req.id)
+    return RequestDetail(
+        req=req,
+        object_info=req.object,
+        processed_by_user=req.processor,
+        contractors=list(req.contractors),
+        comments=comments,
+        files=(
+            request_files.describe(req.files)
+            if req.files
+            else request_files.describe_legacy(req)
+        ),
+        attachments=attachments,
+        attachment_contractors={
+            a.id: a.contractor.name if a.contractor else "Неизвестный"
+            for a in attachments
+        },
+    )
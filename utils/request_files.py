@@ -0,0 +1,138 @@
+"""Метаданные файлов заявок в таблице ``request_file``.
+
+Запись добавляется при загрузке вместе с жёсткой ссылкой на блоб, поэтому
+страница заявки показывает файлы по одному запросу к БД, без ``listdir`` и
+``stat`` каталога загрузок (на NFS это заметная задержка). Удаление заявки
+и ``cleanup:uploads`` берут набор файлов отсюда же, а не из строки
+``Request.file_path``. Файлы, загруженные до появления таблицы, вносит
+``flask files:backfill``; пока у заявки нет ни одной записи, её страница
+собирает список по ``Request.file_path`` и скриншотам вложений.
+"""
+
+from __future__ import annotations
+
+import logging
+import mimetypes
+import os
+from datetime import datetime
+
+from sqlalchemy import select
+
+from database import db
+from models import Attachment, BlobRef, Request, RequestFile
+from utils import blob_store
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH = 500
+
+
+def record(request_id: int, key: str, sha: str, size: int) -> RequestFile:
+    """Добавляет в сессию запись о загруженном файле (коммит — у вызывающего)."""
+    item = RequestFile(
+        request_id=request_id,
+        path=key,
+        size=size,
+        sha256=sha,
+        mime=mimetypes.guess_type(key)[0],
+    )
+    db.session.add(item)
+    return item
+
+
+def format_size(size: int) -> str:
+    return f"{size // 1024} KB" if size > 1024 else f"{size} B"
+
+
+def describe(rows) -> list[dict]:
+    """Записи ``request_file`` в виде, который ждёт ``view_request.html``."""
+    return [
+        {
+            "rel_path": item.path,
+            "filename": item.filename,
+            "size": format_size(item.size),
+            "mime": item.mime,
+        }
+        for item in rows
+    ]
+
+
+def describe_legacy(req: Request) -> list[dict]:
+    """Файлы заявки без записей ``request_file``: по старым путям и ``stat``.
+
+    Вложения заявки должны быть загружены; отсутствующие файлы пропускаются.
+    """
+    keys = blob_store.file_path_keys(req.file_path)
+    keys += [att.screenshot for att in req.attachments if att.screenshot]
+    files = []
+    for key in dict.fromkeys(keys):
+        try:
+            size = os.path.getsize(blob_store.ref_path(key))
+        except OSError:
+            continue
+        files.append(
+            {
+                "rel_path": key,
+                "filename": key.rsplit("/", 1)[-1],
+                "size": format_size(size),
+                "mime": mimetypes.guess_type(key)[0],
+            }
+        )
+    return files
+
+
+def remove_files(keys) -> None:
+    """Удаляет файлы по ключам; отсутствующие на диске пропускаются."""
+    for key in keys:
+        path = blob_store.ref_path(key)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        except OSError as exc:
+            logger.warning("Не удалось удалить файл %s: %s", path, exc)
+
+
+def _legacy_keys():
+    """``(id заявки, ключ)`` из ``Request.file_path`` и скриншотов вложений."""
+    for request_id, file_path in db.session.execute(
+        select(Request.id, Request.file_path).where(Request.file_path.isnot(None))
+    ):
+        for key in blob_store.file_path_keys(file_path):
+            yield request_id, key
+    yield from db.session.execute(
+        select(Attachment.request_id, Attachment.screenshot).where(
+            Attachment.screenshot.isnot(None)
+        )
+    )
+
+
+def backfill() -> dict[str, int]:
+    """Вносит в ``request_file`` файлы, загруженные до её появления.
+
+    Источник — ``Request.file_path`` и ``Attachment.screenshot``; sha256 берётся
+    из ``blob_ref``, а если файла там нет — считается по содержимому.
+    Идемпотентна: уже внесённые пути пропускаются.
+    """
+    known = set(db.session.execute(select(RequestFile.path)).scalars())
+    shas = dict(db.session.execute(select(BlobRef.path, BlobRef.sha256)).all())
+    stats = {"files": 0, "missing": 0}
+    for request_id, key in list(_legacy_keys()):
+        if key in known:
+            continue
+        path = blob_store.ref_path(key)
+        try:
+            stat = os.stat(path)
+            sha = shas.get(key) or blob_store.hash_file(path)[0]
+        except FileNotFoundError:
+            stats["missing"] += 1
+            continue
+        item = record(request_id, key, sha, stat.st_size)
+        item.uploaded_at = datetime.utcfromtimestamp(stat.st_mtime)
+        known.add(key)
+        stats["files"] += 1
+        if stats["files"] % BACKFILL_BATCH == 0:
+            db.session.commit()
+    db.session.commit()
+    logger.info("Файлы заявок внесены в request_file: %s", stats)
+    return stats
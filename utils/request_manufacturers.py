@@ -0,0 +1,171 @@
+"""Производители заявки в таблице ``request_manufacturer``.
+
+Строка ``Request.manufacturers`` остаётся источником истины для шаблонов
+(``manufacturers_list``), а её построчное зеркало с индексом по имени
+производителя позволяет фильтровать и группировать заявки в SQL вместо
+``LIKE '%...%'`` и разбора строк в Python. Зеркало обновляется в
+``after_flush`` той же транзакции; заполнение по существующим заявкам —
+``flask manufacturers:backfill`` (выполняется и при старте, если таблица пуста).
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Iterable
+
+from sqlalchemy import event, exists, func, inspect, select
+from sqlalchemy.orm import Session
+
+from database import db
+from models import Request, request_manufacturer
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH = 1000
+
+_listeners_registered = False
+
+
+def split_manufacturers(value: str | None) -> list[str]:
+    """Производители из строки заявки без пустых значений и повторов."""
+    names: list[str] = []
+    for raw in (value or "").split(","):
+        name = raw.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def _rows(request_id: int, value: str | None) -> list[dict]:
+    return [
+        {"request_id": request_id, "manufacturer": name, "position": position}
+        for position, name in enumerate(split_manufacturers(value))
+    ]
+
+
+def sync_requests(connection, requests: Iterable[tuple[int, str | None]]) -> None:
+    """Перезаписывает строки производителей для пар ``(id заявки, строка)``."""
+    pairs = dict(requests)
+    if not pairs:
+        return
+    table = request_manufacturer
+    connection.execute(table.delete().where(table.c.request_id.in_(sorted(pairs))))
+    rows = [row for rid, value in pairs.items() for row in _rows(rid, value)]
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+def _after_flush(session, flush_context) -> None:
+    changed: dict[int, str | None] = {}
+    for obj in session.new:
+        if isinstance(obj, Request):
+            changed[obj.id] = obj.manufacturers
+    for obj in session.dirty:
+        if isinstance(obj, Request) and obj not in session.deleted:
+            if inspect(obj).attrs.manufacturers.history.has_changes():
+                changed[obj.id] = obj.manufacturers
+    removed = [
+        obj.id
+        for obj in session.deleted
+        if isinstance(obj, Request) and obj.id is not None
+    ]
+    if not changed and not removed:
+        return
+    connection = session.connection()
+    sync_requests(connection, changed.items())
+    if removed:
+        connection.execute(
+            request_manufacturer.delete().where(
+                request_manufacturer.c.request_id.in_(removed)
+            )
+        )
+
+
+def register_listeners() -> None:
+    """Подписывает зеркало производителей на flush сессий (идемпотентно)."""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    event.listen(Session, "after_flush", _after_flush)
+    _listeners_registered = True
+
+
+def backfill() -> int:
+    """Заполняет ``request_manufacturer`` по всем заявкам. Возвращает их число."""
+    db.session.execute(request_manufacturer.delete())
+    connection = db.session.connection()
+    documents = 0
+    last_id = 0
+    while True:
+        batch = db.session.execute(
+            select(Request.id, Request.manufacturers)
+            .where(Request.id > last_id)
+            .order_by(Request.id)
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not batch:
+            break
+        sync_requests(connection, [(row.id, row.manufacturers) for row in batch])
+        documents += len(batch)
+        last_id = batch[-1].id
+    db.session.commit()
+    logger.info("Производители заявок перенесены в таблицу: %s заявок", documents)
+    return documents
+
+
+def ensure_built() -> None:
+    """Заполняет таблицу, если заявки есть, а строк производителей ещё нет."""
+    if db.session.query(request_manufacturer.c.request_id).first() is not None:
+        return
+    if db.session.query(Request.id).first() is None:
+        return
+    backfill()
+
+
+def init_request_manufacturers(app) -> None:
+    """Подключает зеркало производителей к приложению."""
+    register_listeners()
+    try:
+        ensure_built()
+    except Exception as exc:  # noqa: BLE001
+        db.session.rollback()
+        app.logger.warning(f"Производители заявок не перенесены при старте: {exc}")
+
+
+def has_manufacturer(names: Iterable[str]):
+    """SQL-условие: у заявки есть хотя бы один из производителей ``names``."""
+    return exists().where(
+        request_manufacturer.c.request_id == Request.id,
+        request_manufacturer.c.manufacturer.in_(list(names)),
+    )
+
+
+def group_counts(
+    object_ids: Iterable[int],
+    statuses: Iterable[str] = (),
+    names: Iterable[str] | None = None,
+) -> dict[int, dict[str, int]]:
+    """Число заявок по производителям для каждого объекта одним запросом.
+
+    ``statuses`` и ``names`` сужают выборку по статусу заявки и по именам
+    производителей; объекты без заявок в результат не попадают.
+    """
+    object_ids = list(object_ids)
+    if not object_ids:
+        return {}
+    table = request_manufacturer
+    query = (
+        select(Request.object_id, table.c.manufacturer, func.count(table.c.request_id))
+        .join(Request, Request.id == table.c.request_id)
+        .where(Request.object_id.in_(object_ids))
+        .group_by(Request.object_id, table.c.manufacturer)
+    )
+    statuses = list(statuses)
+    if statuses:
+        query = query.where(Request.status.in_(statuses))
+    if names is not None:
+        query = query.where(table.c.manufacturer.in_(list(names)))
+    counts: dict[int, dict[str, int]] = {}
+    for object_id, name, count in db.session.execute(query):
+        counts.setdefault(object_id, {})[name] = count
+    return counts
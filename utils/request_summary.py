@@ -0,0 +1,270 @@
+"""Модель чтения ``request_summary`` для строк дашборда.
+
+Одна строка — пара (заявка, подрядчик) с уже подставленными именами
+объекта, подрядчика и автора, списком производителей и маской обработанных.
+Строки пересчитываются в ``after_flush`` той же транзакции: изменения
+заявки (включая состав подрядчиков) и её вложений пересобирают строки этой
+заявки, переименование объекта, подрядчика или пользователя — одно
+``UPDATE`` по индексу. Полная пересборка: ``flask dashboard:rebuild-summary``.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Iterable
+
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session
+
+from database import db
+from models import (
+    Attachment,
+    Contractor,
+    Object,
+    Request,
+    RequestSummary,
+    User,
+    request_contractor,
+)
+
+logger = logging.getLogger(__name__)
+
+REBUILD_BATCH = 1000
+# Больше производителей в маску BigInteger не помещается
+MAX_MASK_BITS = 63
+
+# Переименования, копируемые в готовые строки:
+# модель -> (поле модели, колонка имени, колонка id в request_summary)
+RENAMES = {
+    Object: ("name", "object_name", "object_id"),
+    Contractor: ("name", "contractor_name", "contractor_id"),
+    User: ("username", "creator_name", "created_by"),
+}
+
+_listeners_registered = False
+
+
+def processed_mask(manufacturers: list[str], processed: set[str]) -> int:
+    """Битовая маска обработанных производителей в порядке списка заявки."""
+    mask = 0
+    for i, name in enumerate(manufacturers[:MAX_MASK_BITS]):
+        if name in processed:
+            mask |= 1 << i
+    return mask
+
+
+def _summary_rows(connection, request_ids: list[int]) -> list[dict[str, Any]]:
+    """Строки модели чтения для заявок (несколько запросов на весь пакет)."""
+    requests = connection.execute(
+        select(
+            Request.id,
+            Request.object_id,
+            Request.created_by,
+            Request.manufacturers,
+            Request.status,
+            Request.created_at,
+        ).where(Request.id.in_(request_ids))
+    ).all()
+    if not requests:
+        return []
+    links: dict[int, list[int]] = {}
+    for request_id, contractor_id in connection.execute(
+        select(request_contractor.c.request_id, request_contractor.c.contractor_id)
+        .where(request_contractor.c.request_id.in_(request_ids))
+        .order_by(request_contractor.c.request_id, request_contractor.c.contractor_id)
+    ):
+        links.setdefault(request_id, []).append(contractor_id)
+    processed: dict[tuple[int, int], set[str]] = {}
+    for request_id, contractor_id, manufacturer in connection.execute(
+        select(
+            Attachment.request_id, Attachment.contractor_id, Attachment.manufacturer
+        ).where(Attachment.request_id.in_(request_ids))
+    ):
+        processed.setdefault((request_id, contractor_id), set()).add(manufacturer)
+
+    def names(column_id, column_name, ids):
+        if not ids:
+            return {}
+        return dict(
+            connection.execute(
+                select(column_id, column_name).where(column_id.in_(ids))
+            ).all()
+        )
+
+    contractor_ids = {cid for ids in links.values() for cid in ids}
+    objects = names(Object.id, Object.name, {r.object_id for r in requests})
+    contractors = names(Contractor.id, Contractor.name, contractor_ids)
+    users = names(User.id, User.username, {r.created_by for r in requests})
+
+    rows = []
+    for req in requests:
+        manufacturers = (req.manufacturers or "").split(",")
+        wanted = set(manufacturers)
+        contractor_list = links.get(req.id, [])
+        all_processed = all(
+            wanted <= processed.get((req.id, cid), set()) for cid in contractor_list
+        )
+        for cid in contractor_list:
+            rows.append(
+                {
+                    "request_id": req.id,
+                    "contractor_id": cid,
+                    "object_id": req.object_id,
+                    "created_by": req.created_by,
+                    "object_name": objects.get(req.object_id) or "Без объекта",
+                    "contractor_name": contractors.get(cid) or "Неизвестно",
+                    "creator_name": users.get(req.created_by) or "Неизвестно",
+                    "manufacturers": req.manufacturers or "",
+                    "processed_mask": processed_mask(
+                        manufacturers, processed.get((req.id, cid), set())
+                    ),
+                    "all_processed": all_processed,
+                    "status": req.status,
+                    "created_at": req.created_at,
+                }
+            )
+    return rows
+
+
+def refresh_requests(connection, request_ids: Iterable[int]) -> None:
+    """Пересобирает строки модели чтения для указанных заявок."""
+    ids = sorted(set(request_ids))
+    if not ids:
+        return
+    table = RequestSummary.__table__
+    connection.execute(table.delete().where(table.c.request_id.in_(ids)))
+    rows = _summary_rows(connection, ids)
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+def _committed(obj: Any, attr: str) -> Any:
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+
+def _after_flush(session, flush_context) -> None:
+    dirty: set[int] = set()
+    renames = []
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Request):
+            dirty.add(obj.id)
+        elif isinstance(obj, Attachment):
+            dirty.add(obj.request_id)
+            if obj not in session.new:
+                dirty.add(_committed(obj, "request_id"))
+        elif type(obj) in RENAMES and obj in session.dirty:
+            field, column, key = RENAMES[type(obj)]
+            if inspect(obj).attrs[field].history.has_changes():
+                renames.append((column, key, obj.id, getattr(obj, field)))
+    dirty.discard(None)
+    if not dirty and not renames:
+        return
+    connection = session.connection()
+    refresh_requests(connection, dirty)
+    table = RequestSummary.__table__
+    for column, key, entity_id, value in renames:
+        connection.execute(
+            update(table)
+            .where(table.c[key] == entity_id)
+            .values({column: value or "Неизвестно"})
+        )
+
+
+def register_listeners() -> None:
+    """Подписывает модель чтения на flush сессий (идемпотентно)."""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    event.listen(Session, "after_flush", _after_flush)
+    _listeners_registered = True
+
+
+def rebuild() -> int:
+    """Полностью пересобирает ``request_summary``. Возвращает число заявок."""
+    db.session.execute(RequestSummary.__table__.delete())
+    connection = db.session.connection()
+    documents = 0
+    last_id = 0
+    while True:
+        ids = (
+            db.session.execute(
+                select(Request.id)
+                .where(Request.id > last_id)
+                .order_by(Request.id)
+                .limit(REBUILD_BATCH)
+            )
+            .scalars()
+            .all()
+        )
+        if not ids:
+            break
+        refresh_requests(connection, ids)
+        documents += len(ids)
+        last_id = ids[-1]
+    db.session.commit()
+    logger.info("Модель чтения дашборда пересобрана: %s заявок", documents)
+    return documents
+
+
+def ensure_built() -> None:
+    """Собирает модель чтения, если заявки есть, а строк ещё нет."""
+    if db.session.query(RequestSummary.id).first() is not None:
+        return
+    if db.session.query(request_contractor.c.request_id).first() is None:
+        return
+    rebuild()
+
+
+def init_request_summary(app) -> None:
+    """Подключает модель чтения к приложению: события и ленивая сборка."""
+    register_listeners()
+    if not app.config.get("REQUEST_SUMMARY_BUILD_ON_START", True):
+        return
+    try:
+        ensure_built()
+    except Exception as exc:  # noqa: BLE001
+        db.session.rollback()
+        app.logger.warning(f"Модель чтения дашборда не собрана при старте: {exc}")
+
+
+def dashboard_rows(requests: list[Request]) -> list[dict[str, Any]]:
+    """Строки таблицы/карточек дашборда для страницы заявок одним запросом."""
+    if not requests:
+        return []
+    by_id = {req.id: req for req in requests}
+    summaries = (
+        RequestSummary.query.filter(RequestSummary.request_id.in_(by_id))
+        .order_by(RequestSummary.request_id, RequestSummary.contractor_id)
+        .all()
+    )
+    grouped: dict[int, list[RequestSummary]] = {}
+    for summary in summaries:
+        grouped.setdefault(summary.request_id, []).append(summary)
+
+    table_rows = []
+    for req in requests:
+        for summary in grouped.get(req.id, []):
+            manufacturers = summary.manufacturers.split(",")
+            table_rows.append(
+                {
+                    "request": req,
+                    "contractor_id": summary.contractor_id,
+                    "contractor_name": summary.contractor_name,
+                    "object_name": summary.object_name,
+                    "creator_name": summary.creator_name,
+                    "manufacturer_badges": [
+                        {
+                            "name": name,
+                            "is_processed": bool(summary.processed_mask >> i & 1),
+                        }
+                        for i, name in enumerate(manufacturers)
+                    ],
+                    "all_processed": summary.all_processed,
+                    "created_at": req.created_at,
+                    "status": req.status,
+                }
+            )
+    return table_rows
@@ -0,0 +1,534 @@
+"""Поисковые бэкенды: полнотекстовые индексы СУБД для отбора кандидатов.
+
+Бэкенд выбирается по диалекту движка БД (``db.engine.dialect.name``) или
+явно через ``SEARCH_BACKEND``:
+
+* SQLite — виртуальные таблицы FTS5 с токенизатором ``trigram`` и триггерами;
+* PostgreSQL — GIN-индексы по выражению ``to_tsvector``;
+* MySQL — индексы ``FULLTEXT ... WITH PARSER ngram``;
+* ``ngram`` — общий триграммный индекс из ``utils.search_index``.
+
+База отдаёт не более ``RERANK_LIMIT`` кандидатов в порядке своей
+релевантности, а нечёткий скорер Python только переранжирует их.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from abc import ABC, abstractmethod
+from typing import Any
+
+from flask import current_app
+from sqlalchemy import (
+    case,
+    event,
+    false,
+    func,
+    inspect,
+    literal_column,
+    or_,
+    select,
+    text,
+    union_all,
+)
+from sqlalchemy.dialects.mysql import match as mysql_match
+
+from database import db
+from models import Object, Request, request_contractor
+from utils import search_index, search_keys
+from utils.pagination import ManualPagination
+from utils.search_index import INDEXED_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Сколько кандидатов из БД переранжирует нечёткий скорер
+RERANK_LIMIT = 200
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _words(query: str) -> list[str]:
+    return _WORD_RE.findall((query or "").lower())
+
+
+def _table_name(entity: str) -> str:
+    return INDEXED_FIELDS[entity][0].__tablename__
+
+
+class SearchBackend(ABC):
+    """Базовый бэкенд: создаёт индексы и строит SELECT id кандидатов.
+
+    ``install``/``uninstall`` по умолчанию ничего не делают; подклассу
+    достаточно реализовать ``candidate_select``.
+    """
+
+    name = "base"
+
+    def install(self, connection) -> None:
+        """Создаёт недостающие индексы (идемпотентно)."""
+
+    def uninstall(self, connection) -> None:
+        """Удаляет объекты, которые не удаляются вместе с таблицами."""
+
+    @abstractmethod
+    def candidate_select(self, entity: str, query: str, limit: int | None):
+        """SELECT id кандидатов по убыванию релевантности или ``None``.
+
+        ``None`` означает, что бэкенд не может обработать запрос (например,
+        слишком короткие слова) и нужно воспользоваться триграммным индексом.
+        """
+
+
+class NgramBackend(SearchBackend):
+    """Общий триграммный индекс ``search_ngram``, поддерживаемый приложением."""
+
+    name = "ngram"
+
+    def candidate_select(self, entity: str, query: str, limit: int | None):
+        return search_index.candidate_select(entity, query, limit)
+
+
+class SqliteFtsBackend(SearchBackend):
+    """FTS5 с токенизатором ``trigram``; синхронизация триггерами SQLite."""
+
+    name = "sqlite_fts5"
+
+    @staticmethod
+    def fts_table(entity: str) -> str:
+        return f"search_fts_{entity}"
+
+    @staticmethod
+    def _body(entity: str, prefix: str) -> str:
+        fields = INDEXED_FIELDS[entity][1]
+        return " || ' ' || ".join(f"coalesce({prefix}{f}, '')" for f in fields)
+
+    def install(self, connection) -> None:
+        for entity in INDEXED_FIELDS:
+            fts = self.fts_table(entity)
+            source = _table_name(entity)
+            if inspect(connection).has_table(fts):
+                continue
+            connection.execute(
+                text(f"CREATE VIRTUAL TABLE {fts} USING fts5(body, tokenize='trigram')")
+            )
+            new_body = self._body(entity, "new.")
+            connection.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} "
+                    f"BEGIN INSERT INTO {fts}(rowid, body) "
+                    f"VALUES (new.id, {new_body}); END"
+                )
+            )
+            connection.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {source} "
+                    f"BEGIN DELETE FROM {fts} WHERE rowid = old.id; "
+                    f"INSERT INTO {fts}(rowid, body) "
+                    f"VALUES (new.id, {new_body}); END"
+                )
+            )
+            connection.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} "
+                    f"BEGIN DELETE FROM {fts} WHERE rowid = old.id; END"
+                )
+            )
+            connection.execute(
+                text(
+                    f"INSERT INTO {fts}(rowid, body) "
+                    f"SELECT id, {self._body(entity, '')} FROM {source}"
+                )
+            )
+
+    def uninstall(self, connection) -> None:
+        for entity in INDEXED_FIELDS:
+            connection.execute(text(f"DROP TABLE IF EXISTS {self.fts_table(entity)}"))
+
+    def candidate_select(self, entity: str, query: str, limit: int | None):
+        grams: list[str] = []
+        for word in _words(query):
+            for i in range(len(word) - 2):
+                gram = word[i : i + 3]
+                if gram not in grams:
+                    grams.append(gram)
+        if not grams:
+            return None
+        fts = self.fts_table(entity)
+        stmt = (
+            select(literal_column("rowid").label("entity_id"))
+            .select_from(text(fts))
+            .where(text(f"{fts} MATCH :fts_query"))
+            .order_by(text(f"bm25({fts})"))
+            .params(fts_query=" OR ".join(f'"{g}"' for g in grams))
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return stmt
+
+
+class PostgresTsvectorBackend(SearchBackend):
+    """GIN-индексы по ``to_tsvector('simple', ...)`` поверх полей сущности."""
+
+    name = "postgres_tsvector"
+
+    @staticmethod
+    def _vector(entity: str) -> str:
+        fields = INDEXED_FIELDS[entity][1]
+        body = " || ' ' || ".join(f"coalesce({f}, '')" for f in fields)
+        return f"to_tsvector('simple', {body})"
+
+    def install(self, connection) -> None:
+        for entity in INDEXED_FIELDS:
+            table = _table_name(entity)
+            connection.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table}_search_tsv ON {table} "
+                    f"USING GIN (({self._vector(entity)}))"
+                )
+            )
+
+    def candidate_select(self, entity: str, query: str, limit: int | None):
+        words = _words(query)
+        if not words:
+            return None
+        model = INDEXED_FIELDS[entity][0]
+        vector = self._vector(entity)
+        tsquery = " | ".join(f"{w}:*" for w in words)
+        stmt = (
+            select(model.id.label("entity_id"))
+            .where(
+                text(f"{vector} @@ to_tsquery('simple', :tsq)").bindparams(tsq=tsquery)
+            )
+            .order_by(
+                text(f"ts_rank({vector}, to_tsquery('simple', :tsq)) DESC").bindparams(
+                    tsq=tsquery
+                )
+            )
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return stmt
+
+
+class MysqlFulltextBackend(SearchBackend):
+    """Индексы ``FULLTEXT`` с парсером ``ngram`` (подходит для кириллицы)."""
+
+    name = "mysql_fulltext"
+
+    def install(self, connection) -> None:
+        for entity, (_model, fields) in INDEXED_FIELDS.items():
+            table = _table_name(entity)
+            index_name = f"ft_{table}_search"
+            existing = {ix["name"] for ix in inspect(connection).get_indexes(table)}
+            if index_name in existing:
+                continue
+            connection.execute(
+                text(
+                    f"CREATE FULLTEXT INDEX {index_name} ON `{table}` "
+                    f"({', '.join(fields)}) WITH PARSER ngram"
+                )
+            )
+
+    def candidate_select(self, entity: str, query: str, limit: int | None):
+        words = _words(query)
+        if not words:
+            return None
+        model, fields = INDEXED_FIELDS[entity]
+        relevance = mysql_match(
+            *[getattr(model, f) for f in fields], against=" ".join(words)
+        ).in_natural_language_mode()
+        stmt = (
+            select(model.id.label("entity_id"))
+            .where(relevance > 0)
+            .order_by(relevance.desc())
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return stmt
+
+
+def forget_native_tables(metadata) -> None:
+    """Убирает из метаданных отражённые таблицы FTS5 (ими управляет бэкенд)."""
+    for table in list(metadata.tables.values()):
+        if table.name.startswith("search_fts_"):
+            metadata.remove(table)
+
+
+BACKENDS: dict[str, type[SearchBackend]] = {
+    "sqlite": SqliteFtsBackend,
+    "postgresql": PostgresTsvectorBackend,
+    "mysql": MysqlFulltextBackend,
+}
+_NGRAM = NgramBackend()
+
+
+def _configured_backend(dialect: str) -> SearchBackend:
+    configured = "auto"
+    try:
+        configured = current_app.config.get("SEARCH_BACKEND", "auto") or "auto"
+    except RuntimeError:
+        pass
+    if configured == "ngram" or dialect not in BACKENDS:
+        return _NGRAM
+    return BACKENDS[dialect]()
+
+
+@event.listens_for(db.metadata, "after_create")
+def _install_native_indexes(target, connection, **kw) -> None:
+    backend = _configured_backend(connection.dialect.name)
+    try:
+        backend.install(connection)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning(f"Полнотекстовый индекс {backend.name} не создан: {exc}")
+
+
+@event.listens_for(db.metadata, "before_drop")
+def _uninstall_native_indexes(target, connection, **kw) -> None:
+    _configured_backend(connection.dialect.name).uninstall(connection)
+
+
+def init_search_backend(app) -> None:
+    """Выбирает бэкенд поиска и подготавливает его индексы."""
+    from utils.search_cache import init_search_cache
+
+    search_index.init_search_index(app)
+    search_keys.init_search_keys(app)
+    init_search_cache(app)
+    backend = _configured_backend(db.engine.dialect.name)
+    if backend is not _NGRAM:
+        try:
+            with db.engine.begin() as connection:
+                backend.install(connection)
+        except Exception as exc:  # noqa: BLE001
+            app.logger.warning(
+                f"Бэкенд поиска {backend.name} недоступен ({exc}), используем ngram"
+            )
+            backend = _NGRAM
+    app.extensions["search_backend"] = backend
+    app.logger.info(f"Бэкенд поиска: {backend.name}")
+
+
+def get_backend() -> SearchBackend:
+    return current_app.extensions.get("search_backend", _NGRAM)
+
+
+def candidate_select(entity: str, query: str, limit: int | None = RERANK_LIMIT):
+    """SELECT id кандидатов активного бэкенда с откатом на триграммный индекс."""
+    stmt = get_backend().candidate_select(entity, query, limit)
+    if stmt is None:
+        stmt = _NGRAM.candidate_select(entity, query, limit)
+    return stmt
+
+
+def candidate_ids(entity: str, query: str, limit: int | None = RERANK_LIMIT):
+    """Список id кандидатов в порядке релевантности бэкенда."""
+    stmt = candidate_select(entity, query, limit)
+    if stmt is None:
+        return []
+    return list(db.session.execute(stmt).scalars())
+
+
+def _in_candidates(column, entity: str, query: str, limit: int | None):
+    stmt = candidate_select(entity, query, limit)
+    if stmt is None:
+        return None
+    # Обёртка в производную таблицу: MySQL не допускает LIMIT внутри IN (...)
+    derived = stmt.subquery()
+    return column.in_(select(derived.c.entity_id))
+
+
+def request_candidate_clause(query: str):
+    """SQL-условие для заявок, совпавших по объекту, подрядчику или производителю."""
+    contractor_requests = _in_candidates(
+        request_contractor.c.contractor_id,
+        "contractor",
+        query,
+        search_index.CANDIDATE_LIMIT,
+    )
+    conditions = [
+        _in_candidates(
+            Request.object_id, "object", query, search_index.CANDIDATE_LIMIT
+        ),
+        _in_candidates(Request.id, "request", query, None),
+    ]
+    if contractor_requests is not None:
+        conditions.append(
+            Request.id.in_(
+                select(request_contractor.c.request_id).where(contractor_requests)
+            )
+        )
+    conditions = [c for c in conditions if c is not None]
+    return or_(*conditions) if conditions else false()
+
+
+def request_relevance(query: str):
+    """Подзапрос ``(request_id, rank)``: место лучшего совпадения заявки.
+
+    Заявка находится по собственному тексту, по объекту или по подрядчику;
+    ``rank`` — позиция совпавшей сущности в выдаче бэкенда (0 — самая
+    релевантная), из нескольких совпадений берётся лучшая. ``None``, если
+    запрос не дал кандидатов.
+    """
+    limit = search_index.CANDIDATE_LIMIT
+    sources = (
+        ("request", Request.id, Request.id),
+        ("object", Request.id, Request.object_id),
+        (
+            "contractor",
+            request_contractor.c.request_id,
+            request_contractor.c.contractor_id,
+        ),
+    )
+    parts = []
+    for entity, request_id, key in sources:
+        ids = candidate_ids(entity, query, limit)
+        if ids:
+            positions = {item_id: pos for pos, item_id in enumerate(ids)}
+            parts.append(
+                select(
+                    request_id.label("request_id"),
+                    case(positions, value=key).label("rank"),
+                ).where(key.in_(ids))
+            )
+    if not parts:
+        return None
+    ranks = union_all(*parts).subquery()
+    return (
+        select(ranks.c.request_id, func.min(ranks.c.rank).label("rank"))
+        .group_by(ranks.c.request_id)
+        .subquery()
+    )
+
+
+def search_entity_ids(entity: str, query: str, threshold: float = 0.4) -> list[int]:
+    """Кандидаты из БД, переранжированные нечётким скорером, по убыванию оценки."""
+    from routes.search_routes import search_with_multiple_fields
+
+    ids = candidate_ids(entity, query)
+    # Совпадения по префиксу и звучанию (в т.ч. латиницей) берутся из индекса
+    # ключей и гарантированно попадают в выдачу после переранжированных
+    key_ids = search_keys.key_match_ids(entity, query, RERANK_LIMIT)
+    found: list[int] = []
+    if ids:
+        model, fields = INDEXED_FIELDS[entity]
+        rows = db.session.execute(
+            select(model.id, *[getattr(model, f) for f in fields]).where(
+                model.id.in_(ids)
+            )
+        ).all()
+        results = search_with_multiple_fields(query, rows, fields, threshold)
+        found = [row.id for row, _score, _field in results]
+    seen = set(found)
+    return found + [i for i in key_ids if i not in seen]
+
+
+class _RequestDocument:
+    """Поля заявки, по которым работает нечёткий скорер дашборда."""
+
+    __slots__ = (
+        "id",
+        "original_request",
+        "object_name",
+        "object_address",
+        "object_customer",
+        "manufacturers",
+        "contractor_names",
+        "combined_search_text",
+    )
+
+    SEARCH_FIELDS = (
+        "object_name",
+        "object_address",
+        "object_customer",
+        "manufacturers",
+        "contractor_names",
+        "combined_search_text",
+    )
+
+    def __init__(self, req: Request, obj: Any) -> None:
+        names = " ".join(c.name for c in req.contractors if c.name)
+        self.id = req.id
+        self.original_request = req
+        self.object_name = obj.name if obj else ""
+        self.object_address = obj.address if obj else ""
+        self.object_customer = obj.customer if obj else ""
+        self.manufacturers = req.manufacturers or ""
+        self.contractor_names = names
+        self.combined_search_text = " ".join(
+            filter(
+                None,
+                [
+                    self.object_name,
+                    self.object_address,
+                    self.object_customer,
+                    self.manufacturers,
+                    names,
+                ],
+            )
+        )
+
+
+def rank_requests(query: str, requests: list[Request], threshold: float) -> list:
+    """Упорядочивает заявки по нечёткой оценке, отбрасывая ниже порога."""
+    from routes.search_routes import search_with_multiple_fields
+
+    if not requests:
+        return []
+    object_ids = {req.object_id for req in requests}
+    objects = {
+        obj.id: obj for obj in Object.query.filter(Object.id.in_(object_ids)).all()
+    }
+    documents = [_RequestDocument(req, objects.get(req.object_id)) for req in requests]
+    results = search_with_multiple_fields(
+        query, documents, _RequestDocument.SEARCH_FIELDS, threshold
+    )
+    return [doc.original_request for doc, _score, _field in results]
+
+
+def search_requests_page(
+    base_query,
+    query: str,
+    page: int,
+    per_page: int,
+    threshold: float = 0.3,
+    cache_key: tuple | None = None,
+) -> ManualPagination:
+    """Страница поиска заявок.
+
+    Из БД берутся ``RERANK_LIMIT`` самых релевантных совпадений (порядок
+    полнотекстового/триграммного индекса, при равенстве — свежие раньше),
+    нечёткий скорер отсекает их по порогу и упорядочивает. Все страницы
+    и итог считаются по этому одному списку, поэтому порог и порядок
+    одинаковы на любой странице. С ``cache_key`` список id берётся из
+    ``utils.search_cache``, и следующие страницы не пересчитывают оценки.
+    """
+    from utils import search_cache
+
+    start = (max(page, 1) - 1) * per_page
+    cached = search_cache.get_ranked(cache_key) if cache_key else None
+    if cached is None:
+        relevance = request_relevance(query)
+        window = []
+        if relevance is not None:
+            window = (
+                base_query.join(relevance, relevance.c.request_id == Request.id)
+                .order_by(
+                    relevance.c.rank, Request.created_at.desc(), Request.id.desc()
+                )
+                .limit(RERANK_LIMIT)
+                .all()
+            )
+        ranked = rank_requests(query, window, threshold)
+        ranked_ids = [req.id for req in ranked]
+        if cache_key:
+            search_cache.put_ranked(cache_key, ranked_ids)
+        items = ranked[start : start + per_page]
+    else:
+        ranked_ids = cached
+        page_ids = list(ranked_ids[start : start + per_page])
+        by_id = {
+            req.id: req for req in Request.query.filter(Request.id.in_(page_ids)).all()
+        }
+        items = [by_id[i] for i in page_ids if i in by_id]
+    return ManualPagination(items, page, per_page, len(ranked_ids))
@@ -0,0 +1,246 @@
+"""Кеш ранжированных результатов поиска с инвалидацией по поколениям таблиц.
+
+Ключ кеша — нормализованный запрос, фильтры, область видимости пользователя
+и текущие поколения таблиц ``request``/``object``/``contractor``. Поколения
+хранятся в ``table_generation`` и увеличиваются после коммита, который
+изменил эти таблицы, поэтому запись в любом воркере делает старые ключи
+недостижимыми. Счётчики обновляются отдельной короткой транзакцией: строка
+поколения не блокируется на всё время транзакции писателя, и параллельные
+записи не выстраиваются за ней в очередь. Память ограничена LRU по байтам.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from flask import current_app
+from sqlalchemy import event, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from database import db
+from models import Contractor, Object, Request, TableGeneration
+
+# Модели, запись в которые меняет результаты поиска
+GENERATION_MODELS = (Request, Object, Contractor)
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+# Накладные расходы записи кеша сверх массива id (ключ, кортеж, узел LRU)
+_ENTRY_OVERHEAD = 256
+
+logger = logging.getLogger(__name__)
+
+_PENDING_TABLES = "search_cache_pending_tables"
+_SPACES_RE = re.compile(r"\s+")
+_listeners_registered = False
+# Подписчики на новые поколения после локальных коммитов
+_bump_callbacks: list = []
+
+
+class LRUBytesCache:
+    """LRU-кеш с ограничением суммарного размера значений в байтах."""
+
+    def __init__(self, name: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.name = name
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self.entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _key, (_value, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+RESULTS = LRUBytesCache("search_results")
+# Итоги списков для номеров страниц (см. ``utils.pagination.cached_count``)
+TOTALS = LRUBytesCache("pagination_totals", max_bytes=512 * 1024)
+
+
+def all_cache_stats() -> list[dict[str, Any]]:
+    """Статистика кешей процесса для админки."""
+    from utils.cache import cache_stats
+
+    return [RESULTS.stats(), TOTALS.stats(), *cache_stats()]
+
+
+def _after_flush(session, flush_context) -> None:
+    # Объекты из ``dirty`` без реальных изменений колонок не считаются
+    changed = {
+        obj.__tablename__
+        for obj in (
+            *session.new,
+            *(obj for obj in session.dirty if session.is_modified(obj)),
+            *session.deleted,
+        )
+        if isinstance(obj, GENERATION_MODELS)
+    }
+    if changed:
+        session.info.setdefault(_PENDING_TABLES, set()).update(changed)
+
+
+def bump_generations(bind, names) -> dict[str, int]:
+    """Увеличивает поколения таблиц в собственной короткой транзакции.
+
+    Возвращает новые значения: строка заблокирована своим ``UPDATE``
+    до конца транзакции, поэтому прочитанное поколение — именно наше.
+    """
+    table = TableGeneration.__table__
+    generations = {}
+    with bind.begin() as connection:
+        for name in sorted(names):
+            result = connection.execute(
+                update(table)
+                .where(table.c.name == name)
+                .values(generation=table.c.generation + 1)
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(name=name, generation=1))
+                generations[name] = 1
+            else:
+                generations[name] = connection.execute(
+                    select(table.c.generation).where(table.c.name == name)
+                ).scalar_one()
+    return generations
+
+
+def on_generations_bumped(callback) -> None:
+    """Вызывает ``callback(generations)`` после каждого локального увеличения."""
+    if callback not in _bump_callbacks:
+        _bump_callbacks.append(callback)
+
+
+def _after_commit(session) -> None:
+    names = session.info.pop(_PENDING_TABLES, None)
+    if not names:
+        return
+    try:
+        generations = bump_generations(session.get_bind(TableGeneration), names)
+    except SQLAlchemyError as exc:
+        # Данные уже записаны; без новых поколений сбрасываем хотя бы свой кеш
+        logger.warning("Не удалось обновить поколения %s: %s", sorted(names), exc)
+        _clear_all()
+        return
+    for callback in _bump_callbacks:
+        callback(generations)
+
+
+def _after_rollback(session) -> None:
+    session.info.pop(_PENDING_TABLES, None)
+
+
+def _clear_all(*_args, **_kwargs) -> None:
+    RESULTS.clear()
+    TOTALS.clear()
+
+
+def register_listeners() -> None:
+    """Подписывает счётчики поколений на коммиты сессий (идемпотентно)."""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+    event.listen(db.metadata, "after_create", _clear_all)
+    event.listen(db.metadata, "after_drop", _clear_all)
+    _listeners_registered = True
+
+
+def init_search_cache(app) -> None:
+    """Подключает кеш к приложению."""
+    register_listeners()
+    RESULTS.max_bytes = int(app.config.get("SEARCH_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+
+
+def current_generations() -> tuple[int, ...]:
+    """Поколения таблиц поиска (одним запросом)."""
+    names = [model.__tablename__ for model in GENERATION_MODELS]
+    rows = dict(
+        db.session.execute(
+            select(TableGeneration.name, TableGeneration.generation).where(
+                TableGeneration.name.in_(names)
+            )
+        ).all()
+    )
+    return tuple(rows.get(name, 0) for name in names)
+
+
+def table_generation(model) -> int:
+    """Поколение таблицы модели (0, пока в неё не писали)."""
+    return (
+        db.session.execute(
+            select(TableGeneration.generation).where(
+                TableGeneration.name == model.__tablename__
+            )
+        ).scalar()
+        or 0
+    )
+
+
+def normalize_query(query: str) -> str:
+    return _SPACES_RE.sub(" ", (query or "").lower().replace("ё", "е")).strip()
+
+
+def results_key(query: str, filters: tuple, scope: Any) -> tuple:
+    """Ключ кеша результатов для текущих поколений таблиц."""
+    return (normalize_query(query), filters, scope, current_generations())
+
+
+def get_ranked(key: tuple):
+    """Ранжированный список id из кеша или ``None``."""
+    if not current_app.config.get("SEARCH_CACHE_ENABLED", True):
+        return None
+    return RESULTS.get(key)
+
+
+def put_ranked(key: tuple, ranked_ids: list[int]) -> None:
+    if not current_app.config.get("SEARCH_CACHE_ENABLED", True):
+        return
+    ids = array("q", ranked_ids)
+    RESULTS.put(key, ids, ids.itemsize * len(ids) + len(key[0]) + _ENTRY_OVERHEAD)
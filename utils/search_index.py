@@ -0,0 +1,243 @@
+"""Инвертированный триграммный индекс для нечёткого поиска.
+
+Индекс хранится в таблице ``search_ngram`` и сужает поиск до небольшого
+набора кандидатов, которые затем переранжирует
+``routes.search_routes.advanced_search_similarity``. Записи индекса
+обновляются событиями SQLAlchemy в той же транзакции, что и сами сущности,
+поэтому индекс общий для всех воркеров и не расходится с данными при откате.
+Строки новых документов копятся за flush и вставляются одним executemany в
+``after_flush``, а не отдельным запросом на каждую сущность.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import re
+from typing import Any, Iterable
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from database import db
+from models import Contractor, Object, Request, SearchNgram
+
+logger = logging.getLogger(__name__)
+
+# Доля триграмм запроса, которая должна совпасть у кандидата
+MIN_OVERLAP = 0.3
+# Максимум кандидатов, передаваемых на переранжирование
+CANDIDATE_LIMIT = 500
+# Размер пачки при полной перестройке индекса
+REBUILD_BATCH = 2000
+
+# Сущность -> (модель, индексируемые поля)
+INDEXED_FIELDS: dict[str, tuple[Any, tuple[str, ...]]] = {
+    "object": (Object, ("name", "address", "customer")),
+    "contractor": (Contractor, ("name", "inn", "contact_person", "phone", "email")),
+    "request": (Request, ("manufacturers",)),
+}
+
+_WORD_RE = re.compile(r"\w+")
+_listeners_registered = False
+# Ключ session.info: строки индекса, ожидающие вставки в конце flush
+_PENDING = "search_ngram_pending"
+
+
+def normalize(text: str | None) -> str:
+    """Приводит текст к виду, в котором строятся триграммы."""
+    return (text or "").lower().replace("ё", "е")
+
+
+def trigrams(text: str | None) -> set[str]:
+    """Возвращает множество триграмм текста (по словам, с отбивкой пробелами)."""
+    grams: set[str] = set()
+    for word in _WORD_RE.findall(normalize(text)):
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i : i + 3])
+    return grams
+
+
+def document_trigrams(values: Iterable[Any]) -> set[str]:
+    """Триграммы документа, собранного из нескольких полей."""
+    grams: set[str] = set()
+    for value in values:
+        if value:
+            grams |= trigrams(str(value))
+    return grams
+
+
+def _entity_of(target: Any) -> str | None:
+    for entity, (model, _fields) in INDEXED_FIELDS.items():
+        if isinstance(target, model):
+            return entity
+    return None
+
+
+def _write_document(connection, target, entity: str, entity_id: int, values) -> None:
+    rows = [
+        {"entity": entity, "entity_id": entity_id, "gram": gram}
+        for gram in document_trigrams(values)
+    ]
+    if not rows:
+        return
+    session = object_session(target)
+    if session is None:
+        connection.execute(SearchNgram.__table__.insert(), rows)
+    else:
+        session.info.setdefault(_PENDING, []).extend(rows)
+
+
+def _delete_document(connection, entity: str, entity_id: int) -> None:
+    table = SearchNgram.__table__
+    connection.execute(
+        table.delete().where(table.c.entity == entity, table.c.entity_id == entity_id)
+    )
+
+
+def _after_insert(mapper, connection, target) -> None:
+    entity = _entity_of(target)
+    if entity is None:
+        return
+    fields = INDEXED_FIELDS[entity][1]
+    _write_document(
+        connection, target, entity, target.id, (getattr(target, f) for f in fields)
+    )
+
+
+def _after_update(mapper, connection, target) -> None:
+    entity = _entity_of(target)
+    if entity is None:
+        return
+    fields = INDEXED_FIELDS[entity][1]
+    state = inspect(target)
+    if not any(state.attrs[f].history.has_changes() for f in fields):
+        return
+    _delete_document(connection, entity, target.id)
+    _write_document(
+        connection, target, entity, target.id, (getattr(target, f) for f in fields)
+    )
+
+
+def _after_delete(mapper, connection, target) -> None:
+    entity = _entity_of(target)
+    if entity is not None:
+        _delete_document(connection, entity, target.id)
+
+
+def _before_flush(session, flush_context, instances) -> None:
+    # Остатки flush, упавшего до after_flush, не должны попасть в индекс
+    session.info.pop(_PENDING, None)
+
+
+def _after_flush(session, flush_context) -> None:
+    rows = session.info.pop(_PENDING, None)
+    if rows:
+        session.connection().execute(SearchNgram.__table__.insert(), rows)
+
+
+def register_listeners() -> None:
+    """Подписывает индекс на изменения индексируемых моделей (идемпотентно)."""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    for model, _fields in INDEXED_FIELDS.values():
+        event.listen(model, "after_insert", _after_insert)
+        event.listen(model, "after_update", _after_update)
+        event.listen(model, "after_delete", _after_delete)
+    event.listen(Session, "before_flush", _before_flush)
+    event.listen(Session, "after_flush", _after_flush)
+    _listeners_registered = True
+
+
+def rebuild(entity: str) -> int:
+    """Полностью перестраивает индекс сущности. Возвращает число документов."""
+    model, fields = INDEXED_FIELDS[entity]
+    columns = [model.id] + [getattr(model, f) for f in fields]
+    table = SearchNgram.__table__
+
+    db.session.execute(table.delete().where(table.c.entity == entity))
+    documents = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(*columns)
+            .where(model.id > last_id)
+            .order_by(model.id)
+            .limit(REBUILD_BATCH)
+        ).all()
+        if not rows:
+            break
+        batch = [
+            {"entity": entity, "entity_id": row[0], "gram": gram}
+            for row in rows
+            for gram in document_trigrams(row[1:])
+        ]
+        if batch:
+            db.session.execute(table.insert(), batch)
+        documents += len(rows)
+        last_id = rows[-1][0]
+    db.session.commit()
+    logger.info("Индекс поиска %s перестроен: %s документов", entity, documents)
+    return documents
+
+
+def ensure_built() -> None:
+    """Строит индекс для сущностей, у которых он ещё пуст, а данные уже есть."""
+    for entity, (model, _fields) in INDEXED_FIELDS.items():
+        has_index = (
+            db.session.query(SearchNgram.id).filter_by(entity=entity).first()
+            is not None
+        )
+        if has_index:
+            continue
+        if db.session.query(model.id).first() is None:
+            continue
+        rebuild(entity)
+
+
+def init_search_index(app) -> None:
+    """Подключает индекс к приложению: события моделей и ленивое построение."""
+    register_listeners()
+    if not app.config.get("SEARCH_INDEX_BUILD_ON_START", True):
+        return
+    try:
+        ensure_built()
+    except Exception as exc:  # noqa: BLE001
+        db.session.rollback()
+        app.logger.warning(f"Индекс поиска не построен при старте: {exc}")
+
+
+def candidate_select(entity: str, query: str, limit: int | None = CANDIDATE_LIMIT):
+    """SELECT id кандидатов, разделяющих с запросом достаточно триграмм.
+
+    Кандидаты упорядочены по числу совпавших триграмм; ``limit=None``
+    снимает ограничение на их количество. Возвращает ``None``, если в
+    запросе нет ни одной триграммы.
+    """
+    grams = trigrams(query)
+    if not grams:
+        return None
+    min_hits = max(1, math.ceil(len(grams) * MIN_OVERLAP))
+    hits = func.count(func.distinct(SearchNgram.gram))
+    stmt = (
+        select(SearchNgram.entity_id)
+        .where(SearchNgram.entity == entity, SearchNgram.gram.in_(sorted(grams)))
+        .group_by(SearchNgram.entity_id)
+        .having(hits >= min_hits)
+        .order_by(hits.desc(), SearchNgram.entity_id)
+    )
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def candidate_ids(
+    entity: str, query: str, limit: int | None = CANDIDATE_LIMIT
+) -> list[int]:
+    """Список id кандидатов в порядке убывания совпадения триграмм."""
+    stmt = candidate_select(entity, query, limit)
+    if stmt is None:
+        return []
+    return list(db.session.execute(stmt).scalars())
@@ -0,0 +1,316 @@
+"""Нормализованные, транслитерированные и фонетические ключи поиска.
+
+``soundex``/``metaphone`` из jellyfish понимают только латиницу, поэтому
+ключ звучания строится от транслитерации слова. Ключи хранятся в таблице
+``search_key`` по одному слову поля на строку и обновляются событиями
+SQLAlchemy в транзакции записи сущности (новые строки — пачкой в конце flush).
+Поиск по префиксу (в том числе латиницей по кириллическим названиям) и по
+звучанию выполняется пробами индексов ``(entity, word)``, ``(entity, translit)``
+и ``(entity, phonetic)``.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from typing import Any, Iterable
+
+from jellyfish import metaphone
+from sqlalchemy import and_, case, event, func, inspect, or_, select
+from sqlalchemy.orm import Session, object_session
+
+from database import db
+from models import Contractor, Object, Request, SearchKey
+
+logger = logging.getLogger(__name__)
+
+# Сущность -> (модель, поля с ключами)
+KEYED_FIELDS: dict[str, tuple[Any, tuple[str, ...]]] = {
+    "object": (Object, ("name", "address", "customer")),
+    "contractor": (Contractor, ("name", "contact_person")),
+    "request": (Request, ("manufacturers",)),
+}
+# Минимальная длина префикса и фонетического ключа для пробы индекса
+MIN_PREFIX = 2
+MIN_PHONETIC = 2
+REBUILD_BATCH = 2000
+
+_WORD_RE = re.compile(r"\w+")
+_TRANSLIT = str.maketrans(
+    {
+        "а": "a",
+        "б": "b",
+        "в": "v",
+        "г": "g",
+        "д": "d",
+        "е": "e",
+        "ё": "e",
+        "ж": "zh",
+        "з": "z",
+        "и": "i",
+        "й": "y",
+        "к": "k",
+        "л": "l",
+        "м": "m",
+        "н": "n",
+        "о": "o",
+        "п": "p",
+        "р": "r",
+        "с": "s",
+        "т": "t",
+        "у": "u",
+        "ф": "f",
+        "х": "kh",
+        "ц": "ts",
+        "ч": "ch",
+        "ш": "sh",
+        "щ": "shch",
+        "ъ": "",
+        "ы": "y",
+        "ь": "",
+        "э": "e",
+        "ю": "yu",
+        "я": "ya",
+    }
+)
+_listeners_registered = False
+# Ключ session.info: строки ключей, ожидающие вставки в конце flush
+_PENDING = "search_key_pending"
+
+
+def normalize(text: str | None) -> str:
+    """Нижний регистр и ``ё`` → ``е``."""
+    return (text or "").lower().replace("ё", "е")
+
+
+def transliterate(text: str | None) -> str:
+    """Транслитерация кириллицы латиницей (латиница и цифры не меняются)."""
+    return normalize(text).translate(_TRANSLIT)
+
+
+def phonetic_key(word: str | None) -> str | None:
+    """Ключ metaphone от транслитерации слова или ``None``, если он пуст."""
+    latin = transliterate(word)
+    try:
+        key = metaphone(latin) if latin else ""
+    except Exception:
+        key = ""
+    return key or None
+
+
+def word_keys(text: str | None) -> list[tuple[str, str, str | None]]:
+    """Ключи ``(word, translit, phonetic)`` каждого слова текста."""
+    # Каждое значение обрезается по длине своей колонки: транслитерация
+    # и metaphone бывают длиннее слова (``щ`` → ``shch``)
+    word_len, translit_len, phonetic_len = (
+        column.type.length
+        for column in (SearchKey.word, SearchKey.translit, SearchKey.phonetic)
+    )
+    keys = []
+    for word in _WORD_RE.findall(normalize(text)):
+        word = word[:word_len]
+        phonetic = phonetic_key(word)
+        keys.append(
+            (
+                word,
+                transliterate(word)[:translit_len],
+                phonetic[:phonetic_len] if phonetic else None,
+            )
+        )
+    return keys
+
+
+def _entity_of(target: Any) -> str | None:
+    for entity, (model, _fields) in KEYED_FIELDS.items():
+        if isinstance(target, model):
+            return entity
+    return None
+
+
+def _document_rows(entity: str, entity_id: int, values: Iterable[tuple[str, Any]]):
+    rows = []
+    for field, value in values:
+        seen = set()
+        for word, translit, phonetic in word_keys(value and str(value)):
+            if word in seen:
+                continue
+            seen.add(word)
+            rows.append(
+                {
+                    "entity": entity,
+                    "entity_id": entity_id,
+                    "field": field,
+                    "word": word,
+                    "translit": translit,
+                    "phonetic": phonetic,
+                }
+            )
+    return rows
+
+
+def _write_document(connection, entity: str, target: Any) -> None:
+    fields = KEYED_FIELDS[entity][1]
+    rows = _document_rows(entity, target.id, ((f, getattr(target, f)) for f in fields))
+    if not rows:
+        return
+    session = object_session(target)
+    if session is None:
+        connection.execute(SearchKey.__table__.insert(), rows)
+    else:
+        session.info.setdefault(_PENDING, []).extend(rows)
+
+
+def _delete_document(connection, entity: str, entity_id: int) -> None:
+    table = SearchKey.__table__
+    connection.execute(
+        table.delete().where(table.c.entity == entity, table.c.entity_id == entity_id)
+    )
+
+
+def _after_insert(mapper, connection, target) -> None:
+    entity = _entity_of(target)
+    if entity is not None:
+        _write_document(connection, entity, target)
+
+
+def _after_update(mapper, connection, target) -> None:
+    entity = _entity_of(target)
+    if entity is None:
+        return
+    state = inspect(target)
+    if not any(state.attrs[f].history.has_changes() for f in KEYED_FIELDS[entity][1]):
+        return
+    _delete_document(connection, entity, target.id)
+    _write_document(connection, entity, target)
+
+
+def _after_delete(mapper, connection, target) -> None:
+    entity = _entity_of(target)
+    if entity is not None:
+        _delete_document(connection, entity, target.id)
+
+
+def _before_flush(session, flush_context, instances) -> None:
+    # Остатки flush, упавшего до after_flush, не должны попасть в ключи
+    session.info.pop(_PENDING, None)
+
+
+def _after_flush(session, flush_context) -> None:
+    rows = session.info.pop(_PENDING, None)
+    if rows:
+        session.connection().execute(SearchKey.__table__.insert(), rows)
+
+
+def register_listeners() -> None:
+    """Подписывает ключи на изменения моделей (идемпотентно)."""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    for model, _fields in KEYED_FIELDS.values():
+        event.listen(model, "after_insert", _after_insert)
+        event.listen(model, "after_update", _after_update)
+        event.listen(model, "after_delete", _after_delete)
+    event.listen(Session, "before_flush", _before_flush)
+    event.listen(Session, "after_flush", _after_flush)
+    _listeners_registered = True
+
+
+def rebuild(entity: str) -> int:
+    """Полностью пересчитывает ключи сущности. Возвращает число документов."""
+    model, fields = KEYED_FIELDS[entity]
+    columns = [model.id] + [getattr(model, f) for f in fields]
+    table = SearchKey.__table__
+
+    db.session.execute(table.delete().where(table.c.entity == entity))
+    documents = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(*columns)
+            .where(model.id > last_id)
+            .order_by(model.id)
+            .limit(REBUILD_BATCH)
+        ).all()
+        if not rows:
+            break
+        batch = [
+            key_row
+            for row in rows
+            for key_row in _document_rows(entity, row[0], zip(fields, row[1:]))
+        ]
+        if batch:
+            db.session.execute(table.insert(), batch)
+        documents += len(rows)
+        last_id = rows[-1][0]
+    db.session.commit()
+    logger.info("Ключи поиска %s пересчитаны: %s документов", entity, documents)
+    return documents
+
+
+def ensure_built() -> None:
+    """Считает ключи для сущностей, у которых их ещё нет, а данные уже есть."""
+    for entity, (model, _fields) in KEYED_FIELDS.items():
+        if db.session.query(SearchKey.id).filter_by(entity=entity).first():
+            continue
+        if db.session.query(model.id).first() is None:
+            continue
+        rebuild(entity)
+
+
+def init_search_keys(app) -> None:
+    """Подключает ключи к приложению: события моделей и ленивый расчёт."""
+    register_listeners()
+    if not app.config.get("SEARCH_INDEX_BUILD_ON_START", True):
+        return
+    try:
+        ensure_built()
+    except Exception as exc:  # noqa: BLE001
+        db.session.rollback()
+        app.logger.warning(f"Ключи поиска не рассчитаны при старте: {exc}")
+
+
+def key_match_select(entity: str, query: str, limit: int | None = None):
+    """SELECT id сущностей, у которых каждое слово запроса нашлось по ключам.
+
+    Слово совпадает по префиксу нормализованной формы, по префиксу
+    транслитерации или по фонетическому ключу. Порядок: сначала совпадения
+    по префиксу, затем по звучанию. ``None`` — в запросе нет пригодных слов.
+    """
+    words = [k for k in word_keys(query) if len(k[0]) >= MIN_PREFIX]
+    if not words:
+        return None
+    relevance = []
+    conditions = []
+    for word, translit, phonetic in words:
+        # LIKE 'слово%' с экранированием % и _ из запроса
+        by_prefix = or_(
+            SearchKey.word.startswith(word, autoescape=True),
+            SearchKey.translit.startswith(translit, autoescape=True),
+        )
+        whens = [(by_prefix, 2)]
+        condition = by_prefix
+        if phonetic and len(phonetic) >= MIN_PHONETIC:
+            by_sound = SearchKey.phonetic == phonetic
+            whens.append((by_sound, 1))
+            condition = or_(condition, by_sound)
+        conditions.append(condition)
+        relevance.append(func.max(case(*whens, else_=0)))
+    score = sum(relevance[1:], relevance[0])
+    stmt = (
+        select(SearchKey.entity_id)
+        .where(SearchKey.entity == entity, or_(*conditions))
+        .group_by(SearchKey.entity_id)
+        .having(and_(*[func.max(case((c, 1), else_=0)) == 1 for c in conditions]))
+        .order_by(score.desc(), SearchKey.entity_id)
+    )
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def key_match_ids(entity: str, query: str, limit: int | None = None) -> list[int]:
+    """Список id сущностей, совпавших по префиксу или звучанию."""
+    stmt = key_match_select(entity, query, limit)
+    if stmt is None:
+        return []
+    return list(db.session.execute(stmt).scalars())
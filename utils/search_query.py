@@ -0,0 +1,149 @@
+"""Структурированный синтаксис поиска заявок.
+
+Пример: ``object:Ромашка contractor:"ООО Вектор" status:OPEN mfr:Пульсар
+created:>2026-01-01 свободный текст``. Фильтры с ключами превращаются в
+SQL-условия и применяются до нечёткого поиска; свободный текст (если он
+есть) ранжируется только среди заявок, прошедших фильтры.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+from models import Contractor, Object, Request, request_contractor
+from utils.request_manufacturers import has_manufacturer, split_manufacturers
+from utils.statuses import RequestStatus, get_status_label
+
+_TOKEN_RE = re.compile(r'(?:(\w+):)?(?:"([^"]*)"|(\S+))')
+_DATE_RE = re.compile(r"^(>=|<=|>|<|=)?(.+)$")
+_DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y")
+
+# Ключ в запросе -> каноническое имя фильтра
+FILTER_KEYS = {
+    "object": "object",
+    "объект": "object",
+    "contractor": "contractor",
+    "подрядчик": "contractor",
+    "status": "status",
+    "статус": "status",
+    "mfr": "mfr",
+    "manufacturer": "mfr",
+    "производитель": "mfr",
+    "created": "created",
+    "создана": "created",
+}
+
+
+@dataclass
+class ParsedQuery:
+    """Разобранный запрос: SQL-фильтры, свободный текст и ошибки разбора."""
+
+    text: str = ""
+    filters: list[tuple[str, str]] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def is_structured(self) -> bool:
+        return bool(self.filters)
+
+    def cache_key(self) -> tuple:
+        return tuple(sorted(self.filters))
+
+
+def parse_query(raw: str) -> ParsedQuery:
+    """Разбирает строку поиска на фильтры ``ключ:значение`` и свободный текст."""
+    parsed = ParsedQuery()
+    words = []
+    for match in _TOKEN_RE.finditer(raw or ""):
+        key, quoted, bare = match.groups()
+        value = quoted if quoted is not None else bare
+        name = FILTER_KEYS.get((key or "").lower())
+        if name is None:
+            words.append(match.group(0).replace('"', "") if key else value)
+            continue
+        value = value.strip()
+        if not value:
+            parsed.errors.append(f"Пустое значение фильтра {key}")
+            continue
+        parsed.filters.append((name, value))
+    parsed.text = " ".join(w for w in words if w).strip()
+    return parsed
+
+
+def _parse_date(value: str) -> date | None:
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _created_clause(value: str):
+    op, raw = _DATE_RE.match(value).groups()
+    day = _parse_date(raw.strip())
+    if day is None:
+        return None
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    column = Request.created_at
+    if op == ">":
+        return column >= end
+    if op == ">=":
+        return column >= start
+    if op == "<":
+        return column < start
+    if op == "<=":
+        return column < end
+    return (column >= start) & (column < end)
+
+
+def _status_values(value: str) -> list[str]:
+    by_label = {get_status_label(code).lower(): code for code in RequestStatus.all()}
+    codes = []
+    for part in value.split(","):
+        part = part.strip()
+        code = part.upper() if part.upper() in RequestStatus.all() else None
+        code = code or by_label.get(part.lower())
+        if code:
+            codes.append(code)
+    return codes
+
+
+def filter_clause(name: str, value: str):
+    """SQL-условие для одного фильтра или ``None``, если значение некорректно."""
+    if name == "object":
+        return Request.object_id.in_(
+            select(Object.id).where(Object.name.icontains(value, autoescape=True))
+        )
+    if name == "contractor":
+        return Request.id.in_(
+            select(request_contractor.c.request_id)
+            .join(Contractor, Contractor.id == request_contractor.c.contractor_id)
+            .where(Contractor.name.icontains(value, autoescape=True))
+        )
+    if name == "status":
+        codes = _status_values(value)
+        return Request.status.in_(codes) if codes else None
+    if name == "mfr":
+        # Точное имя по индексу request_manufacturer, через запятую — любое
+        names = split_manufacturers(value)
+        return has_manufacturer(names) if names else None
+    if name == "created":
+        return _created_clause(value)
+    return None
+
+
+def apply_filters(query, parsed: ParsedQuery):
+    """Добавляет SQL-фильтры разобранного запроса к запросу заявок."""
+    for name, value in parsed.filters:
+        clause = filter_clause(name, value)
+        if clause is None:
+            parsed.errors.append(f"Некорректное значение фильтра {name}: {value}")
+            continue
+        query = query.filter(clause)
+    return query
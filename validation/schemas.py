@@ -4,6 +4,8 @@ JSON Schema (draft 2020-12) для ключевых JSON-запросов.
 - Создание пользователя
 - зменение объекта у заявки
 - зменение статуса заявки
+- Пакетное создание заявок
+- Строки импорта объектов, подрядчиков и заявок из CSV
 
 Схемы описаны в терминах официального черновика 2020-12 и
 могут быть переиспользованы в автогенерации документации.
@@ -90,6 +92,107 @@ def build_schemas() -> Dict[str, Dict[str, Any]]:
                 },
             },
         },
+        "request_batch": {
+            "$schema": SCHEMA_URI,
+            "type": "object",
+            "additionalProperties": False,
+            "required": ["requests"],
+            "properties": {
+                "requests": {
+                    "type": "array",
+                    "minItems": 1,
+                    "maxItems": 1000,
+                    "description": "Позиции: заявка на каждого подрядчика",
+                    "items": {
+                        "type": "object",
+                        "additionalProperties": False,
+                        "required": ["object_id", "contractor_ids", "manufacturers"],
+                        "properties": {
+                            "object_id": {"type": "integer", "minimum": 1},
+                            "contractor_ids": {
+                                "type": "array",
+                                "minItems": 1,
+                                "items": {"type": "integer", "minimum": 1},
+                            },
+                            "manufacturers": {
+                                "type": "array",
+                                "minItems": 1,
+                                "items": {
+                                    "type": "string",
+                                    "minLength": 1,
+                                    "maxLength": 100,
+                                },
+                            },
+                            "comment": {"type": "string", "maxLength": 5000},
+                        },
+                    },
+                },
+                "csrf_token": {
+                    "type": "string",
+                    "description": "CSRF-токен",
+                },
+            },
+        },
+        "import_object_row": {
+            "$schema": SCHEMA_URI,
+            "type": "object",
+            "additionalProperties": False,
+            "required": ["name"],
+            "properties": {
+                "name": {"type": "string", "minLength": 1, "maxLength": 200},
+                "address": {"type": "string", "maxLength": 300},
+                "customer": {"type": "string", "maxLength": 200},
+                "phone": {"type": "string", "maxLength": 20},
+            },
+        },
+        "import_contractor_row": {
+            "$schema": SCHEMA_URI,
+            "type": "object",
+            "additionalProperties": False,
+            "required": ["name"],
+            "properties": {
+                "name": {"type": "string", "minLength": 2, "maxLength": 200},
+                "inn": {
+                    "type": "string",
+                    "pattern": r"^[0-9]{10}([0-9]{2})?$",
+                    "description": "ИНН: 10 или 12 цифр",
+                },
+                "contact_person": {"type": "string", "maxLength": 200},
+                "phone": {"type": "string", "maxLength": 20},
+                "email": {
+                    "type": "string",
+                    "maxLength": 100,
+                    "pattern": r"^[^@\s]+@[^@\s]+$",
+                },
+            },
+        },
+        "import_request_row": {
+            "$schema": SCHEMA_URI,
+            "type": "object",
+            "additionalProperties": False,
+            "required": ["object", "contractor", "manufacturers"],
+            "properties": {
+                "object": {
+                    "type": "string",
+                    "minLength": 1,
+                    "maxLength": 200,
+                    "description": "Название существующего объекта",
+                },
+                "contractor": {
+                    "type": "string",
+                    "minLength": 1,
+                    "maxLength": 200,
+                    "description": "ИНН или название существующего подрядчика",
+                },
+                "manufacturers": {
+                    "type": "string",
+                    "minLength": 1,
+                    "maxLength": 255,
+                    "description": "Производители через запятую",
+                },
+                "comment": {"type": "string", "maxLength": 5000},
+            },
+        },
     }
 
 
@@ -102,4 +205,5 @@ ENDPOINT_SCHEMAS: Dict[Tuple[str, str], str] = {
     ("user.add_user", "POST"): "user_create",
     ("request_process.change_request_object", "POST"): "request_change_object",
     ("request_process.change_status", "POST"): "request_change_status",
+    ("api_v1.api_requests_batch", "POST"): "request_batch",
 }